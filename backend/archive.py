@@ -0,0 +1,221 @@
+"""Cold storage for closed clock entries.
+
+Closed entries that started before the cutoff (by default one payroll period ago) are
+copied in id-ordered chunks to zstd-compressed Parquet files laid out as
+``<ARCHIVE_DIR>/month=YYYY-MM/project_id=N/part-<first id>-<last id>.parquet``, then
+deleted from the live table (and, on SQLite, the month tables) in one transaction
+per chunk. ``manifest.json`` lists every file with its row count and time range, so
+readers only open the files that overlap the range they ask for.
+
+A chunk's files are listed in the manifest as pending before its rows are deleted.
+Once the delete commits, the files stop being pending. A run that stopped in between
+(crash, error) leaves pending files behind, whose rows may or may not still be in the
+database; the next run starts by finishing their deletes (``reconcile``). Until then
+``read(..., engine=)`` takes a pending file's rows only where the database no longer
+has them (without an engine it skips pending files), so every row is read from exactly
+one place. File names are derived from the chunk's ids, so a run that
+stopped before listing its files overwrites them instead of duplicating rows.
+
+    python -m archive                      # archive entries older than PAYROLL_PERIOD_DAYS
+    python -m archive --older-than-days 90
+
+Needs pyarrow (pip install pyarrow) to write or read archived entries.
+"""
+import json
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import MetaData, Table, func, inspect, select
+
+import intervals
+import partitions
+
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "./archive")
+PAYROLL_PERIOD_DAYS = int(os.getenv("PAYROLL_PERIOD_DAYS", "14"))
+COLUMNS = ["id", "worker_id", "project_id", "clock_in_time", "clock_out_time", "total_hours", "auto_closed"]
+DELETE_BATCH = 500  # ids per DELETE ... IN (...), well under SQLite's bound-parameter limit
+
+
+def schema():
+    """Column types of archive files; files written before a column existed read it as null."""
+    import pyarrow as pa
+    return pa.schema([
+        ("id", pa.int64()), ("worker_id", pa.int64()), ("project_id", pa.int64()),
+        ("clock_in_time", pa.timestamp("us")), ("clock_out_time", pa.timestamp("us")),
+        ("total_hours", pa.float64()), ("auto_closed", pa.bool_()),
+    ])
+
+
+def manifest_path(archive_dir: str = None) -> str:
+    return os.path.join(archive_dir or ARCHIVE_DIR, "manifest.json")
+
+
+def load_manifest(archive_dir: str = None) -> dict:
+    path = manifest_path(archive_dir)
+    if not os.path.exists(path): return {"files": []}
+    with open(path) as fh: return json.load(fh)
+
+
+def save_manifest(manifest: dict, archive_dir: str = None):
+    path = manifest_path(archive_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + ".tmp", "w") as fh: json.dump(manifest, fh, indent=1, default=str)
+    os.replace(path + ".tmp", path)
+
+
+def write_group(rows: list, month: str, project_id, archive_dir: str) -> dict:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    directory = os.path.join(archive_dir, f"month={month}", f"project_id={project_id}")
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"part-{rows[0]['id']}-{rows[-1]['id']}.parquet")
+    table = pa.Table.from_pylist(rows, schema=schema())
+    pq.write_table(table, path + ".tmp", compression="zstd")
+    os.replace(path + ".tmp", path)
+    return {
+        "file": os.path.relpath(path, archive_dir), "month": month, "project_id": project_id, "rows": len(rows),
+        "min_id": rows[0]["id"], "max_id": rows[-1]["id"],
+        "min_clock_in": min(r["clock_in_time"] for r in rows).isoformat(),
+        "max_clock_in": max(r["clock_in_time"] for r in rows).isoformat(),
+    }
+
+
+def delete_ids(engine, table, ids: list):
+    with engine.begin() as conn:
+        for i in range(0, len(ids), DELETE_BATCH):
+            conn.execute(table.delete().where(table.c.id.in_(ids[i:i + DELETE_BATCH])))
+            intervals.forget(conn, ids[i:i + DELETE_BATCH])  # archived entries leave the headcount index
+
+
+def reconcile(engine, archive_dir: str = None, log=print) -> int:
+    """Finish the deletes of pending files (see above); returns the number of files settled."""
+    archive_dir = archive_dir or ARCHIVE_DIR
+    manifest = load_manifest(archive_dir)
+    pending = [f for f in manifest["files"] if f.get("pending")]
+    if not pending: return 0
+    import pyarrow.parquet as pq
+    for f in pending:
+        with engine.connect() as conn:
+            table = Table(f["table"], MetaData(), autoload_with=conn) if inspect(conn).has_table(f["table"]) else None
+        if table is not None:
+            delete_ids(engine, table, pq.read_table(os.path.join(archive_dir, f["file"]), columns=["id"]).column("id").to_pylist())
+        del f["pending"]
+    save_manifest(manifest, archive_dir)
+    log(f"settled {len(pending)} archive files left pending by an interrupted run")
+    return len(pending)
+
+
+def archive(engine, cutoff: datetime = None, chunk_size: int = 50_000, archive_dir: str = None, log=print) -> int:
+    """Move closed entries with clock_in_time < cutoff into Parquet; returns the number of rows moved."""
+    archive_dir = archive_dir or ARCHIVE_DIR
+    cutoff = cutoff or datetime.now() - timedelta(days=PAYROLL_PERIOD_DAYS)
+    reconcile(engine, archive_dir, log)
+    names = [partitions.PARENT]
+    if engine.dialect.name == "sqlite":
+        names += [name for name, lo, _ in partitions.list_partitions(engine) if lo < cutoff]
+    manifest = load_manifest(archive_dir)
+    moved = 0
+    for name in names:
+        with engine.connect() as conn:
+            table = Table(name, MetaData(), autoload_with=conn)
+        predicate = [table.c.clock_out_time.isnot(None), table.c.clock_in_time < cutoff]
+        if name == partitions.PARENT and engine.dialect.name == "sqlite":
+            # same guard as partitions.roll(): keep the highest id so SQLite can't reuse it
+            predicate.append(table.c.id < select(func.max(table.c.id)).scalar_subquery())
+        last_id = 0
+        while True:
+            with engine.connect() as conn:
+                rows = conn.execute(
+                    select(*[table.c[c] for c in COLUMNS if c in table.c]).where(*predicate, table.c.id > last_id).order_by(table.c.id).limit(chunk_size)
+                ).mappings().all()
+            if not rows: break
+            groups = defaultdict(list)
+            for row in rows:
+                groups[(row["clock_in_time"].strftime("%Y-%m"), row["project_id"])].append({**row, "auto_closed": bool(row.get("auto_closed"))})
+            written = [
+                {**write_group(group, month, project_id, archive_dir), "table": name, "pending": True}
+                for (month, project_id), group in sorted(groups.items(), key=str)
+            ]
+            ids = [row["id"] for row in rows]
+            replaced = {f["file"] for f in written}
+            manifest["files"] = [f for f in manifest["files"] if f["file"] not in replaced] + written
+            save_manifest(manifest, archive_dir)
+            delete_ids(engine, table, ids)
+            for f in written: del f["pending"]
+            manifest["archived_before"] = max(manifest.get("archived_before") or "", cutoff.isoformat())
+            save_manifest(manifest, archive_dir)
+            moved += len(rows)
+            last_id = ids[-1]
+            log(f"{name}: archived {moved:,} entries so far ({len(written)} files)")
+        if name != partitions.PARENT:
+            with engine.begin() as conn:
+                if conn.execute(select(func.count()).select_from(table)).scalar() == 0:
+                    table.drop(bind=conn)
+                    log(f"{name}: fully archived, dropped")
+    return moved
+
+
+def read(start: datetime = None, end: datetime = None, worker_id: int = None, archive_dir: str = None, engine=None) -> list:
+    """Archived entries with clock_in_time in [start, end) as dicts, oldest first.
+
+    Only files whose time range overlaps the request are opened, so this is free when
+    the range is newer than anything archived. Rows of pending files are included when
+    `engine` is given and their table no longer holds them (see above)."""
+    archive_dir = archive_dir or ARCHIVE_DIR
+    files = [
+        f for f in load_manifest(archive_dir)["files"]
+        if (engine is not None or not f.get("pending"))
+        and (start is None or datetime.fromisoformat(f["max_clock_in"]) >= start)
+        and (end is None or datetime.fromisoformat(f["min_clock_in"]) < end)
+    ]
+    settled = [f for f in files if not f.get("pending")]
+    rows = read_files(settled, start, end, worker_id, archive_dir)
+    by_table = defaultdict(list)
+    for f in files:
+        if f.get("pending"): by_table[f["table"]].append(f)
+    for name, pending in by_table.items():
+        candidates = read_files(pending, start, end, worker_id, archive_dir)
+        with engine.connect() as conn:
+            if inspect(conn).has_table(name):
+                table = Table(name, MetaData(), autoload_with=conn)
+                ids = [r["id"] for r in candidates]
+                present = set()
+                for i in range(0, len(ids), DELETE_BATCH):
+                    present.update(conn.execute(select(table.c.id).where(table.c.id.in_(ids[i:i + DELETE_BATCH]))).scalars())
+                candidates = [r for r in candidates if r["id"] not in present]
+        rows += candidates
+    return sorted(rows, key=lambda r: r["clock_in_time"])
+
+
+def read_files(files: list, start: datetime, end: datetime, worker_id: int, archive_dir: str) -> list:
+    if not files: return []
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    dataset = ds.dataset([os.path.join(archive_dir, f["file"]) for f in files], format="parquet", schema=schema())
+    condition = None
+    for expr in (
+        pc.field("clock_in_time") >= start if start else None,
+        pc.field("clock_in_time") < end if end else None,
+        pc.field("worker_id") == worker_id if worker_id is not None else None,
+    ):
+        if expr is not None: condition = expr if condition is None else condition & expr
+    rows = dataset.to_table(columns=COLUMNS, filter=condition).to_pylist()
+    for row in rows: row["auto_closed"] = bool(row["auto_closed"])  # null in files from before the column
+    return rows
+
+
+def main():
+    import argparse
+    import main as app
+    parser = argparse.ArgumentParser(description="Archive closed clock entries to Parquet")
+    parser.add_argument("--older-than-days", type=int, default=PAYROLL_PERIOD_DAYS)
+    parser.add_argument("--chunk-size", type=int, default=50_000)
+    parser.add_argument("--archive-dir", default=ARCHIVE_DIR)
+    args = parser.parse_args()
+    cutoff = datetime.now() - timedelta(days=args.older_than_days)
+    print(f"archived {archive(app.engine, cutoff, args.chunk_size, args.archive_dir):,} entries started before {cutoff:%Y-%m-%d %H:%M}")
+
+
+if __name__ == "__main__":
+    main()
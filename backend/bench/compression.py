@@ -0,0 +1,73 @@
+"""CPU cost vs bytes saved for the response compression settings.
+
+Builds a /clock_entries/-shaped JSON payload and times each encoding/level both as a
+single buffer and as a stream of chunks (flushed per chunk, like the middleware does).
+
+    python -m bench.compression --entries 20000 --chunk-size 16384
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+from compression import Compressor, brotli
+
+
+def sample_payload(entries: int, seed: int = 0) -> bytes:
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1, 6, 0)
+    rows = []
+    for i in range(entries):
+        clock_in = start + timedelta(minutes=rng.randint(0, 60 * 24 * 365))
+        hours = round(rng.gauss(8.5, 1.5), 2)
+        rows.append({
+            "id": i + 1, "worker_id": rng.randint(1, 500), "project_id": rng.randint(1, 40),
+            "worker_name": f"Worker {rng.randint(1, 500)}", "project_name": f"Project {rng.randint(1, 40)}",
+            "clock_in_time": clock_in.isoformat(), "clock_out_time": (clock_in + timedelta(hours=hours)).isoformat(),
+            "total_hours": hours,
+        })
+    return json.dumps(rows).encode()
+
+
+def measure(payload: bytes, encoding: str, level: int, chunk_size: int, repeat: int):
+    best_cpu, size = None, 0
+    for _ in range(repeat):
+        kwargs = {"brotli_quality": level} if encoding == "br" else {"gzip_level": level}
+        compressor = Compressor(encoding, **kwargs)
+        started = time.process_time()
+        if chunk_size:
+            out = [compressor.compress(payload[i:i + chunk_size]) for i in range(0, len(payload), chunk_size)]
+            out.append(compressor.finish())
+        else:
+            out = [compressor.finish(payload)]
+        cpu = time.process_time() - started
+        size = sum(map(len, out))
+        best_cpu = cpu if best_cpu is None else min(best_cpu, cpu)
+    return best_cpu, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=20000)
+    parser.add_argument("--chunk-size", type=int, default=16384, help="0 = compress the whole body at once")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    payload = sample_payload(args.entries)
+    print(f"payload: {len(payload):,} bytes ({args.entries:,} entries), chunk size {args.chunk_size or 'whole body'}")
+    print(f"{'encoding':<10}{'level':>6}{'bytes out':>14}{'ratio':>8}{'cpu ms':>10}{'MB/s':>9}{'KB saved/cpu ms':>18}")
+    configs = [("gzip", level) for level in (1, 6, 9)]
+    if brotli is not None:
+        configs += [("br", quality) for quality in (1, 4, 6, 11)]
+    else:
+        print("(brotli not installed, skipping br)")
+    for encoding, level in configs:
+        cpu, size = measure(payload, encoding, level, args.chunk_size, args.repeat)
+        saved_kb = (len(payload) - size) / 1024
+        print(f"{encoding:<10}{level:>6}{size:>14,}{len(payload) / size:>8.1f}{cpu * 1000:>10.1f}"
+              f"{len(payload) / 1e6 / max(cpu, 1e-9):>9.1f}{saved_kb / max(cpu * 1000, 1e-9):>18.1f}")
+
+
+if __name__ == "__main__":
+    main()
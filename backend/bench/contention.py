@@ -0,0 +1,154 @@
+"""Write contention on SQLite: default storage vs SQLITE_SINGLE_WRITER=1.
+
+Starts --writers threads at once. Each one creates a worker, clocks it in and clocks it
+out through the route functions in main.py, while --readers threads keep listing
+clock entries. Meanwhile one thread runs the scheduler's maintenance jobs back to back
+(lease renewed by its heartbeat, run history recorded) and another keeps submitting
+report jobs, so their writes compete with the punches too. Every mode runs in its own
+subprocess (main.py picks its storage mode at import) against a fresh database. The
+output counts "database is locked" errors, connection-pool timeouts and other failures.
+
+    python -m bench.contention --writers 1000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+# jobs with something to write on a fresh database; archive is opt-in and needs old entries
+MAINTENANCE = ["close_stale", "projections", "roll_partitions", "occupancy_rollup", "analyze", "reports_cleanup"]
+MODES = {"default": {}, "single_writer": {"SQLITE_SINGLE_WRITER": "1"}, "single_writer_batched": {"SQLITE_SINGLE_WRITER": "1", "PUNCH_BATCHING": "1"}}
+
+
+def classify(exc: BaseException) -> str:
+    return classify_text(str(exc)) or f"other:{type(exc).__name__}:{getattr(exc, 'status_code', '')}"
+
+
+def classify_text(text: str):
+    """"locked" or "pool_timeout" for an error message or traceback that is one, else None."""
+    if "database is locked" in text or "database table is locked" in text: return "locked"
+    if "QueuePool limit" in text or "TimeoutError" in text: return "pool_timeout"
+    return None
+
+
+def run_mode(writers: int, readers: int, read_interval: float) -> dict:
+    import main
+    main.intervals.install(main.write_engine, log=lambda *a: None)  # the app's lifespan isn't run here
+    project = main.create_project(main.ProjectBase(name="Contention", status="Active"), db=main.SessionLocal())
+    barrier = threading.Barrier(writers + readers + 2)
+    outcomes, latencies, lock = Counter(), [], threading.Lock()
+    done = threading.Event()
+
+    def writer(i):
+        barrier.wait()
+        started = time.perf_counter()
+        db = main.SessionLocal()
+        try:
+            worker = main.create_worker(main.WorkerBase(name=f"Contender {i}", role="Labourer"), db=db)
+            request = main.ClockRequest(worker_id=worker.id, project_id=project.id)
+            main.clock_in(request, db=db)
+            main.clock_out(request, db=db)
+            result = "ok"
+        except Exception as exc:
+            result = classify(exc)
+        finally:
+            db.close()
+        with lock:
+            outcomes[result] += 1
+            latencies.append(time.perf_counter() - started)
+
+    def reader():
+        barrier.wait()
+        while not done.is_set():
+            db = main.ReplicaSessionLocal()
+            try: main.get_clock_entries(start=None, end=None, fields="id", db=db)
+            except Exception as exc:
+                with lock: outcomes[f"read_{classify(exc)}"] += 1
+            finally: db.close()
+            time.sleep(read_interval)
+
+    def maintenance():
+        scheduler = main.scheduler
+        scheduler.lease_seconds = 0.3  # the heartbeat renews the lease every 0.1 s while a job runs
+        barrier.wait()
+        while not done.is_set():
+            try: scheduler.acquire_lease()
+            except Exception as exc:
+                with lock: outcomes[f"lease_{classify(exc)}"] += 1
+            for name in MAINTENANCE:
+                scheduler.run(scheduler.jobs[name])
+                m = scheduler.metrics[name]
+                result = "ok" if m["last_status"] == "ok" else f"failed:{classify_text(m['last_error']) or 'other'}"
+                with lock: outcomes[f"job_{result}"] += 1
+
+    def reports():
+        barrier.wait()
+        day = datetime(2026, 1, 1)
+        while not done.is_set():
+            day += timedelta(days=1)  # a new range each time, so it's computed rather than served from the cache
+            try:
+                job = main.submit_report(main.ReportSpec(kind="worker_hours", start=day, end=day + timedelta(days=400)))
+                while job.status in ("queued", "running"):
+                    time.sleep(0.01)
+                    job = main.to_report_job(main.report_runner.get(job.id))
+                result = "ok" if job.status == "done" else f"failed:{classify_text(job.error or '') or 'other'}"
+            except Exception as exc:
+                result = classify(exc)
+            with lock: outcomes[f"report_{result}"] += 1
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    background = [threading.Thread(target=reader) for _ in range(readers)] + [threading.Thread(target=maintenance), threading.Thread(target=reports)]
+    started = time.perf_counter()
+    for t in threads + background: t.start()
+    for t in threads: t.join()
+    elapsed = time.perf_counter() - started
+    done.set()
+    for t in background: t.join()
+    latencies.sort()
+    return {
+        "outcomes": dict(outcomes), "seconds": elapsed, "writes_per_second": writers * 3 / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000, "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writers", type=int, default=1000)
+    parser.add_argument("--readers", type=int, default=8, help="threads polling /clock_entries/ meanwhile")
+    parser.add_argument("--read-interval", type=float, default=0.05, help="pause between a reader's polls")
+    parser.add_argument("--modes", nargs="*", default=list(MODES), choices=list(MODES))
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_mode(args.writers, args.readers, args.read_interval)))
+        return
+    failed = False
+    for mode in args.modes:
+        with tempfile.TemporaryDirectory() as tmp:
+            env = {**os.environ, **MODES[mode], "DATABASE_URL": f"sqlite:///{os.path.join(tmp, 'contention.db')}",
+                   "SCHEDULER": "0", "REPORT_DIR": os.path.join(tmp, "reports"), "ARCHIVE_DIR": os.path.join(tmp, "archive")}
+            env.pop("REPLICA_DATABASE_URL", None)
+            proc = subprocess.run(
+                [sys.executable, "-m", "bench.contention", "--child", "--writers", str(args.writers),
+                 "--readers", str(args.readers), "--read-interval", str(args.read_interval)],
+                env=env, capture_output=True, text=True,
+            )
+        if proc.returncode:
+            print(f"{mode}: failed\n{proc.stderr}"); failed = True; continue
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        locked = sum(v for k, v in result["outcomes"].items() if "locked" in k)
+        print(f"{mode:<24}{result['seconds']:>8.1f}s{result['writes_per_second']:>9.0f} writes/s"
+              f"  p50 {result['p50_ms']:.0f} ms  p99 {result['p99_ms']:.0f} ms  lock errors: {locked}  {result['outcomes']}")
+        if mode != "default" and locked: failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
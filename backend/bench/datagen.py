@@ -0,0 +1,253 @@
+"""Synthetic projects, workers and shift histories for benchmark databases.
+
+Everything is drawn from one seeded RNG, so the same arguments always produce the same
+database. Rows are bulk-loaded in chunks: executemany through SQLAlchemy Core (with
+journalling relaxed on SQLite), or COPY on PostgreSQL when psycopg2 is the driver.
+The clock event log and its projections (worker_status, daily_totals) are filled from
+the loaded entries afterwards, so the database looks like one the API recorded.
+
+    python -m bench.datagen --database-url sqlite:///./bench_1m.db --workers 2500 --days 512 --reset
+    python -m bench.datagen --entries 1000000 --database-url sqlite:///./bench_1m.db --reset
+"""
+import argparse
+import csv
+import io
+import os
+import random
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+FIRST_NAMES = ["Ravi", "Suresh", "Anil", "Priya", "Lakshmi", "Arjun", "Kiran", "Deepa", "Manoj", "Sunita", "Rahul",
+               "Vijay", "Meena", "Ramesh", "Kavya", "Sanjay", "Pooja", "Naveen", "Divya", "Mohan", "Asha", "Gopal"]
+LAST_NAMES = ["Kumar", "Reddy", "Sharma", "Naidu", "Patel", "Rao", "Singh", "Iyer", "Das", "Nair", "Gupta", "Verma",
+              "Menon", "Joshi", "Pillai", "Yadav", "Chowdary", "Varma"]
+ROLES = [("Labourer", 35), ("Mason", 15), ("Carpenter", 12), ("Electrician", 10), ("Plumber", 8), ("Welder", 7),
+         ("Crane Operator", 3), ("Painter", 6), ("Supervisor", 4)]
+SITES = ["Riverside", "Hilltop", "Lakeview", "Metro", "Harbour", "Greenfield", "Skyline", "Central", "Eastgate", "Orchid"]
+KINDS = ["Tower", "Plaza", "Residency", "Bridge", "Mall", "Campus", "Depot", "Heights", "Flyover", "Warehouse"]
+STATUSES = [("Active", 60), ("Planned", 20), ("Completed", 15), ("On Hold", 5)]
+ATTENDANCE = [0.93, 0.93, 0.92, 0.92, 0.9, 0.75, 0.2]  # Monday .. Sunday
+AVERAGE_ATTENDANCE = sum(ATTENDANCE) / 7
+
+
+@dataclass
+class Config:
+    projects: int = 40
+    workers: int = 500
+    days: int = 365
+    start: datetime = datetime(2024, 1, 1)
+    seed: int = 0
+    night_shift_rate: float = 0.12   # share of workers on the 21:00 shift
+    shift_mean: float = 8.5          # hours
+    shift_sd: float = 1.25
+    forgot_rate: float = 0.02        # punches with a missing clock-out
+    reassign_rate: float = 0.04      # chance per worker per week of moving to another project
+    chunk_size: int = 50_000
+
+
+def plan_for_entries(entries: int) -> dict:
+    """Pick worker/project/day counts that produce roughly `entries` clock entries."""
+    days = 365 if entries <= 100_000 else 730
+    workers = max(20, round(entries / (days * AVERAGE_ATTENDANCE)))
+    return {"workers": workers, "projects": max(5, workers // 60), "days": days}
+
+
+def weighted(rng: random.Random, choices):
+    total = sum(w for _, w in choices)
+    pick = rng.uniform(0, total)
+    for value, weight in choices:
+        pick -= weight
+        if pick <= 0: return value
+    return choices[-1][0]
+
+
+def generate_projects(rng: random.Random, cfg: Config, first_id: int):
+    for i in range(cfg.projects):
+        yield {"id": first_id + i, "name": f"{rng.choice(SITES)} {rng.choice(KINDS)} {first_id + i}",
+               "description": f"Phase {rng.randint(1, 4)} construction", "status": weighted(rng, STATUSES)}
+
+
+def generate_workers(rng: random.Random, cfg: Config, first_id: int, project_ids):
+    for i in range(cfg.workers):
+        yield {"id": first_id + i, "name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+               "role": weighted(rng, ROLES), "assigned_project_id": rng.choice(project_ids)}
+
+
+def generate_entries(rng: random.Random, cfg: Config, workers, project_ids):
+    """Shift history per worker: weekday-dependent attendance, day/night shifts with
+    jittered start times, normally distributed lengths, the odd forgotten clock-out
+    (fixed up late by a supervisor, or still open on the last day) and occasional
+    reassignment to another project. Updates each worker's assigned_project_id."""
+    end = cfg.start + timedelta(days=cfg.days)
+    for worker in workers:
+        night = rng.random() < cfg.night_shift_rate
+        project_id = worker["assigned_project_id"]
+        for day in range(cfg.days):
+            date = cfg.start + timedelta(days=day)
+            if date.weekday() == 0 and rng.random() < cfg.reassign_rate:
+                project_id = rng.choice(project_ids)
+            if rng.random() > ATTENDANCE[date.weekday()]: continue
+            start_hour = 21 if night else rng.choice((7, 8, 8, 9))
+            clock_in = date + timedelta(hours=start_hour, minutes=rng.gauss(0, 12))
+            if rng.random() < cfg.forgot_rate:
+                if day == cfg.days - 1:
+                    yield {"worker_id": worker["id"], "project_id": project_id, "clock_in_time": clock_in,
+                           "clock_out_time": None, "total_hours": None}
+                    continue
+                hours = rng.uniform(14, 26)
+            else:
+                hours = min(14.0, max(2.0, rng.gauss(cfg.shift_mean, cfg.shift_sd)))
+            clock_out = min(clock_in + timedelta(hours=hours), end + timedelta(hours=12))
+            yield {"worker_id": worker["id"], "project_id": project_id, "clock_in_time": clock_in,
+                   "clock_out_time": clock_out, "total_hours": round((clock_out - clock_in).total_seconds() / 3600, 2)}
+        worker["assigned_project_id"] = project_id
+
+
+# -------------------------------
+# BULK LOADING
+# -------------------------------
+def chunked(rows, size: int):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch; batch = []
+    if batch: yield batch
+
+
+def copy_rows(conn, table, rows) -> bool:
+    """COPY ... FROM STDIN on PostgreSQL/psycopg2; returns False when that path isn't available."""
+    dbapi = conn.connection.driver_connection
+    if conn.dialect.name != "postgresql" or not hasattr(dbapi.cursor(), "copy_expert"): return False
+    columns = list(rows[0])
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(["" if row[c] is None else row[c] for c in columns])
+    buffer.seek(0)
+    dbapi.cursor().copy_expert(f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+    return True
+
+
+def bulk_insert(engine, table, rows, chunk_size: int) -> int:
+    count = 0
+    with engine.begin() as conn:
+        if conn.dialect.name == "sqlite":
+            conn.exec_driver_sql("PRAGMA synchronous=OFF")
+            conn.exec_driver_sql("PRAGMA cache_size=-200000")
+        for batch in chunked(rows, chunk_size):
+            if not copy_rows(conn, table, batch):
+                conn.execute(table.insert(), batch)
+            count += len(batch)
+    return count
+
+
+def reset_database(main, log=print):
+    """Drop the app's tables (users aside) and everything derived from clock entries, and recreate them empty."""
+    from sqlalchemy import MetaData, Table, inspect, text
+    import importer
+    import partitions
+    import reports
+    engine = main.engine
+    keep = {main.UserDB.__table__}
+    main.Base.metadata.drop_all(bind=engine, tables=[t for t in main.Base.metadata.sorted_tables if t not in keep])
+    with engine.begin() as conn:
+        if conn.dialect.name == "sqlite":
+            for name, _, _ in partitions.list_partitions(conn): Table(name, MetaData()).drop(bind=conn)
+            conn.execute(text(f"DROP TABLE IF EXISTS {main.intervals.TABLE}"))
+        for table in (reports.jobs, reports.cache, importer.imports):
+            if inspect(conn).has_table(table.name): conn.execute(table.delete())
+    if engine.dialect.name == "postgresql": partitions.install_postgres(engine, main.ClockEntryDB.__table__)
+    main.Base.metadata.create_all(bind=engine)
+    main.intervals.install(engine, log=log)
+    main.seed_projection_offsets()
+    if main.archive.load_manifest()["files"]:
+        log(f"note: the archive in {main.archive.ARCHIVE_DIR} was left alone; its entries will show up next to the generated ones")
+
+
+def advance_sequences(engine, tables):
+    """Move Postgres id sequences past ids that were loaded explicitly."""
+    if engine.dialect.name != "postgresql": return
+    from sqlalchemy import text
+    with engine.begin() as conn:
+        for table in tables:
+            conn.execute(text(f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), (SELECT max(id) FROM {table.name}))"))
+
+
+def generate(main, cfg: Config, reset: bool = False, log=print) -> dict:
+    """Generate and load a dataset through `main`'s engine and tables; returns row counts."""
+    from sqlalchemy import bindparam, func, select
+    import ledger
+    import partitions
+    if reset: reset_database(main, log)
+    workers_table, entries_table = main.WorkerDB.__table__, main.ClockEntryDB.__table__
+    with main.engine.connect() as conn:
+        first_project = (conn.execute(select(func.max(main.ProjectDB.id))).scalar() or 0) + 1
+        first_worker = (conn.execute(select(func.max(main.WorkerDB.id))).scalar() or 0) + 1
+        last_entry = conn.execute(select(func.max(entries_table.c.id))).scalar() or 0
+        logged = conn.execute(select(func.count()).select_from(main.ClockEventDB)).scalar()
+    if main.engine.dialect.name == "postgresql":
+        # month partitions up front: a month's rows can't be moved out of DEFAULT later
+        with main.engine.begin() as conn:
+            month = partitions.month_start(cfg.start)
+            while month <= cfg.start + timedelta(days=cfg.days):
+                partitions.ensure_postgres_partition(conn, month)
+                month = partitions.next_month(month)
+    rng = random.Random(cfg.seed)
+    projects = list(generate_projects(rng, cfg, first_project))
+    project_ids = [p["id"] for p in projects]
+    workers = list(generate_workers(rng, cfg, first_worker, project_ids))
+    hired_on = {w["id"]: w["assigned_project_id"] for w in workers}
+
+    started = time.perf_counter()
+    bulk_insert(main.engine, main.ProjectDB.__table__, projects, cfg.chunk_size)
+    bulk_insert(main.engine, workers_table, workers, cfg.chunk_size)  # before their entries, which reference them
+    entries = bulk_insert(main.engine, entries_table, generate_entries(rng, cfg, workers, project_ids), cfg.chunk_size)
+    moved = [{"worker_id": w["id"], "project_id": w["assigned_project_id"]} for w in workers if w["assigned_project_id"] != hired_on[w["id"]]]
+    if moved:
+        with main.engine.begin() as conn:
+            conn.execute(workers_table.update().where(workers_table.c.id == bindparam("worker_id")).values(assigned_project_id=bindparam("project_id")), moved)
+    advance_sequences(main.engine, [main.ProjectDB.__table__, workers_table])
+    elapsed = time.perf_counter() - started
+    log(f"loaded {len(projects):,} projects, {len(workers):,} workers, {entries:,} clock entries "
+        f"in {elapsed:.1f}s ({entries / max(elapsed, 1e-9) * 60:,.0f} entries/min)")
+
+    now = datetime.now(main.ist).replace(tzinfo=None)
+    bulk_insert(main.engine, main.WorkerAssignmentDB.__table__,
+                [{"worker_id": w["id"], "project_id": w["assigned_project_id"], "valid_from": now} for w in workers], cfg.chunk_size)
+    if not logged:
+        ledger.backfill(main.engine, log=lambda message: None)
+    else:
+        ledger.append_entry_events(main.engine, ledger.stored_entries(main.engine, after_id=last_entry), log=lambda message: None)
+        for name in ledger.FOLDS: ledger.rebuild(name, log=lambda message: None)
+    log(f"recorded clock events and rebuilt projections in {time.perf_counter() - started - elapsed:.1f}s")
+    return {"projects": len(projects), "workers": len(workers), "entries": entries}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default="sqlite:///./bench.db")
+    parser.add_argument("--entries", type=int, default=None, help="derive workers/projects/days for about this many entries")
+    parser.add_argument("--projects", type=int, default=Config.projects)
+    parser.add_argument("--workers", type=int, default=Config.workers)
+    parser.add_argument("--days", type=int, default=Config.days)
+    parser.add_argument("--start", type=datetime.fromisoformat, default=Config.start, help="first day, YYYY-MM-DD")
+    parser.add_argument("--seed", type=int, default=Config.seed)
+    parser.add_argument("--night-shift-rate", type=float, default=Config.night_shift_rate)
+    parser.add_argument("--forgot-rate", type=float, default=Config.forgot_rate)
+    parser.add_argument("--reassign-rate", type=float, default=Config.reassign_rate)
+    parser.add_argument("--chunk-size", type=int, default=Config.chunk_size)
+    parser.add_argument("--reset", action="store_true", help="drop and recreate the app's tables (except users) first")
+    args = parser.parse_args()
+
+    sizes = plan_for_entries(args.entries) if args.entries else {"projects": args.projects, "workers": args.workers, "days": args.days}
+    cfg = Config(start=args.start, seed=args.seed, night_shift_rate=args.night_shift_rate, forgot_rate=args.forgot_rate,
+                 reassign_rate=args.reassign_rate, chunk_size=args.chunk_size, **sizes)
+    os.environ["DATABASE_URL"] = args.database_url  # main.py binds its engine at import time
+    import main as app_main
+    generate(app_main, cfg, reset=args.reset)
+
+
+if __name__ == "__main__":
+    main()
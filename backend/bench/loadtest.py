@@ -0,0 +1,223 @@
+"""End-to-end load test for the FastAPI app.
+
+Drives the app in-process through httpx's ASGI transport (or a running server with
+--base-url) with shift-change style scenarios and reports p50/p95/p99 latency and
+throughput per route. The database is (re)generated with bench.datagen first if it
+holds fewer entries than --size asks for.
+
+    python -m bench.loadtest --size 10k
+    python -m bench.loadtest --size 1m --database-url sqlite:///./bench_1m.db --json results.json
+
+Needs httpx (pip install httpx).
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+try:
+    import httpx
+except ImportError:
+    raise SystemExit("bench.loadtest needs httpx: pip install httpx")
+from sqlalchemy import func, select
+
+from bench import datagen
+
+SIZES = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000}
+DASHBOARD_FIELDS = "id,worker_id,project_id,clock_in_time,clock_out_time"
+
+
+# -------------------------------
+# SEEDING
+# -------------------------------
+def seed_database(main, entries: int, seed: int = 0) -> int:
+    """Regenerate the benchmark dataset unless the database already holds about `entries` rows."""
+    with main.engine.connect() as conn:
+        existing = conn.execute(select(func.count()).select_from(main.ClockEntryDB)).scalar()
+    if existing >= entries * 0.9: return existing
+    return datagen.generate(main, datagen.Config(seed=seed, **datagen.plan_for_entries(entries)), reset=True)["entries"]
+
+
+# -------------------------------
+# RECORDING
+# -------------------------------
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    async def request(self, client: httpx.AsyncClient, method: str, route: str, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, route, **kwargs)
+            status = response.status_code
+        except httpx.HTTPError:
+            response, status = None, "error"
+        key = f"{method} {route}"
+        self.latencies[key].append(time.perf_counter() - started)
+        self.statuses[key][status] += 1
+        return response
+
+
+def percentile(sorted_values, pct: float) -> float:
+    if not sorted_values: return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def summarize(recorder: Recorder, elapsed: float) -> dict:
+    summary = {}
+    for route, values in sorted(recorder.latencies.items()):
+        values = sorted(values)
+        summary[route] = {
+            "requests": len(values),
+            "statuses": {str(k): v for k, v in recorder.statuses[route].items()},
+            "p50_ms": percentile(values, 50) * 1000,
+            "p95_ms": percentile(values, 95) * 1000,
+            "p99_ms": percentile(values, 99) * 1000,
+            "throughput_rps": len(values) / elapsed if elapsed else 0.0,
+        }
+    return summary
+
+
+# -------------------------------
+# SCENARIOS
+# -------------------------------
+async def bounded(concurrency: int, coroutines):
+    semaphore = asyncio.Semaphore(concurrency)
+    async def run(coro):
+        async with semaphore: return await coro
+    return await asyncio.gather(*(run(c) for c in coroutines))
+
+
+async def shift_change(client, recorder, ctx, args):
+    """Morning burst: a crew clocks out of the night shift and the day crew clocks in."""
+    crew = ctx["rng"].sample(ctx["worker_ids"], min(args.burst, len(ctx["worker_ids"])))
+    await bounded(args.concurrency, [
+        recorder.request(client, "POST", "/clockout/", json={"worker_id": w, "project_id": ctx["project_of"](w)}) for w in crew
+    ])
+    await bounded(args.concurrency, [
+        recorder.request(client, "POST", "/clockin/", json={"worker_id": w, "project_id": ctx["project_of"](w)}) for w in crew
+    ])
+
+
+async def dashboard_polling(client, recorder, ctx, args):
+    """Dashboards refreshing while the burst is going on."""
+    async def dashboard():
+        for _ in range(args.polls):
+            await recorder.request(client, "GET", "/projects/")
+            await recorder.request(client, "GET", "/workers/")
+            await recorder.request(client, "GET", "/clock_entries/", params={"fields": DASHBOARD_FIELDS})
+            await asyncio.sleep(args.poll_interval)
+    await asyncio.gather(*(dashboard() for _ in range(args.dashboards)))
+
+
+async def offline_replay(client, recorder, ctx, args):
+    """Tablets coming back online and replaying queued punches with their original timestamps."""
+    async def device(worker_ids):
+        base = datetime.utcnow() - timedelta(hours=10)
+        for i, w in enumerate(worker_ids):
+            p = ctx["project_of"](w)
+            await recorder.request(client, "POST", "/clockout/", json={"worker_id": w, "project_id": p})
+            await recorder.request(client, "POST", "/clockin/", json={
+                "worker_id": w, "project_id": p, "timestamp": (base + timedelta(minutes=i)).isoformat() + "Z"})
+    sample = ctx["rng"].sample(ctx["worker_ids"], min(args.devices * args.replay_size, len(ctx["worker_ids"])))
+    chunks = [sample[i::args.devices] for i in range(args.devices)]
+    await asyncio.gather(*(device(c) for c in chunks if c))
+
+
+async def chatbot_queries(client, recorder, ctx, args):
+    names = ctx["rng"].sample(ctx["worker_names"], min(args.chats, len(ctx["worker_names"])))
+    names += ctx["project_names"][: max(1, args.chats // 10)]
+    await bounded(args.concurrency, [recorder.request(client, "POST", "/chatbot", json={"query": n}) for n in names])
+
+
+SCENARIOS = {
+    "shift_change": shift_change,
+    "dashboard_polling": dashboard_polling,
+    "offline_replay": offline_replay,
+    "chatbot": chatbot_queries,
+}
+
+
+async def run(args, main):
+    with main.SessionLocal() as db:
+        worker_rows = db.execute(select(main.WorkerDB.id, main.WorkerDB.name, main.WorkerDB.assigned_project_id)).all()
+        project_rows = db.execute(select(main.ProjectDB.id, main.ProjectDB.name)).all()
+    assigned = {w: p for w, _, p in worker_rows}
+    project_ids = [p for p, _ in project_rows]
+    ctx = {
+        "rng": random.Random(args.seed),
+        "worker_ids": list(assigned),
+        "project_ids": project_ids,
+        "worker_names": sorted({name for _, name, _ in worker_rows}),
+        "project_names": [name for _, name in project_rows],
+        "project_of": lambda w: assigned[w] or project_ids[0],
+    }
+    if args.base_url:
+        transport, base_url = None, args.base_url
+    else:
+        transport, base_url = httpx.ASGITransport(app=main.app), "http://loadtest"
+    results = {}
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=args.timeout) as client:
+        names = list(SCENARIOS) if args.scenario == "all" else [args.scenario]
+        if args.scenario == "all":
+            # the burst, the dashboards and the chatbot all hit the app at the same time
+            recorder, started = Recorder(), time.perf_counter()
+            await asyncio.gather(*(SCENARIOS[n](client, recorder, ctx, args) for n in names))
+            results["all"] = summarize(recorder, time.perf_counter() - started)
+        else:
+            recorder, started = Recorder(), time.perf_counter()
+            await SCENARIOS[args.scenario](client, recorder, ctx, args)
+            results[args.scenario] = summarize(recorder, time.perf_counter() - started)
+    return results
+
+
+def print_results(results: dict):
+    for scenario, routes in results.items():
+        print(f"\n== {scenario} ==")
+        print(f"{'route':<24}{'reqs':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}  statuses")
+        for route, r in routes.items():
+            statuses = ", ".join(f"{k}:{v}" for k, v in sorted(r["statuses"].items()))
+            print(f"{route:<24}{r['requests']:>7}{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}{r['p99_ms']:>10.1f}{r['throughput_rps']:>10.1f}  {statuses}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", choices=SIZES, default="10k", help="clock entries to seed before running")
+    parser.add_argument("--database-url", default=None, help="defaults to sqlite:///./bench_<size>.db")
+    parser.add_argument("--base-url", default=None, help="hit a running server instead of the in-process app")
+    parser.add_argument("--scenario", choices=["all", *SCENARIOS], default="all")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--burst", type=int, default=300, help="workers changing shift in the burst")
+    parser.add_argument("--dashboards", type=int, default=5)
+    parser.add_argument("--polls", type=int, default=3)
+    parser.add_argument("--poll-interval", type=float, default=1.0)
+    parser.add_argument("--devices", type=int, default=20, help="tablets replaying offline punches")
+    parser.add_argument("--replay-size", type=int, default=10, help="queued punches per tablet")
+    parser.add_argument("--chats", type=int, default=50)
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", dest="json_path", default=None, help="also write the results to this file")
+    args = parser.parse_args()
+
+    # main.py binds its engine at import time, so the URL has to be set first
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///./bench_{args.size}.db"
+    import main as app_main
+
+    started = time.perf_counter()
+    seeded = seed_database(app_main, SIZES[args.size], seed=args.seed)
+    print(f"database {os.environ['DATABASE_URL']}: {seeded:,} clock entries (ready in {time.perf_counter() - started:.1f}s)")
+    results = asyncio.run(run(args, app_main))
+    print_results(results)
+    if args.json_path:
+        with open(args.json_path, "w") as fh:
+            json.dump({"size": args.size, "database_url": os.environ["DATABASE_URL"], "results": results}, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
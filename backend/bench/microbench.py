@@ -0,0 +1,164 @@
+"""Micro-benchmarks for the ORM hot paths in main.py, with stored JSON baselines.
+
+    python -m bench.microbench run --save before          # writes bench/baselines/before.json
+    python -m bench.microbench compare before             # re-runs and fails on >10% median regressions
+    python -m bench.microbench compare before after.json --threshold 0.05
+
+Each benchmark calls the real helper from main.py against a database generated with
+bench.datagen (regenerated when it holds fewer than --entries rows). Timing follows
+pytest-benchmark: calibrate iterations per round to --min-time, then report
+min/max/mean/median/stddev/ops over --rounds rounds.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+
+BASELINE_DIR = os.path.join(os.path.dirname(__file__), "baselines")
+
+
+# -------------------------------
+# BENCHMARKS
+# -------------------------------
+def build_benchmarks(main, db, sample_size: int = 200):
+    from sqlalchemy import func, select
+    from sqlalchemy.orm import joinedload
+    worker_ids = db.execute(select(main.WorkerDB.id).order_by(func.random()).limit(sample_size)).scalars().all()
+    names = db.execute(select(main.WorkerDB.name).order_by(func.random()).limit(sample_size)).scalars().all()
+    entries = db.query(main.ClockEntryDB).options(joinedload(main.ClockEntryDB.worker), joinedload(main.ClockEntryDB.project)).limit(sample_size).all()
+    credentials = main.LoginRequest(username="manager1", password="manager123")
+    worker_cycle, name_cycle, entry_cycle = itertools.cycle(worker_ids), itertools.cycle(names), itertools.cycle(entries)
+    return {
+        "active_entry_lookup": lambda: main.active_entry(db, next(worker_cycle)),
+        "clock_entry_response": lambda: main.to_response(next(entry_cycle)),
+        "chatbot_name_search": lambda: main.find_by_name(db, next(name_cycle).lower()),
+        "get_projects_status_filter": lambda: main.get_projects(status="active", fields=None, db=db),
+        "login_lookup": lambda: main.login(credentials, db),
+    }
+
+
+def time_benchmark(fn, rounds: int, min_time: float) -> dict:
+    fn()  # warm caches and compiled statements
+    iterations = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(iterations): fn()
+        if time.perf_counter() - started >= min_time or iterations >= 1 << 20: break
+        iterations *= 2
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for _ in range(iterations): fn()
+        samples.append((time.perf_counter() - started) / iterations)
+    mean = statistics.fmean(samples)
+    return {
+        "min": min(samples), "max": max(samples), "mean": mean, "median": statistics.median(samples),
+        "stddev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "ops": 1 / mean if mean else 0.0, "rounds": rounds, "iterations": iterations,
+    }
+
+
+def run_benchmarks(args) -> dict:
+    os.environ["DATABASE_URL"] = args.database_url  # main.py binds its engine at import time
+    import main
+    from bench import datagen
+    from sqlalchemy import func, select
+    with main.engine.connect() as conn:
+        existing = conn.execute(select(func.count()).select_from(main.ClockEntryDB)).scalar()
+    if existing < args.entries * 0.9:
+        datagen.generate(main, datagen.Config(seed=0, **datagen.plan_for_entries(args.entries)), reset=True)
+    results = []
+    with main.SessionLocal() as db:
+        for name, fn in build_benchmarks(main, db).items():
+            if args.only and name not in args.only: continue
+            stats = time_benchmark(fn, args.rounds, args.min_time)
+            results.append({"name": name, "stats": stats})
+            print(f"{name:<30}{stats['median'] * 1e6:>12.1f} us median{stats['ops']:>14,.0f} ops/s", file=sys.stderr)
+    return {
+        "machine_info": {"python": platform.python_version(), "platform": platform.platform(), "processor": platform.processor()},
+        "datetime": datetime.now().isoformat(),
+        "database_url": args.database_url,
+        "entries": args.entries,
+        "benchmarks": results,
+    }
+
+
+# -------------------------------
+# BASELINES
+# -------------------------------
+def baseline_path(name_or_path: str) -> str:
+    if name_or_path.endswith(".json") or os.sep in name_or_path: return name_or_path
+    return os.path.join(BASELINE_DIR, f"{name_or_path}.json")
+
+
+def save(report: dict, name_or_path: str) -> str:
+    path = baseline_path(name_or_path)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as fh: json.dump(report, fh, indent=2)
+    return path
+
+
+def load(name_or_path: str) -> dict:
+    with open(baseline_path(name_or_path)) as fh: return json.load(fh)
+
+
+def compare(baseline: dict, current: dict, threshold: float, stat: str = "median") -> list:
+    """Rows of (name, baseline, current, change); change is None for benchmarks missing on one side."""
+    before = {b["name"]: b["stats"][stat] for b in baseline["benchmarks"]}
+    after = {b["name"]: b["stats"][stat] for b in current["benchmarks"]}
+    rows = []
+    for name in sorted(before.keys() | after.keys()):
+        if name in before and name in after:
+            rows.append((name, before[name], after[name], after[name] / before[name] - 1))
+        else:
+            rows.append((name, before.get(name), after.get(name), None))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default="sqlite:///./bench_micro.db")
+    parser.add_argument("--entries", type=int, default=100_000)
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--min-time", type=float, default=0.05, help="seconds per round")
+    parser.add_argument("--only", nargs="*", default=None, help="benchmark names to run")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_cmd = commands.add_parser("run", help="run the benchmarks")
+    run_cmd.add_argument("--save", default=None, help="baseline name (bench/baselines/<name>.json) or path")
+    compare_cmd = commands.add_parser("compare", help="compare against a stored baseline")
+    compare_cmd.add_argument("baseline")
+    compare_cmd.add_argument("current", nargs="?", default=None, help="stored results to compare; re-runs when omitted")
+    compare_cmd.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown, 0.10 = 10%%")
+    compare_cmd.add_argument("--stat", default="median", choices=["min", "mean", "median"])
+    args = parser.parse_args()
+
+    if args.command == "run":
+        report = run_benchmarks(args)
+        if args.save: print(f"saved {save(report, args.save)}", file=sys.stderr)
+        else: print(json.dumps(report, indent=2))
+        return
+
+    baseline = load(args.baseline)
+    current = load(args.current) if args.current else run_benchmarks(args)
+    regressions = 0
+    print(f"{'benchmark':<30}{'baseline us':>14}{'current us':>14}{'change':>10}")
+    for name, before, after, change in compare(baseline, current, args.threshold, args.stat):
+        if change is None:
+            print(f"{name:<30}{'-' if before is None else f'{before * 1e6:.1f}':>14}{'-' if after is None else f'{after * 1e6:.1f}':>14}{'n/a':>10}")
+            continue
+        flag = ""
+        if change > args.threshold:
+            regressions += 1; flag = "  REGRESSION"
+        print(f"{name:<30}{before * 1e6:>14.1f}{after * 1e6:>14.1f}{change:>+10.1%}{flag}")
+    if regressions:
+        print(f"{regressions} benchmark(s) slower than the baseline by more than {args.threshold:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
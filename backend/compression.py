@@ -0,0 +1,134 @@
+"""Response compression middleware (gzip / brotli).
+
+The encoding is negotiated from Accept-Encoding (brotli is preferred when the
+optional ``brotli`` package is installed). Bodies smaller than ``minimum_size`` are
+sent as-is. Streamed responses are compressed chunk by chunk and flushed after each
+chunk, so only the first ``minimum_size`` bytes are ever held back.
+"""
+import zlib
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+
+def parse_accept_encoding(header: str) -> dict:
+    encodings = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        if not name: continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try: q = float(value)
+                except ValueError: q = 0.0
+        encodings[name.strip().lower()] = q
+    return encodings
+
+
+def negotiate(header: str):
+    accepted = parse_accept_encoding(header)
+    wildcard = accepted.get("*", 0.0)
+    candidates = (["br"] if brotli is not None else []) + ["gzip"]
+    best, best_q = None, 0.0
+    for name in candidates:
+        q = accepted.get(name, wildcard)
+        if q > best_q: best, best_q = name, q
+    return best
+
+
+class Compressor:
+    def __init__(self, encoding: str, gzip_level: int = 6, brotli_quality: int = 4):
+        self.encoding = encoding
+        if encoding == "br":
+            self._br = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._gz = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)  # wbits 31 = gzip container
+
+    def compress(self, data: bytes) -> bytes:
+        """Compress a chunk and flush it so the client can decode it right away."""
+        if self.encoding == "br":
+            return self._br.process(data) + self._br.flush()
+        return self._gz.compress(data) + self._gz.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        if self.encoding == "br":
+            return self._br.process(data) + self._br.finish()
+        return self._gz.compress(data) + self._gz.flush(zlib.Z_FINISH)
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send); return
+        accept = next((v.decode("latin-1") for k, v in scope["headers"] if k == b"accept-encoding"), "")
+        encoding = negotiate(accept)
+        if encoding is None:
+            await self.app(scope, receive, send); return
+        responder = _CompressedResponder(send, encoding, self)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressedResponder:
+    def __init__(self, send, encoding: str, config: CompressionMiddleware):
+        self._send = send
+        self.encoding = encoding
+        self.config = config
+        self.start = None
+        self.buffer = b""
+        self.compressor = None
+        self.passthrough = False
+
+    async def send(self, message):
+        if message["type"] == "http.response.start":
+            self.start = message
+            self.passthrough = any(k == b"content-encoding" for k, _ in message.get("headers", []))
+            return
+        if message["type"] != "http.response.body":
+            await self._send(message); return
+        if self.passthrough:
+            await self._flush_start(); await self._send(message); return
+
+        body, more_body = message.get("body", b""), message.get("more_body", False)
+        if self.compressor is None:
+            self.buffer += body
+            if not more_body and len(self.buffer) < self.config.minimum_size:
+                self.passthrough = True
+                await self._flush_start()
+                await self._send({"type": "http.response.body", "body": self.buffer})
+                return
+            if more_body and len(self.buffer) < self.config.minimum_size:
+                return  # keep collecting until we know the response is worth compressing
+            body, self.buffer = self.buffer, b""
+            self.compressor = Compressor(self.encoding, self.config.gzip_level, self.config.brotli_quality)
+            if not more_body:
+                payload = self.compressor.finish(body)
+                await self._flush_start(content_length=len(payload))
+                await self._send({"type": "http.response.body", "body": payload})
+                return
+            await self._flush_start()
+        if more_body:
+            chunk = self.compressor.compress(body)
+            if chunk: await self._send({"type": "http.response.body", "body": chunk, "more_body": True})
+        else:
+            await self._send({"type": "http.response.body", "body": self.compressor.finish(body)})
+
+    async def _flush_start(self, content_length=None):
+        start, self.start = self.start, None
+        if start is None: return
+        if self.compressor is not None:
+            headers = [(k, v) for k, v in start.get("headers", []) if k not in (b"content-length", b"vary")]
+            vary = [v for k, v in start.get("headers", []) if k == b"vary"]
+            headers.append((b"content-encoding", self.encoding.encode()))
+            headers.append((b"vary", b", ".join(vary + [b"Accept-Encoding"])))
+            if content_length is not None: headers.append((b"content-length", str(content_length).encode()))
+            start = {**start, "headers": headers}
+        await self._send(start)
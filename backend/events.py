@@ -0,0 +1,39 @@
+"""In-process event bus.
+
+Code that changes clock data publishes a topic with a payload after its transaction
+commits; caches and background jobs subscribe to the topics they care about.
+
+    events.subscribe("clock_entry.auto_closed", handler)    # handler(topic, payload)
+    events.publish("clock_entry.auto_closed", entry_id=1, worker_id=7)
+
+Handlers run synchronously in the publishing thread, so they must be quick. A handler
+that raises is logged and skipped; it never fails the publisher. Subscribing to "*"
+receives every topic.
+"""
+import logging
+import threading
+from collections import defaultdict
+
+log = logging.getLogger("events")
+_subscribers = defaultdict(list)
+_lock = threading.Lock()
+
+
+def subscribe(topic: str, handler=None):
+    """Register handler(topic, payload) for topic; usable as a decorator."""
+    def register(fn):
+        with _lock: _subscribers[topic].append(fn)
+        return fn
+    return register(handler) if handler else register
+
+
+def unsubscribe(topic: str, handler):
+    with _lock:
+        if handler in _subscribers[topic]: _subscribers[topic].remove(handler)
+
+
+def publish(topic: str, **payload):
+    with _lock: handlers = _subscribers[topic] + _subscribers["*"]
+    for handler in handlers:
+        try: handler(topic, payload)
+        except Exception: log.exception("event handler %r failed for %s", handler, topic)
@@ -0,0 +1,202 @@
+"""Typo-tolerant name lookup for the chatbot.
+
+An in-memory index per entity kind over distinct normalized names (lowercase, accents
+and extra whitespace removed). Names are split into words; the distinct words get a
+trigram index, and each word a posting list of the names holding it, all in
+append-only ``array``s, so adding a name is a few appends. A lookup:
+
+1. finds, for each query word, the known words within about one typo per four
+   characters: candidates share the most trigrams with it (counted with numpy over
+   the posting lists), and the best ``CANDIDATES`` get an exact edit distance against
+   their closest substring, so "ravi" matches "ravindra" at 0 and "kumr" "kumar" at 1
+2. intersects the names holding a match for every query word, scoring each name by
+   the sum of those distances
+3. ranks by distance, then by closeness in length to the query; each result also
+   carries its trigram similarity (Jaccard) to the query
+
+Names are only ever added (the app has no rename or delete), so an index is kept
+current by loading rows with ids above the last one it has seen; see ``sync``.
+
+Needs numpy (pip install numpy).
+"""
+import re
+import threading
+import unicodedata
+from array import array
+
+CANDIDATES = 64
+
+
+def normalize(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+def trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def max_distance(word: str) -> int:
+    return 0 if len(word) < 3 else min(3, max(1, len(word) // 4))
+
+
+def substring_distance(query: str, text: str) -> int:
+    """Edit distance between query and the substring of text closest to it.
+
+    Myers' bit-parallel algorithm: one column of the edit-distance matrix per character
+    of text, held as bit vectors over the query, so it's O(len(text)) integer ops."""
+    if query in text: return 0
+    m = len(query)
+    if not m: return 0
+    mask, high = (1 << m) - 1, 1 << (m - 1)
+    peq = {}
+    for i, c in enumerate(query): peq[c] = peq.get(c, 0) | (1 << i)
+    pv, mv, score = mask, 0, m
+    best = m
+    for c in text:
+        eq = peq.get(c, 0)
+        xv = eq | mv
+        xh = ((((eq & pv) + pv) & mask) ^ pv) | eq
+        ph = mv | (~(xh | pv) & mask)
+        mh = pv & xh
+        if ph & high: score += 1
+        elif mh & high: score -= 1
+        ph, mh = (ph << 1) & mask, (mh << 1) & mask  # no carry in: a match may start anywhere in text
+        pv = mh | (~(xv | ph) & mask)
+        mv = ph & xv
+        if score < best: best = score
+    return best
+
+
+class TrigramIndex:
+    """Distinct strings with a trigram posting list each, for candidate generation."""
+
+    def __init__(self):
+        self.strings = []
+        self.numbers = {}  # string -> its number
+        self.postings = {}  # trigram -> array of string numbers
+        self.sizes = array("H")  # trigram count per string
+
+    def __len__(self):
+        return len(self.strings)
+
+    def add(self, text: str) -> int:
+        number = self.numbers.get(text)
+        if number is None:
+            number = self.numbers[text] = len(self.strings)
+            self.strings.append(text)
+            grams = trigrams(text)
+            for gram in grams: self.postings.setdefault(gram, array("i")).append(number)
+            self.sizes.append(min(len(grams), 65535))
+        return number
+
+    def search(self, text: str, allowed: int) -> list:
+        """[(string number, edit distance)] of strings within `allowed` edits of a substring, closest first."""
+        import numpy as np
+        grams = trigrams(text)
+        lists = [np.frombuffer(self.postings[g], dtype=np.int32) for g in grams if g in self.postings]
+        if not lists: return []
+        hits = np.concatenate(lists)
+        if len(hits) * 8 < len(self.strings):
+            numbers, shared = np.unique(hits, return_counts=True)
+        else:
+            counts = np.bincount(hits, minlength=len(self.strings))
+            numbers = np.flatnonzero(counts)
+            shared = counts[numbers]
+        sizes = np.frombuffer(self.sizes, dtype=np.uint16)[numbers]
+        # containment first (a string holding the whole text is a match however long), then similarity
+        rank = shared + shared / (len(grams) + sizes - shared) * 0.5
+        if len(numbers) > CANDIDATES: numbers = numbers[np.argpartition(-rank, CANDIDATES)[:CANDIDATES]]
+        found = []
+        for number in numbers.tolist():
+            d = substring_distance(text, self.strings[number])
+            if d <= allowed: found.append((number, d))
+        return sorted(found, key=lambda f: f[1])
+
+
+class NameIndex:
+    """Names of one entity kind, searchable word by word with typos.
+
+    Each query word is matched against the distinct words of all names (a small
+    TrigramIndex), and the names containing a match for every query word are found by
+    intersecting per-word posting lists. A name's distance is the sum of its words'
+    edit distances to the query words."""
+
+    def __init__(self):
+        self.names = []  # distinct normalized names, by name number
+        self.display = []  # the name as first seen
+        self.ids = []  # entity ids per name number
+        self.numbers = {}  # normalized name -> name number
+        self.lengths = array("H")
+        self.words = TrigramIndex()
+        self.names_by_word = []  # word number -> array of name numbers
+        self.last_id = 0
+        self.lock = threading.Lock()
+        self.sync_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.names)
+
+    def add(self, entity_id: int, name: str):
+        key = normalize(name or "")
+        with self.lock:
+            self.last_id = max(self.last_id, entity_id)
+            if not key: return
+            number = self.numbers.get(key)
+            if number is None:
+                number = self.numbers[key] = len(self.names)
+                self.names.append(key); self.display.append(name); self.ids.append([])
+                self.lengths.append(min(len(key), 65535))
+                for word in set(key.split()):
+                    w = self.words.add(word)
+                    if w == len(self.names_by_word): self.names_by_word.append(array("i"))
+                    self.names_by_word[w].append(number)
+            self.ids[number].append(entity_id)
+
+    def sync(self, fetch_after):
+        """Add the rows fetch_after(last_id) returns as (id, name), i.e. anything created since the last sync."""
+        with self.sync_lock:
+            for entity_id, name in fetch_after(self.last_id): self.add(entity_id, name)
+
+    def search(self, query: str, limit: int = 5) -> list:
+        """[(entity id, name, edit distance, similarity)] best first, at most `limit` entries."""
+        import numpy as np
+        key = normalize(query)
+        words = list(dict.fromkeys(key.split()))[:6]
+        if not words: return []
+        with self.lock:
+            matched = []
+            for word in words:
+                found = self.words.search(word, max_distance(word))[:16]
+                if not found: return []
+                names = np.concatenate([np.frombuffer(self.names_by_word[w], dtype=np.int32) for w, _ in found])
+                dist = np.concatenate([np.full(len(self.names_by_word[w]), d, dtype=np.int32) for w, d in found])
+                # a name holding several matching words keeps the closest
+                order = np.lexsort((dist, names))
+                names, dist = names[order], dist[order]
+                first = np.concatenate([[True], names[1:] != names[:-1]])
+                matched.append((names[first], dist[first]))
+            matched.sort(key=lambda m: len(m[0]))
+            names, dist = matched[0]
+            for other, other_dist in matched[1:]:
+                names, i, j = np.intersect1d(names, other, assume_unique=True, return_indices=True)
+                dist = dist[i] + other_dist[j]
+                if not len(names): return []
+            # closest, then nearest in length to the query
+            rank = dist * 65536 + np.abs(np.frombuffer(self.lengths, dtype=np.uint16)[names].astype(np.int64) - len(key))
+            if len(names) > CANDIDATES:
+                top = np.argpartition(rank, CANDIDATES)[:CANDIDATES]
+                names, dist, rank = names[top], dist[top], rank[top]
+            best = [(int(r), int(d), int(n)) for r, d, n in zip(rank, dist, names)]
+            best = [(r, d, self.names[n], self.display[n], list(self.ids[n])) for r, d, n in sorted(best)]
+        grams = trigrams(key)
+        results = []
+        for _, d, name, display, ids in best:
+            other = trigrams(name)
+            similarity = round(len(grams & other) / len(grams | other), 3)
+            for entity_id in sorted(ids):
+                results.append((entity_id, display, d, similarity))
+                if len(results) >= limit: return results
+        return results
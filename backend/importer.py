@@ -0,0 +1,190 @@
+"""Streaming bulk import of workers from CSV or JSON Lines.
+
+Records are parsed one at a time from a text stream, validated, and inserted in
+batches with a single executemany per batch. Each batch commits together with its
+checkpoint in ``worker_imports`` (last line number handled, counts), so an import that
+dies halfway can be resumed with the same import id: lines up to the checkpoint are
+skipped, and no row is inserted twice.
+
+Columns: ``name`` and ``role`` (required), ``assigned_project_id`` (optional, must be an
+existing project). Other columns are ignored. Rows that fail validation are skipped and
+reported with their line number.
+
+    python -m importer workers.csv
+    python -m importer workers.jsonl --import-id onboarding-acme --errors errors.jsonl
+
+Uploads go through POST /workers/import (see main.py).
+"""
+import csv
+import io
+import json
+import time
+import uuid
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, insert, select, update
+
+BATCH_SIZE = 5_000
+MAX_REPORTED_ERRORS = 1_000
+FORMATS = ("csv", "jsonl")
+
+metadata = MetaData()
+imports = Table(
+    "worker_imports", metadata,
+    Column("id", String, primary_key=True),
+    Column("format", String, nullable=False),
+    Column("line", Integer, nullable=False, default=0),  # last line number committed
+    Column("inserted", Integer, nullable=False, default=0),
+    Column("failed", Integer, nullable=False, default=0),
+    Column("status", String, nullable=False),  # running | done | failed
+    Column("created_at", DateTime, nullable=False),
+    Column("updated_at", DateTime, nullable=False),
+)
+
+
+def read_records(stream, fmt: str):
+    """(line number, record or error message) for each record of a text stream."""
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record
+    elif fmt == "jsonl":
+        for line_no, line in enumerate(stream, 1):
+            if not line.strip(): continue
+            try: record = json.loads(line)
+            except ValueError as exc: yield line_no, f"invalid JSON: {exc}"; continue
+            yield line_no, record if isinstance(record, dict) else "expected a JSON object"
+    else:
+        raise ValueError(f"unknown format {fmt!r}, expected one of {', '.join(FORMATS)}")
+
+
+def validate(record: dict, project_ids: set):
+    """(row, None) for a valid record, (None, [errors]) otherwise."""
+    errors = []
+    name = str(record.get("name") or "").strip()
+    role = str(record.get("role") or "").strip()
+    if not name: errors.append("name is required")
+    elif len(name) > 200: errors.append("name is longer than 200 characters")
+    if not role: errors.append("role is required")
+    project_id = record.get("assigned_project_id")
+    if project_id in (None, ""):
+        project_id = None
+    else:
+        try: project_id = int(project_id)
+        except (TypeError, ValueError): errors.append(f"assigned_project_id {project_id!r} is not a number"); project_id = None
+        else:
+            if project_id not in project_ids: errors.append(f"project {project_id} does not exist")
+    if errors: return None, errors
+    return {"name": name, "role": role, "assigned_project_id": project_id}, None
+
+
+def start(engine, import_id: str, fmt: str) -> dict:
+    """The checkpoint for import_id, created if new."""
+    metadata.create_all(bind=engine)
+    now = datetime.now()
+    with engine.begin() as conn:
+        row = conn.execute(select(imports).where(imports.c.id == import_id)).mappings().first()
+        if row is None:
+            conn.execute(insert(imports).values(id=import_id, format=fmt, line=0, inserted=0, failed=0, status="running", created_at=now, updated_at=now))
+            row = conn.execute(select(imports).where(imports.c.id == import_id)).mappings().first()
+        else:
+            conn.execute(update(imports).where(imports.c.id == import_id).values(status="running", updated_at=now))
+    return dict(row)
+
+
+def checkpoint(import_id: str, line: int, inserted: int, failed: int, status: str = "running"):
+    """The UPDATE to run in the same transaction as a batch's INSERT."""
+    return update(imports).where(imports.c.id == import_id).values(
+        line=line, inserted=imports.c.inserted + inserted, failed=imports.c.failed + failed, status=status, updated_at=datetime.now(),
+    )
+
+
+def run(stream, fmt: str, engine, write_batch, project_ids: set, import_id: str = None, batch_size: int = BATCH_SIZE,
+        max_errors: int = MAX_REPORTED_ERRORS) -> dict:
+    """Import workers from stream. write_batch(rows, checkpoint_stmt) must insert rows and
+    execute checkpoint_stmt in one transaction. Returns a summary with the first
+    max_errors errors (all of them when None)."""
+    import_id = import_id or uuid.uuid4().hex
+    resume_after = start(engine, import_id, fmt)["line"]
+    started = time.perf_counter()
+    batch, batch_failed, errors = [], 0, []
+    totals = {"inserted": 0, "failed": 0, "skipped": 0}
+    line_no = resume_after
+    def flush(last_line: int, status: str = "running"):
+        nonlocal batch, batch_failed
+        write_batch(batch, checkpoint(import_id, last_line, len(batch), batch_failed, status))
+        totals["inserted"] += len(batch); totals["failed"] += batch_failed
+        batch, batch_failed = [], 0
+    try:
+        for line_no, record in read_records(stream, fmt):
+            if line_no <= resume_after:
+                totals["skipped"] += 1; continue
+            row, problems = (None, [record]) if isinstance(record, str) else validate(record, project_ids)
+            if row is None:
+                batch_failed += 1
+                if max_errors is None or len(errors) < max_errors: errors.append({"line": line_no, "errors": problems})
+                continue
+            batch.append(row)
+            if len(batch) >= batch_size: flush(line_no)
+        flush(max(line_no, resume_after), "done")
+    except Exception:
+        with engine.begin() as conn:
+            conn.execute(update(imports).where(imports.c.id == import_id).values(status="failed", updated_at=datetime.now()))
+        raise
+    elapsed = time.perf_counter() - started
+    return {
+        "import_id": import_id, "status": "done", **totals, "resumed_after_line": resume_after,
+        "seconds": round(elapsed, 3), "rows_per_second": round((totals["inserted"] + totals["failed"]) / elapsed) if elapsed else None,
+        "errors": errors, "errors_truncated": totals["failed"] > len(errors),
+    }
+
+
+ABORT = object()  # queued instead of None when the upload broke off
+
+
+class QueueReader(io.RawIOBase):
+    """A readable binary stream fed with chunks from a queue.Queue (None ends it), for
+    parsing an upload in a worker thread while it is still arriving. ABORT makes the
+    read fail, so a truncated upload is never mistaken for a complete one."""
+
+    def __init__(self, chunks):
+        self.chunks, self.pending, self.eof = chunks, b"", False
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self.pending and not self.eof:
+            chunk = self.chunks.get()
+            if chunk is ABORT: raise ConnectionAbortedError("the upload was interrupted")
+            if chunk is None: self.eof = True
+            else: self.pending = memoryview(chunk)
+        n = min(len(buffer), len(self.pending))
+        buffer[:n], self.pending = self.pending[:n], self.pending[n:]
+        return n
+
+
+def main():
+    import argparse
+    import sys
+    import main as app
+    parser = argparse.ArgumentParser(description="Bulk import workers from CSV or JSON Lines")
+    parser.add_argument("path", help="file to import, - for stdin")
+    parser.add_argument("--format", choices=FORMATS, default=None, help="default: from the file extension")
+    parser.add_argument("--import-id", default=None, help="checkpoint id; re-run with the same id to resume (default: the file name)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--errors", default=None, help="write rejected lines as JSON Lines to this file")
+    args = parser.parse_args()
+    fmt = args.format or ("jsonl" if args.path.endswith((".jsonl", ".ndjson")) else "csv")
+    stream = sys.stdin if args.path == "-" else open(args.path, newline="", encoding="utf-8-sig")
+    with stream:
+        summary = app.import_workers_from(stream, fmt, args.import_id or (None if args.path == "-" else args.path), args.batch_size,
+                                          max_errors=None if args.errors else 0)
+    if args.errors:
+        with open(args.errors, "w") as fh:
+            for error in summary["errors"]: fh.write(json.dumps(error) + "\n")
+    print(json.dumps({k: v for k, v in summary.items() if k != "errors"}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""Intent parsing for the chatbot.
+
+Questions are matched against regular expressions compiled once at import, each tied
+to an intent that main.py answers with one parameterized aggregate query:
+
+    hours Ravi worked last week          -> hours_worked    (worker, window)
+    how many hours on Skyline this month -> project_hours   (project, window)
+    who is on Skyline right now          -> active_workers  (project)
+    top 5 workers on Skyline last month  -> top_workers     (n, project or None, window)
+
+Names are left as free text for the fuzzy lookup (fuzzy.py). Windows are local days
+[start, end); without one, questions about hours cover the last 7 days including today.
+
+``PlanCache`` keeps each intent's statement, built on first use, so repeat questions
+skip statement construction and hit SQLAlchemy's compiled-statement cache.
+
+``AnswerCache`` keeps whole answers by ``cache_key`` (question and day), each tagged
+with what it read, e.g. ("worker", 7) or ("names", "project"); main.py drops the
+answers holding a tag when a write publishes a change to it. Events only reach the
+process that published them, so each answer also keeps the clock event watermark it
+was read at, re-checked on every hit, and expires after ``ttl`` seconds.
+
+``Suggestions`` holds the prompts the chat page opens with, phrased so they parse:
+hours this week for recently active workers, who is on site for the busiest projects.
+"""
+import re
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Optional
+
+WINDOW = r"today|yesterday|this week|last week|this month|last month|(?:in )?(?:the )?(?:last|past) \d+ days"
+TAIL = rf"(?:\s+(?P<window>{WINDOW}))?"
+
+PATTERNS = [(intent, re.compile(pattern)) for intent, pattern in [
+    ("active_workers", r"^(?:who|which workers)(?:'s| is| are)? (?:currently |now )?(?:on|at|working on|working at|clocked in (?:on|at)) (?P<name>.+?)(?:\s+(?:right now|now|currently|today))?$"),
+    ("top_workers", rf"^(?:top|most active|busiest)(?: (?P<n>\d+))? workers?(?: by hours)?(?: (?:on|at|for) (?P<name>.+?))?{TAIL}$"),
+    ("project_hours", rf"^(?:how many |total )?hours (?:on|at|for) (?:project )?(?P<name>.+?){TAIL}$"),
+    ("hours_worked", rf"^(?:how many )?hours (?:did |has |have )?(?P<name>.+?) (?:work|worked|log|logged){TAIL}$"),
+    ("hours_worked", rf"^(?:how many )?hours (?:worked|logged) by (?P<name>.+?){TAIL}$"),
+    ("hours_worked", rf"^how (?:long|much) (?:did |has )?(?P<name>.+?) (?:work|worked){TAIL}$"),
+]]
+DEFAULT_TOP = 5
+MAX_TOP = 50
+
+
+@dataclass
+class Intent:
+    name: str
+    subject: Optional[str] = None  # worker or project name as typed
+    start: Optional[date] = None
+    end: Optional[date] = None
+    window: str = "in the last 7 days"
+    n: int = DEFAULT_TOP
+
+
+def normalize(text: str) -> str:
+    text = re.sub(r"[?!.,;:]+", " ", text.lower())
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def window(text: Optional[str], today: date):
+    """(start, end, label) of a window phrase; the last 7 days when there's none."""
+    monday = today - timedelta(days=today.weekday())
+    first = today.replace(day=1)
+    if text == "today": return today, today + timedelta(days=1), "today"
+    if text == "yesterday": return today - timedelta(days=1), today, "yesterday"
+    if text == "this week": return monday, today + timedelta(days=1), "this week"
+    if text == "last week": return monday - timedelta(days=7), monday, "last week"
+    if text == "this month": return first, today + timedelta(days=1), "this month"
+    if text == "last month": return (first - timedelta(days=1)).replace(day=1), first, "last month"
+    days = int(re.search(r"\d+", text).group()) if text else 7
+    return today - timedelta(days=days - 1), today + timedelta(days=1), f"in the last {days} days"
+
+
+def parse(question: str, today: date) -> Optional[Intent]:
+    """The intent of a question, or None when no pattern matches."""
+    text = normalize(question)
+    for name, pattern in PATTERNS:
+        match = pattern.match(text)
+        if not match: continue
+        groups = match.groupdict()
+        start, end, label = window(groups.get("window"), today)
+        n = min(int(groups["n"]), MAX_TOP) if groups.get("n") else DEFAULT_TOP
+        return Intent(name, groups.get("name"), start, end, label, n)
+    return None
+
+
+class PlanCache:
+    """Statements per intent, built once by the builder passed on first use."""
+
+    def __init__(self):
+        self.plans = {}
+        self.lock = threading.Lock()
+        self.stats = {}
+
+    def get(self, name: str, build):
+        plan = self.plans.get(name)
+        stats = self.stats.setdefault(name, {"builds": 0, "uses": 0})
+        if plan is None:
+            with self.lock:
+                plan = self.plans.get(name)
+                if plan is None:
+                    plan = self.plans[name] = build()
+                    stats["builds"] += 1
+        stats["uses"] += 1
+        return plan
+
+
+def cache_key(question: str) -> str:
+    """The question with case, repeated whitespace and trailing punctuation dropped; the
+    chatbot answers this form, so questions with the same key get the same answer."""
+    return re.sub(r"\s+", " ", question.lower()).strip().rstrip("?!. ")
+
+
+class AnswerCache:
+    """Answers by key, least recently used evicted past `size`, dropped by tag.
+
+    A reader takes ``version()`` before computing an answer and passes it to ``put``,
+    which refuses the answer if one of its tags was invalidated in between: a write
+    that committed while the answer was being read may or may not be in it.
+
+    ``get`` drops an answer older than `ttl` seconds, or one that ``is_stale(watermark,
+    tags)`` says changed after the watermark given to ``put``: writes made by other
+    processes, whose invalidations this one never sees."""
+
+    def __init__(self, size: int = 2048, ttl: float = None):
+        self.size, self.ttl = size, ttl
+        self.answers = OrderedDict()  # key -> (answer, tags, watermark, stored at)
+        self.keys_by_tag = defaultdict(set)
+        self.invalidated = {}  # tag -> version at its last invalidation
+        self.clock = 0
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "stored": 0, "stale": 0, "invalidated": 0, "expired": 0, "evicted": 0}
+
+    def __len__(self):
+        return len(self.answers)
+
+    def version(self) -> int:
+        return self.clock
+
+    def get(self, key, is_stale=None):
+        with self.lock: found = self.answers.get(key)
+        if found is not None:
+            answer, tags, watermark, stored = found
+            expired = self.ttl is not None and time.monotonic() - stored > self.ttl
+            # outside the lock: is_stale usually queries the database
+            if expired or (is_stale is not None and watermark is not None and is_stale(watermark, tags)):
+                with self.lock:
+                    if self.answers.get(key) is found and self._drop(key): self.stats["expired"] += 1
+                found = None
+        with self.lock:
+            if found is None:
+                self.stats["misses"] += 1
+                return None
+            if key in self.answers: self.answers.move_to_end(key)
+            self.stats["hits"] += 1
+            return answer
+
+    def put(self, key, answer, tags, version: int, watermark=None) -> bool:
+        tags = frozenset(tags)
+        with self.lock:
+            if any(self.invalidated.get(tag, -1) > version for tag in tags | {"*"}):
+                self.stats["stale"] += 1
+                return False
+            self._drop(key)
+            self.answers[key] = (answer, tags, watermark, time.monotonic())
+            for tag in tags: self.keys_by_tag[tag].add(key)
+            while len(self.answers) > self.size:
+                self._drop(next(iter(self.answers)))
+                self.stats["evicted"] += 1
+            self.stats["stored"] += 1
+            return True
+
+    def invalidate(self, *tags):
+        """Drop every answer holding one of the tags; "*" drops them all."""
+        with self.lock:
+            self.clock += 1
+            for tag in tags:
+                self.invalidated[tag] = self.clock
+                keys = list(self.answers) if tag == "*" else self.keys_by_tag.pop(tag, ())
+                for key in keys:
+                    if self._drop(key): self.stats["invalidated"] += 1
+
+    def _drop(self, key) -> bool:
+        found = self.answers.pop(key, None)
+        if found is None: return False
+        for tag in found[1]:
+            keys = self.keys_by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys: del self.keys_by_tag[tag]
+        return True
+
+
+class Suggestions:
+    """The `size` most recently active workers and busiest projects, as suggested prompts.
+
+    ``refresh`` replaces both lists (main.py reads them from the projections when they're
+    older than `ttl` seconds); in between, ``touch`` moves a worker who just punched to the
+    front, so the list stays current without a query."""
+
+    def __init__(self, size: int = 10, ttl: float = 300):
+        self.size, self.ttl = size, ttl
+        self.workers = OrderedDict()  # worker id -> name, most recently active last
+        self.projects = []  # [(project id, name)], busiest first
+        self.refreshed = None
+        self.lock = threading.Lock()
+        self.refresh_lock = threading.Lock()
+
+    def stale(self) -> bool:
+        return self.refreshed is None or time.monotonic() - self.refreshed > self.ttl
+
+    def refresh(self, workers, projects):
+        """workers: [(id, name)] most recently active first; projects: [(id, name)] busiest first."""
+        with self.lock:
+            self.workers = OrderedDict((w, name) for w, name in reversed(list(workers)[:self.size]))
+            self.projects = list(projects)[:self.size]
+            self.refreshed = time.monotonic()
+
+    def touch(self, worker_id: int, name: str):
+        with self.lock:
+            self.workers[worker_id] = name
+            self.workers.move_to_end(worker_id)
+            while len(self.workers) > self.size: self.workers.popitem(last=False)
+
+    def top(self, k: int) -> list:
+        """Up to k prompts, alternating workers (latest first) and projects (busiest first)."""
+        with self.lock:
+            workers, projects = list(reversed(self.workers.items())), list(self.projects)
+        workers = [{"prompt": f"How many hours did {name} work this week?", "kind": "worker", "id": w} for w, name in workers]
+        projects = [{"prompt": f"Who is on {name} right now?", "kind": "project", "id": p} for p, name in projects]
+        merged = [s for pair in zip(workers, projects) for s in pair]
+        rest = workers[len(projects):] or projects[len(workers):]
+        return (merged + rest)[:k]
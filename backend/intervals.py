@@ -0,0 +1,125 @@
+"""Interval index over clock entries, for "who was on site at time T" headcounts.
+
+SQLite: an R*Tree, ``clock_intervals``, with 32-bit integer coordinates. It holds each
+entry's [clock-in, clock-out) in seconds since 2000-01-01 (open entries reach the top of
+the range), with worker_id and project_id as auxiliary columns so a headcount never
+touches clock_entries. Triggers on clock_entries keep it current on INSERT and on
+UPDATE of the times or ids. Entries moved to month tables (partitions.roll) stay in it;
+that move is a DELETE from clock_entries, so there is no DELETE trigger. Entries moved
+to the Parquet archive leave it instead: archive.delete_ids calls ``forget`` in the
+transaction that deletes them. Resolution is one second.
+
+PostgreSQL: a GiST index on tsrange(clock_in_time, clock_out_time) over the partitioned
+clock_entries; a NULL clock-out is an unbounded range. Archived rows leave it with the
+rows, so on both databases headcounts cover what the database holds, not the archive.
+
+The app installs the index at startup (``install``, from main's lifespan).
+
+    python -m intervals install    # create the index if missing (filling the R*Tree)
+    python -m intervals rebuild    # refill the R*Tree from every clock entry table
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, bindparam, inspect, literal_column, or_, select, text
+
+import partitions
+
+TABLE = "clock_intervals"
+EPOCH = datetime(2000, 1, 1)
+EPOCH_OFFSET = 946684800  # EPOCH in unix seconds
+OPEN = 2 ** 31 - 1  # the end of an open entry
+TRIGGERS = (f"{TABLE}_insert", f"{TABLE}_update")
+# clamped so an entry whose clock-out was stored before its clock-in still has a valid range
+PG_RANGE = "tsrange(clock_in_time, CASE WHEN clock_out_time < clock_in_time THEN clock_in_time ELSE clock_out_time END, '[)')"
+
+
+def seconds(ts: datetime) -> int:
+    return (ts - EPOCH) // timedelta(seconds=1)
+
+
+def sql_seconds(column: str) -> str:
+    return f"(CAST(strftime('%s', {column}) AS INTEGER) - {EPOCH_OFFSET})"
+
+
+def row_sql(prefix: str = "") -> str:
+    """id, t_in, t_out, worker_id, project_id of a clock entry row, as the R*Tree stores them."""
+    t_in = f"COALESCE({sql_seconds(prefix + 'clock_in_time')}, 0)"
+    t_out = f"MAX({t_in}, COALESCE({sql_seconds(prefix + 'clock_out_time')}, {OPEN}))"
+    return f"{prefix}id, {t_in}, {t_out}, {prefix}worker_id, {prefix}project_id"
+
+
+def install(engine, log=print) -> bool:
+    """Create the index (and on SQLite its triggers) if missing. Returns True when the
+    R*Tree was (re)filled, which happens when it or its triggers didn't exist, e.g. after
+    clock_entries was dropped and recreated."""
+    if engine.dialect.name == "postgresql":
+        with engine.begin() as conn:
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_clock_entries_interval ON {partitions.PARENT} USING gist ({PG_RANGE})"))
+        return False
+    if engine.dialect.name != "sqlite": return False
+    with engine.begin() as conn:
+        present = set(conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'trigger'")).scalars())
+        complete = inspect(conn).has_table(TABLE) and all(name in present for name in TRIGGERS)
+        conn.execute(text(f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING rtree_i32(id, t_in, t_out, +worker_id, +project_id)"))
+        upsert = f"INSERT OR REPLACE INTO {TABLE} SELECT {row_sql('new.')};"
+        conn.execute(text(f"CREATE TRIGGER IF NOT EXISTS {TRIGGERS[0]} AFTER INSERT ON {partitions.PARENT} BEGIN {upsert} END"))
+        conn.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {TRIGGERS[1]} AFTER UPDATE OF clock_in_time, clock_out_time, worker_id, project_id "
+            f"ON {partitions.PARENT} BEGIN {upsert} END"
+        ))
+    if complete: return False
+    log(f"{TABLE}: indexed {rebuild(engine):,} clock entries")
+    return True
+
+
+def rebuild(engine) -> int:
+    """Refill the R*Tree from the live table and the month tables."""
+    with engine.begin() as conn:
+        conn.execute(text(f"DELETE FROM {TABLE}"))
+        for name in [partitions.PARENT] + [name for name, _, _ in partitions.list_partitions(conn)]:
+            conn.execute(text(f"INSERT OR REPLACE INTO {TABLE} SELECT {row_sql()} FROM {name}"))
+        return conn.execute(text(f"SELECT count(*) FROM {TABLE}")).scalar()
+
+
+def forget(conn, ids: list):
+    """Drop entries from the R*Tree, in the caller's transaction (the GiST index needs nothing)."""
+    if conn.dialect.name != "sqlite" or not inspect(conn).has_table(TABLE): return
+    conn.execute(text(f"DELETE FROM {TABLE} WHERE id IN :ids").bindparams(bindparam("ids", expanding=True)), {"ids": ids})
+
+
+def overlapping(db, entity, start: datetime, end: datetime, project_id: int = None) -> list:
+    """(entry_id, worker_id, project_id, clock_in_time, clock_out_time) of entries on site at some point
+    in [start, end); clock_out_time is None for open entries."""
+    if db.get_bind().dialect.name == "sqlite":
+        stmt = f"SELECT id, worker_id, project_id, t_in, t_out FROM {TABLE} WHERE t_in < :hi AND t_out > :lo"
+        if project_id is not None: stmt += " AND project_id = :project_id"
+        # rounded to whole seconds, so a point in time is the window [T, T + 1s)
+        hi = max(seconds(end - timedelta(microseconds=1)) + 1, seconds(start) + 1)
+        rows = db.execute(text(stmt), {"lo": seconds(start), "hi": hi, "project_id": project_id}).all()
+        return [(i, w, p, EPOCH + timedelta(seconds=t_in), None if t_out == OPEN else EPOCH + timedelta(seconds=t_out)) for i, w, p, t_in, t_out in rows]
+    if db.get_bind().dialect.name == "postgresql":
+        condition = literal_column(PG_RANGE).op("&&")(text("tsrange(:lo, :hi, '[)')").bindparams(lo=start, hi=end))
+    else:
+        condition = and_(entity.clock_in_time < end, or_(entity.clock_out_time == None, entity.clock_out_time > start))
+    stmt = select(entity.id, entity.worker_id, entity.project_id, entity.clock_in_time, entity.clock_out_time).where(condition)
+    if project_id is not None: stmt = stmt.where(entity.project_id == project_id)
+    return [tuple(row) for row in db.execute(stmt)]
+
+
+def main():
+    import argparse
+    import main as app
+    parser = argparse.ArgumentParser(description="Manage the clock entry interval index")
+    parser.add_argument("command", choices=["install", "rebuild"])
+    args = parser.parse_args()
+    if args.command == "install":
+        install(app.write_engine)
+        return
+    if app.engine.dialect.name != "sqlite":
+        print("the GiST index is maintained by the database, nothing to rebuild")
+        return
+    print(f"indexed {rebuild(app.write_engine):,} clock entries")
+
+
+if __name__ == "__main__":
+    main()
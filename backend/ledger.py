@@ -0,0 +1,190 @@
+"""Maintenance for the clock event log and its projections.
+
+Every punch and correction appends a row to clock_events, and main.record_event()
+applies it to the projections (worker_status, daily_totals) in the same transaction.
+projection_offsets records the last event each projection has seen, so a projection
+that was dropped, changed or fell behind can be rebuilt from the log:
+
+    python -m ledger backfill                  # one-off: events for entries recorded before the log existed, then rebuild
+    python -m ledger rebuild daily_totals --workers 4
+    python -m ledger catch-up                  # apply any events a projection hasn't seen yet
+
+rebuild folds the log up to a snapshot offset in memory, split by worker_id across
+--workers processes (both projections are per-worker), then swaps the rows in one
+transaction and catches up on events appended meanwhile.
+"""
+import argparse
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+from datetime import datetime
+
+from sqlalchemy import MetaData, Table, func, select
+
+import archive
+import main
+import partitions
+
+BATCH = 50_000
+EVENT_COLUMNS = ["id", "kind", "entry_id", "worker_id", "project_id", "clock_in_time", "clock_out_time", "total_hours"]
+
+
+def stored_entries(engine, after_id: int = 0):
+    """Clock entries with ids above after_id in chunks of up to BATCH, oldest storage first: the
+    Parquet archive by month, the SQLite month tables, then the live table (on Postgres, the
+    partitioned parent)."""
+    months = sorted({f["month"] for f in archive.load_manifest()["files"] if f["max_id"] > after_id})
+    for month in months:
+        start = datetime.strptime(month, "%Y-%m")
+        rows = [r for r in archive.read(start, partitions.next_month(start), engine=engine) if r["id"] > after_id]
+        for i in range(0, len(rows), BATCH): yield rows[i:i + BATCH]
+    names = [name for name, _, _ in partitions.list_partitions(engine)] if engine.dialect.name == "sqlite" else []
+    for name in names + [partitions.PARENT]:
+        with engine.connect() as conn:
+            table = Table(name, MetaData(), autoload_with=conn)
+        last_id = after_id
+        while True:
+            with engine.connect() as conn:
+                rows = conn.execute(select(table).where(table.c.id > last_id).order_by(table.c.id).limit(BATCH)).mappings().all()
+            if not rows: break
+            yield rows
+            last_id = rows[-1]["id"]
+
+
+def backfill(engine, log=print) -> int:
+    """Seed an empty log with one punch_in (and punch_out) event per clock entry, wherever it's
+    stored, then rebuild the projections from it so no request has to fold the history."""
+    with main.SessionLocal() as db:
+        if db.execute(select(func.count()).select_from(main.ClockEventDB)).scalar():
+            log("clock_events is not empty, nothing to backfill"); return 0
+    written = append_entry_events(engine, stored_entries(engine), log)
+    # folding in memory is much faster than applying the events one by one; rebuild() also moves
+    # the offsets to the end of the log, and catch_up_all() takes any punches recorded meanwhile
+    for name in FOLDS: rebuild(name, log=log)
+    catch_up_all(log=log)
+    return written
+
+
+def append_entry_events(engine, chunks, log=print) -> int:
+    """Append a punch_in (and punch_out) event per entry in the chunks; the projections aren't touched."""
+    events = main.ClockEventDB.__table__
+    written = 0
+    for rows in chunks:
+        batch = []
+        for row in rows:
+            base = {"entry_id": row["id"], "worker_id": row["worker_id"], "project_id": row["project_id"],
+                    "clock_in_time": row["clock_in_time"], "note": "backfill", "recorded_at": row["clock_in_time"]}
+            batch.append({**base, "kind": "punch_in", "clock_out_time": None, "total_hours": None})
+            if row["clock_out_time"] is not None:
+                batch.append({**base, "kind": "punch_out", "clock_out_time": row["clock_out_time"], "total_hours": row["total_hours"]})
+        with engine.begin() as conn:
+            conn.execute(events.insert(), batch)
+        written += len(batch)
+        log(f"backfilled {written:,} events")
+    return written
+
+
+# -------------------------------
+# IN-MEMORY FOLDS
+# -------------------------------
+def fold_worker_status(events) -> list:
+    status = {}
+    for e in events:
+        current = status.get(e["worker_id"])
+        if e["clock_out_time"] is None:
+            status[e["worker_id"]] = (e["entry_id"], e["project_id"], e["clock_in_time"])
+        elif current is None or current[0] in (None, e["entry_id"]):
+            status[e["worker_id"]] = (None, None, e["clock_out_time"])
+    return [{"worker_id": w, "entry_id": s[0], "project_id": s[1], "since": s[2]} for w, s in status.items()]
+
+
+def fold_daily_totals(events) -> list:
+    totals = defaultdict(lambda: [0.0, 0])
+    last = {}  # entry_id -> its latest event, to take back on correction
+    for e in events:
+        if e["kind"] == "correction":
+            before = last.get(e["entry_id"])
+            if before is not None and before["clock_out_time"] is not None:
+                key = (before["worker_id"], before["clock_in_time"].date(), before["project_id"])
+                totals[key][0] -= before["total_hours"] or 0.0; totals[key][1] -= 1
+        if e["clock_out_time"] is not None:
+            key = (e["worker_id"], e["clock_in_time"].date(), e["project_id"])
+            totals[key][0] += e["total_hours"] or 0.0; totals[key][1] += 1
+        last[e["entry_id"]] = e
+    return [{"worker_id": w, "day": d, "project_id": p, "hours": round(h, 2), "entries": n}
+            for (w, d, p), (h, n) in totals.items() if n or round(h, 2)]
+
+
+FOLDS = {"worker_status": (fold_worker_status, main.WorkerStatusDB), "daily_totals": (fold_daily_totals, main.DailyTotalDB)}
+
+
+def fold_shard(name: str, upto: int, shard: int, shards: int) -> list:
+    """Fold events (0, upto] of workers with worker_id % shards == shard; runs in a worker process."""
+    events = main.ClockEventDB.__table__
+    with main.engine.connect() as conn:
+        rows = conn.execute(
+            select(*[events.c[c] for c in EVENT_COLUMNS])
+            .where(events.c.id <= upto, events.c.worker_id % shards == shard).order_by(events.c.id)
+        ).mappings()
+        return FOLDS[name][0](rows)
+
+
+def rebuild(name: str, workers: int = 1, log=print) -> int:
+    """Recompute one projection from the log; returns the number of rows written."""
+    fold, model = FOLDS[name]
+    with main.SessionLocal() as db:
+        upto = db.execute(select(func.max(main.ClockEventDB.id))).scalar() or 0
+    if workers > 1:
+        with ProcessPoolExecutor(workers) as pool:
+            shards = pool.map(fold_shard, [name] * workers, [upto] * workers, range(workers), [workers] * workers)
+            rows = [row for shard in shards for row in shard]
+    else:
+        rows = fold_shard(name, upto, 0, 1)
+    log(f"{name}: folded events up to {upto:,} into {len(rows):,} rows")
+    with main.SessionLocal() as db:
+        offset = db.query(main.ProjectionOffsetDB).filter(main.ProjectionOffsetDB.name == name).with_for_update().one()
+        db.query(model).delete()
+        db.flush()
+        for i in range(0, len(rows), BATCH):
+            db.execute(model.__table__.insert(), rows[i:i + BATCH])
+        offset.position = upto
+        main.catch_up(db, [offset], db.execute(select(func.max(main.ClockEventDB.id))).scalar() or 0)
+        db.commit()
+        log(f"{name}: rebuilt, now at offset {offset.position:,}")
+    return len(rows)
+
+
+def catch_up_all(log=print, batch: int = BATCH):
+    """Apply the events projections haven't seen, committing every `batch` events (through
+    main.commit_write, so in single-writer mode on the writer thread)."""
+    def step(db):
+        offsets = db.query(main.ProjectionOffsetDB).with_for_update().all()
+        last = db.execute(select(func.max(main.ClockEventDB.id))).scalar() or 0
+        upto = min(last, min(row.position for row in offsets) + batch)
+        main.catch_up(db, offsets, upto)
+        db.flush()
+        return [(row.name, row.position) for row in offsets], upto, last
+    while True:
+        with main.SessionLocal() as db: positions, upto, last = main.commit_write(db, step)
+        for name, position in positions: log(f"{name}: at offset {position:,}")
+        if upto >= last: return
+
+
+def cli():
+    parser = argparse.ArgumentParser(description="Clock event log maintenance")
+    parser.add_argument("command", choices=["backfill", "rebuild", "catch-up"])
+    parser.add_argument("projections", nargs="*", default=list(FOLDS), help="projections to rebuild (default: all)")
+    parser.add_argument("--workers", type=int, default=1, help="processes to fold the log with")
+    args = parser.parse_args()
+    if args.command == "backfill":
+        print(f"wrote {backfill(main.engine):,} events")
+    elif args.command == "rebuild":
+        for name in args.projections:
+            if name not in FOLDS: parser.error(f"unknown projection {name!r}, expected one of {', '.join(FOLDS)}")
+            rebuild(name, args.workers)
+    else:
+        catch_up_all()
+
+
+if __name__ == "__main__":
+    cli()
@@ -1,20 +1,54 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from typing import List, Optional
-from datetime import datetime
+from datetime import date, datetime, timedelta
+import gzip
+import json
+import os
+import time
 import pytz
 from sqlalchemy.ext.declarative import declarative_base
 
 
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, ForeignKey, Text
+from sqlalchemy import create_engine, event, make_url, bindparam, cast, desc, extract, false, func, inspect, literal, or_, select, text, true, union_all, Boolean, Column, Index, Integer, String, Float, Date, DateTime, ForeignKey, Text
 from sqlalchemy.orm import sessionmaker, relationship, Session, joinedload
 
 # -------------------------------
 # DATABASE SETUP
 # -------------------------------
-DATABASE_URL = "sqlite:///./project_management.db"
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./project_management.db")
+engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {})
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Read-only routes go to the replica when one is configured (see get_read_db). For a local
+# setup with two SQLite files, see replica_sync.py.
+REPLICA_DATABASE_URL = os.getenv("REPLICA_DATABASE_URL")
+replica_engine = create_engine(REPLICA_DATABASE_URL, connect_args={"check_same_thread": False} if REPLICA_DATABASE_URL.startswith("sqlite") else {}) if REPLICA_DATABASE_URL else engine
+ReplicaSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=replica_engine)
+# After a write the client reads from the primary for this long, so it sees its own punch
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "10"))
+PRIMARY_UNTIL_COOKIE = "primary_until"
+# SQLITE_SINGLE_WRITER=1: every mutation is serialized through the only write connection, and reads
+# use separate read-only connections. Routes queue their writes for one writer thread (see
+# write_queue below); the scheduler, report jobs, archive, partition roll, importer checkpoints and
+# ANALYZE write through write_engine, whose pool is that one connection, so they wait their turn.
+# With WAL the readers never block on the writer, and writers never fight over the database lock.
+# Anything that writes outside commit_write() must use write_engine.
+SQLITE_SINGLE_WRITER = os.getenv("SQLITE_SINGLE_WRITER") == "1" and DATABASE_URL.startswith("sqlite")
+write_engine = engine
+if SQLITE_SINGLE_WRITER:
+    write_engine = create_engine(DATABASE_URL, pool_size=1, max_overflow=0, connect_args={"check_same_thread": False})
+    @event.listens_for(write_engine, "connect")
+    def _writer_pragmas(dbapi_connection, _):
+        # WAL + synchronous=NORMAL: commits don't fsync, checkpoints do; readers never block the writer
+        dbapi_connection.execute("PRAGMA journal_mode=WAL")
+        dbapi_connection.execute("PRAGMA synchronous=NORMAL")
+    WriterSessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=write_engine)
+    if not REPLICA_DATABASE_URL:
+        read_only_url = f"sqlite:///file:{make_url(DATABASE_URL).database}?mode=ro&uri=true"
+        replica_engine = create_engine(read_only_url, pool_size=int(os.getenv("SQLITE_READERS", "8")), connect_args={"check_same_thread": False})
+        ReplicaSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=replica_engine)
 Base = declarative_base()
 ist = pytz.timezone("Asia/Kolkata")
 
@@ -45,12 +79,107 @@ class ClockEntryDB(Base):
     id = Column(Integer, primary_key=True, index=True)
     worker_id = Column(Integer, ForeignKey("workers.id"))
     project_id = Column(Integer, ForeignKey("projects.id"))
-    clock_in_time = Column(DateTime, default=lambda: datetime.now(ist))
+    clock_in_time = Column(DateTime, default=lambda: datetime.now(ist), index=True)
     clock_out_time = Column(DateTime, nullable=True)
     total_hours = Column(Float, nullable=True)
+    # closed by close_stale_entries() at MAX_SHIFT_HOURS, not by the worker
+    auto_closed = Column(Boolean, nullable=False, default=False, server_default=false())
     worker = relationship("WorkerDB", back_populates="clock_entries")
     # FIX: Added relationship for fetching project_name
     project = relationship("ProjectDB", back_populates="clock_entries")
+    __table_args__ = (
+        # covering index for payroll: a pay period is read without touching the table
+        Index("ix_clock_entries_payroll", "clock_in_time", "worker_id", "total_hours"),
+        # partial index over open entries only, for the stale-entry scan
+        Index("ix_clock_entries_open", "clock_in_time", sqlite_where=text("clock_out_time IS NULL"), postgresql_where=text("clock_out_time IS NULL")),
+    )
+
+# ---------- CLOCK LEDGER ----------
+# clock_events is the append-only source of truth for punches. clock_entries is maintained in the
+# same transaction; worker_status and daily_totals are projections of the log that record the
+# event offset they are current to, and can be rebuilt from the log (see ledger.py).
+class ClockEventDB(Base):
+    __tablename__ = "clock_events"
+    id = Column(Integer, primary_key=True)  # the event offset
+    kind = Column(String, nullable=False)  # punch_in | punch_out | correction | auto_close
+    entry_id = Column(Integer, nullable=False, index=True)
+    worker_id = Column(Integer, nullable=False, index=True)
+    project_id = Column(Integer, nullable=False)
+    # state of the entry after this event
+    clock_in_time = Column(DateTime, nullable=False)
+    clock_out_time = Column(DateTime, nullable=True)
+    total_hours = Column(Float, nullable=True)
+    note = Column(Text, nullable=True)
+    recorded_at = Column(DateTime, default=lambda: datetime.now(ist))
+
+class WorkerStatusDB(Base):
+    __tablename__ = "worker_status"
+    worker_id = Column(Integer, primary_key=True)
+    entry_id = Column(Integer, nullable=True)  # the open entry, None when clocked out
+    project_id = Column(Integer, nullable=True, index=True)
+    since = Column(DateTime, nullable=True, index=True)  # last punch in or out
+
+class DailyTotalDB(Base):
+    __tablename__ = "daily_totals"
+    worker_id = Column(Integer, primary_key=True)
+    day = Column(Date, primary_key=True)  # local date of the clock-in
+    project_id = Column(Integer, primary_key=True)
+    hours = Column(Float, default=0.0)
+    entries = Column(Integer, default=0)
+    # covering index for hours over a range of days (chatbot questions), optionally per project
+    __table_args__ = (Index("ix_daily_totals_day", "day", "project_id", "worker_id", "hours"),)
+
+# Per project and local day, the most workers clocked in at once and the mean over the day;
+# filled by the occupancy_rollup job (see roll_up_occupancy and occupancy.py).
+class DailyOccupancyDB(Base):
+    __tablename__ = "daily_occupancy"
+    project_id = Column(Integer, primary_key=True)
+    day = Column(Date, primary_key=True)
+    peak = Column(Integer, default=0)
+    average = Column(Float, default=0.0)
+    position = Column(Integer, default=0)  # clock event offset it was computed at
+
+# Days daily_occupancy is complete for. Quiet days have no daily_occupancy rows, so the rollup
+# resumes from these instead (see roll_up_occupancy).
+class OccupancyDayDB(Base):
+    __tablename__ = "daily_occupancy_days"
+    day = Column(Date, primary_key=True)
+    position = Column(Integer, default=0)  # clock event offset it was computed at
+
+# Clock-ins per local day, hour and project for closed days, filled on demand by the heatmap
+# endpoint; a day is dropped from clock_in_heatmap_days when a late punch or correction touches it.
+class ClockInHeatmapDB(Base):
+    __tablename__ = "clock_in_heatmap"
+    day = Column(Date, primary_key=True)
+    hour = Column(Integer, primary_key=True)
+    project_id = Column(Integer, primary_key=True)
+    clock_ins = Column(Integer, default=0)
+
+class HeatmapDayDB(Base):
+    __tablename__ = "clock_in_heatmap_days"
+    day = Column(Date, primary_key=True)  # days whose clock_in_heatmap rows are complete
+    computed_at = Column(DateTime, default=lambda: datetime.now(ist))
+
+class ProjectionOffsetDB(Base):
+    __tablename__ = "projection_offsets"
+    name = Column(String, primary_key=True)
+    position = Column(Integer, default=0)  # id of the last event applied
+
+# Assignment history: one row per stretch of time a worker was assigned to a project, valid_to
+# None for the current one. Maintained by the assign endpoints next to WorkerDB.assigned_project_id.
+class WorkerAssignmentDB(Base):
+    __tablename__ = "worker_assignments"
+    id = Column(Integer, primary_key=True)
+    worker_id = Column(Integer, nullable=False)
+    project_id = Column(Integer, nullable=False)
+    valid_from = Column(DateTime, nullable=False)
+    valid_to = Column(DateTime, nullable=True)
+    __table_args__ = (
+        # a worker's intervals don't overlap, so a range is one seek plus the intervals in it
+        Index("ix_worker_assignments_worker", "worker_id", "valid_from"),
+        # NULLs (current assignments) sort together; closed ones are found by a seek on valid_to
+        Index("ix_worker_assignments_project", "project_id", "valid_to", "valid_from", "worker_id"),
+    )
 
 class UserDB(Base):
     __tablename__ = "users"
@@ -59,7 +188,28 @@ class UserDB(Base):
     password = Column(String)
     role = Column(String)
 
+import archive
+import events
+import partitions
+# On Postgres clock_entries is natively partitioned by month; see partitions.py
+if engine.dialect.name == "postgresql": partitions.install_postgres(engine, ClockEntryDB.__table__)
 Base.metadata.create_all(bind=engine)
+# create_all() skips tables that already exist, so columns and indexes added to the models later are created here
+def add_missing_columns(table, name: str):
+    existing = {c["name"] for c in inspect(engine).get_columns(name)}
+    with engine.begin() as conn:
+        for column in table.columns:
+            if column.name in existing: continue
+            ddl = f"ALTER TABLE {name} ADD COLUMN {column.name} {column.type.compile(dialect=engine.dialect)}"
+            if column.server_default is not None: ddl += f" DEFAULT {column.server_default.arg.compile(dialect=engine.dialect)}"
+            if not column.nullable: ddl += " NOT NULL"
+            conn.execute(text(ddl))
+for table in Base.metadata.sorted_tables:
+    add_missing_columns(table, table.name)
+    for index in table.indexes: index.create(bind=engine, checkfirst=True)
+if engine.dialect.name == "sqlite":
+    for name, _, _ in partitions.list_partitions(engine): add_missing_columns(ClockEntryDB.__table__, name)
+import intervals
 
 # -------------------------------
 # Pydantic MODELS
@@ -87,6 +237,27 @@ class Worker(WorkerBase):
 class AssignRequest(BaseModel):
     worker_id: int
 
+class BulkAssignRequest(BaseModel):
+    project_id: Optional[int] = None  # None unassigns
+    # which workers: explicit ids and/or filters, combined with AND; at least one is required
+    worker_ids: Optional[List[int]] = None
+    role: Optional[str] = None
+    current_project_id: Optional[int] = None
+    unassigned_only: bool = False
+
+class AssignResult(BaseModel):
+    worker_id: int
+    previous_project_id: Optional[int] = None
+    status: str  # assigned | unassigned | unchanged | skipped | not_found
+
+class Assignment(BaseModel):
+    worker_id: int
+    project_id: int
+    valid_from: datetime
+    valid_to: Optional[datetime] = None
+    class Config:
+        orm_mode = True
+
 class ClockRequest(BaseModel):
     worker_id: int
     project_id: int
@@ -102,6 +273,7 @@ class ClockEntryResponse(BaseModel):
     clock_in_time: datetime
     clock_out_time: Optional[datetime] = None
     total_hours: Optional[float] = None
+    auto_closed: bool = False
     class Config:
         orm_mode = True
 
@@ -122,7 +294,53 @@ class ChatRequest(BaseModel):
 # -------------------------------
 # FASTAPI SETUP
 # -------------------------------
-app = FastAPI()
+import queue
+from contextlib import asynccontextmanager
+from writer import GroupCommitWriter
+# Optional group commit for clock punches (PUNCH_BATCHING=1): punches are queued and a single
+# writer thread commits them in groups of up to PUNCH_BATCH_MAX or every PUNCH_BATCH_DELAY_MS.
+PUNCH_BATCHING = os.getenv("PUNCH_BATCHING") == "1"
+PUNCH_BATCH_MAX = int(os.getenv("PUNCH_BATCH_MAX", "200"))
+PUNCH_BATCH_DELAY = float(os.getenv("PUNCH_BATCH_DELAY_MS", "5")) / 1000
+# In single-writer mode all mutations share one bounded queue; a full queue answers 503.
+WRITE_QUEUE_MAX = int(os.getenv("WRITE_QUEUE_MAX", "1000"))
+WRITE_QUEUE_TIMEOUT = float(os.getenv("WRITE_QUEUE_TIMEOUT", "2"))
+write_queue = GroupCommitWriter(
+    WriterSessionLocal, max_batch=PUNCH_BATCH_MAX if PUNCH_BATCHING else 1, max_delay=PUNCH_BATCH_DELAY, max_queue=WRITE_QUEUE_MAX,
+) if SQLITE_SINGLE_WRITER else None
+punch_writer = GroupCommitWriter(
+    SessionLocal, max_batch=PUNCH_BATCH_MAX, max_delay=PUNCH_BATCH_DELAY,
+) if PUNCH_BATCHING and not write_queue else None
+
+def commit_write(db: Session, fn, punch: bool = False):
+    """Run fn(session) and commit it: on the single writer / punch batcher when enabled, else on `db`.
+
+    fn must validate before it changes anything and flush instead of committing."""
+    writer = write_queue or (punch_writer if punch else None)
+    if writer:
+        try: return writer.run(fn, timeout=WRITE_QUEUE_TIMEOUT)
+        except queue.Full: raise HTTPException(status_code=503, detail="Too many writes queued, please retry")
+    result = fn(db)
+    db.commit()
+    if isinstance(result, Base): db.refresh(result)
+    return result
+
+# Open entries older than MAX_SHIFT_HOURS are closed by the close_stale job (see SCHEDULED JOBS),
+# AUTO_CLOSE_BATCH entries per transaction; see close_stale_entries()
+MAX_SHIFT_HOURS = float(os.getenv("MAX_SHIFT_HOURS", "16"))
+AUTO_CLOSE_BATCH = int(os.getenv("AUTO_CLOSE_BATCH", "200"))
+
+@asynccontextmanager
+async def lifespan(app):
+    intervals.install(write_engine)
+    if SCHEDULER_ENABLED: scheduler.start()
+    yield
+    if SCHEDULER_ENABLED: scheduler.stop()
+    report_runner.shutdown()
+    for writer in (write_queue, punch_writer):
+        if writer: writer.stop()
+
+app = FastAPI(lifespan=lifespan)
 from fastapi.middleware.cors import CORSMiddleware
 app.add_middleware(
     CORSMiddleware,
@@ -131,6 +349,15 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+from compression import CompressionMiddleware
+# Big list responses (e.g. /clock_entries/) go to site tablets on cellular links.
+app.add_middleware(CompressionMiddleware, minimum_size=int(os.getenv("COMPRESSION_MIN_SIZE", "1024")))
+
+# numpy (payroll, occupancy, chatbot name lookup) and pyarrow (archive) are imported where they're
+# used; an install that skipped them answers 503 naming the package instead of a bare 500
+@app.exception_handler(ModuleNotFoundError)
+def missing_package(request: Request, exc: ModuleNotFoundError):
+    return JSONResponse(status_code=503, content={"detail": f"The server is missing the Python package {exc.name!r} (pip install -r requirements.txt)"})
 
 def get_db():
     db = SessionLocal()
@@ -139,6 +366,50 @@ def get_db():
     finally:
         db.close()
 
+def get_write_db(response: Response):
+    """Primary session for mutating routes; also pins the client's reads to the primary for a while."""
+    response.set_cookie(PRIMARY_UNTIL_COOKIE, str(time.time() + READ_YOUR_WRITES_SECONDS), max_age=int(READ_YOUR_WRITES_SECONDS) + 1, samesite="lax")
+    yield from get_db()
+
+def get_read_db(request: Request):
+    """Replica session for read-only routes, unless the client wrote recently (read-your-writes)."""
+    try: pinned = float(request.cookies.get(PRIMARY_UNTIL_COOKIE, 0)) > time.time()
+    except ValueError: pinned = False
+    db = (SessionLocal if pinned else ReplicaSessionLocal)()
+    try:
+        yield db
+    finally:
+        db.close()
+
+# -------------------------------
+# SPARSE FIELDSETS (?fields=)
+# -------------------------------
+# Each list endpoint accepts ?fields=a,b,c. Only the requested columns are put in the
+# SELECT (joins for *_name fields are added only when asked for) and the rows are
+# returned as plain dicts, skipping the ORM objects and the response_model encoding.
+PROJECT_FIELDS = {"id": ProjectDB.id, "name": ProjectDB.name, "description": ProjectDB.description, "status": ProjectDB.status}
+WORKER_FIELDS = {"id": WorkerDB.id, "name": WorkerDB.name, "role": WorkerDB.role, "assigned_project_id": WorkerDB.assigned_project_id}
+CLOCK_ENTRY_FIELDS = {
+    "id": ClockEntryDB.id, "worker_id": ClockEntryDB.worker_id, "project_id": ClockEntryDB.project_id,
+    "worker_name": WorkerDB.name, "project_name": ProjectDB.name,
+    "clock_in_time": ClockEntryDB.clock_in_time, "clock_out_time": ClockEntryDB.clock_out_time, "total_hours": ClockEntryDB.total_hours,
+    "auto_closed": ClockEntryDB.auto_closed,
+}
+
+def parse_fields(fields: Optional[str], allowed: dict):
+    if fields is None: return None
+    names = list(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    unknown = [f for f in names if f not in allowed]
+    if not names or unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown) or '(none given)'}. Allowed: {', '.join(allowed)}")
+    return {name: allowed[name] for name in names}
+
+def projected(columns: dict, entity):
+    return select(*[col.label(name) for name, col in columns.items()]).select_from(entity)
+
+def sparse_response(db: Session, stmt):
+    return JSONResponse(jsonable_encoder([dict(row) for row in db.execute(stmt).mappings()]))
+
 def seed_users():
     db = SessionLocal()
     if db.query(UserDB).count() == 0:
@@ -151,6 +422,87 @@ def seed_users():
     db.close()
 seed_users()
 
+def seed_projection_offsets():
+    db = SessionLocal()
+    known = set(db.execute(select(ProjectionOffsetDB.name)).scalars())
+    missing = [name for name in PROJECTIONS if name not in known]
+    if missing:
+        db.add_all([ProjectionOffsetDB(name=name, position=0) for name in missing])
+        db.commit()
+    db.close()
+
+def seed_assignment_history():
+    # history starts when the table is created: current assignments are recorded as of now
+    db = SessionLocal()
+    if db.query(WorkerAssignmentDB).first() is None:
+        now = datetime.now(ist).replace(tzinfo=None)
+        db.execute(WorkerAssignmentDB.__table__.insert().from_select(
+            ["worker_id", "project_id", "valid_from"],
+            select(WorkerDB.id, WorkerDB.assigned_project_id, literal(now, DateTime)).where(WorkerDB.assigned_project_id != None),
+        ))
+        db.commit()
+    db.close()
+seed_assignment_history()
+
+# -------------------------------
+# CLOCK LEDGER PROJECTIONS
+# -------------------------------
+def previous_event(db: Session, event: ClockEventDB):
+    return db.query(ClockEventDB).filter(
+        ClockEventDB.entry_id == event.entry_id, ClockEventDB.id < event.id
+    ).order_by(ClockEventDB.id.desc()).first()
+
+def apply_worker_status(db: Session, event: ClockEventDB):
+    status = db.get(WorkerStatusDB, event.worker_id)
+    if status is None:
+        status = WorkerStatusDB(worker_id=event.worker_id); db.add(status); db.flush()  # so the next event's get() finds it
+    if event.clock_out_time is None:
+        status.entry_id, status.project_id, status.since = event.entry_id, event.project_id, event.clock_in_time
+    elif status.entry_id in (None, event.entry_id):
+        status.entry_id, status.project_id, status.since = None, None, event.clock_out_time
+
+def add_daily_total(db: Session, worker_id: int, day: date, project_id: int, hours: float, entries: int):
+    total = db.get(DailyTotalDB, (worker_id, day, project_id))
+    if total is None:
+        total = DailyTotalDB(worker_id=worker_id, day=day, project_id=project_id, hours=0.0, entries=0); db.add(total); db.flush()
+    total.hours = round(total.hours + hours, 2)
+    total.entries += entries
+
+def apply_daily_totals(db: Session, event: ClockEventDB):
+    if event.kind == "correction":
+        # take back what the entry contributed before this correction
+        before = previous_event(db, event)
+        if before is not None and before.clock_out_time is not None:
+            add_daily_total(db, before.worker_id, before.clock_in_time.date(), before.project_id, -(before.total_hours or 0.0), -1)
+    if event.clock_out_time is not None:
+        add_daily_total(db, event.worker_id, event.clock_in_time.date(), event.project_id, event.total_hours or 0.0, 1)
+
+PROJECTIONS = {"worker_status": apply_worker_status, "daily_totals": apply_daily_totals}
+seed_projection_offsets()
+
+def catch_up(db: Session, offsets, upto: int):
+    """Apply events (offset, upto] to each projection row in `offsets` and advance it."""
+    for row in offsets:
+        if row.position >= upto: continue
+        for event in db.query(ClockEventDB).filter(ClockEventDB.id > row.position, ClockEventDB.id <= upto).order_by(ClockEventDB.id):
+            PROJECTIONS[row.name](db, event)
+        row.position = upto
+    db.flush()
+
+def record_event(db: Session, kind: str, entry: ClockEntryDB, note: Optional[str] = None) -> ClockEventDB:
+    """Append an event for `entry` (already flushed in its new state) and bring the projections up to it."""
+    # locking the offset rows first serializes appends on Postgres, so event ids follow commit order
+    offsets = db.query(ProjectionOffsetDB).with_for_update().all()
+    event = ClockEventDB(
+        kind=kind, entry_id=entry.id, worker_id=entry.worker_id, project_id=entry.project_id,
+        clock_in_time=local_naive(entry.clock_in_time), clock_out_time=local_naive(entry.clock_out_time),
+        total_hours=entry.total_hours, note=note,
+    )
+    db.add(event); db.flush()
+    catch_up(db, offsets, event.id)
+    if kind in ("punch_in", "correction"): forget_heatmap_days(db, event)
+    return event
+
 # -------------------------------
 # ROUTES
 # -------------------------------
@@ -165,118 +517,1042 @@ def login(request: LoginRequest, db: Session = Depends(get_db)):
     if not user: raise HTTPException(status_code=401, detail="Invalid credentials")
     return user
 @app.post("/projects/", response_model=Project)
-def create_project(project: ProjectBase, db: Session = Depends(get_db)):
-    db_project = ProjectDB(**project.dict())
-    db.add(db_project); db.commit(); db.refresh(db_project)
+def create_project(project: ProjectBase, db: Session = Depends(get_write_db)):
+    def write(session: Session):
+        db_project = ProjectDB(**project.dict())
+        session.add(db_project); session.flush()
+        return db_project
+    db_project = commit_write(db, write)
+    events.publish("projects.created", project_id=db_project.id)
     return db_project
 @app.get("/projects/", response_model=List[Project])
-def get_projects(status: Optional[str] = None, db: Session = Depends(get_db)):
+def get_projects(status: Optional[str] = None, fields: Optional[str] = None, db: Session = Depends(get_read_db)):
+    columns = parse_fields(fields, PROJECT_FIELDS)
+    if columns:
+        stmt = projected(columns, ProjectDB)
+        if status: stmt = stmt.where(ProjectDB.status.ilike(status))
+        return sparse_response(db, stmt)
     query = db.query(ProjectDB)
     if status: query = query.filter(ProjectDB.status.ilike(status))
     return query.all()
 @app.post("/workers/", response_model=Worker)
-def create_worker(worker: WorkerBase, db: Session = Depends(get_db)):
-    db_worker = WorkerDB(**worker.dict())
-    db.add(db_worker); db.commit(); db.refresh(db_worker)
+def create_worker(worker: WorkerBase, db: Session = Depends(get_write_db)):
+    def write(session: Session):
+        db_worker = WorkerDB(**worker.dict())
+        session.add(db_worker); session.flush()
+        if db_worker.assigned_project_id is not None: record_assignments(session, {db_worker.id: db_worker.assigned_project_id})
+        return db_worker
+    db_worker = commit_write(db, write)
+    events.publish("workers.created", worker_id=db_worker.id, project_id=db_worker.assigned_project_id)
     return db_worker
 @app.get("/workers/", response_model=List[Worker])
-def get_workers(project_id: Optional[int] = None, db: Session = Depends(get_db)):
+def get_workers(project_id: Optional[int] = None, fields: Optional[str] = None, db: Session = Depends(get_read_db)):
+    columns = parse_fields(fields, WORKER_FIELDS)
+    if columns:
+        stmt = projected(columns, WorkerDB)
+        if project_id: stmt = stmt.where(WorkerDB.assigned_project_id == project_id)
+        return sparse_response(db, stmt)
     query = db.query(WorkerDB)
     if project_id: query = query.filter(WorkerDB.assigned_project_id == project_id)
     return query.all()
 @app.post("/projects/{project_id}/assign")
-def assign_worker(project_id: int, request: AssignRequest, db: Session = Depends(get_db)):
-    project = db.query(ProjectDB).get(project_id)
-    worker = db.query(WorkerDB).get(request.worker_id)
-    if not project or not worker: raise HTTPException(status_code=404, detail="Project or Worker not found")
-    worker.assigned_project_id = project_id
-    db.commit()
-    return {"message": f"Worker {worker.name} assigned to project {project.name}"}
+def assign_worker(project_id: int, request: AssignRequest, db: Session = Depends(get_write_db)):
+    def write(session: Session):
+        project = session.query(ProjectDB).get(project_id)
+        worker = session.query(WorkerDB).get(request.worker_id)
+        if not project or not worker: raise HTTPException(status_code=404, detail="Project or Worker not found")
+        previous = worker.assigned_project_id
+        if previous != project_id: record_assignments(session, {worker.id: project_id})
+        worker.assigned_project_id = project_id
+        session.flush()
+        return previous, {"message": f"Worker {worker.name} assigned to project {project.name}"}
+    previous, result = commit_write(db, write)
+    if previous != project_id: events.publish("workers.assigned", project_id=project_id, worker_ids=[request.worker_id], previous={request.worker_id: previous})
+    return result
+
+@app.post("/workers/assignments", response_model=List[AssignResult])
+def assign_workers(request: BulkAssignRequest, db: Session = Depends(get_write_db)):
+    """Assign (or with project_id null, unassign) many workers with one UPDATE; one result per selected worker id."""
+    criteria = []
+    if request.worker_ids is not None: criteria.append(WorkerDB.id.in_(request.worker_ids))
+    if request.role: criteria.append(WorkerDB.role == request.role)
+    if request.current_project_id: criteria.append(WorkerDB.assigned_project_id == request.current_project_id)
+    if request.unassigned_only: criteria.append(WorkerDB.assigned_project_id == None)
+    if not criteria: raise HTTPException(status_code=400, detail="Select workers with worker_ids, role, current_project_id or unassigned_only")
+    target = request.project_id
+    def write(session: Session):
+        if target is not None and not session.get(ProjectDB, target): raise HTTPException(status_code=404, detail="Project not found")
+        # current assignments of the selection (locked on Postgres), then statements selecting the ones that
+        # change by the same criteria, so no list of ids is sent back
+        previous = dict(session.execute(select(WorkerDB.id, WorkerDB.assigned_project_id).where(*criteria).with_for_update()).all())
+        changed = [worker_id for worker_id, project_id in previous.items() if project_id != target]
+        if changed:
+            changing = [*criteria, WorkerDB.assigned_project_id.is_distinct_from(target)]
+            record_reassignment(session, changing, target)
+            session.execute(WorkerDB.__table__.update().where(*changing).values(assigned_project_id=target))
+        return previous, changed
+    previous, changed = commit_write(db, write)
+    if changed: events.publish("workers.assigned", project_id=target, worker_ids=changed, previous={w: previous[w] for w in changed})
+    changed = set(changed)
+    results = [
+        AssignResult(worker_id=w, previous_project_id=p, status=("unassigned" if target is None else "assigned") if w in changed else "unchanged")
+        for w, p in sorted(previous.items())
+    ]
+    missing = [w for w in dict.fromkeys(request.worker_ids or []) if w not in previous]
+    if missing:
+        # ids that exist but didn't match the filters are skipped, the rest don't exist
+        existing = set(db.execute(select(WorkerDB.id).where(WorkerDB.id.in_(missing))).scalars())
+        results += [AssignResult(worker_id=w, status="skipped" if w in existing else "not_found") for w in missing]
+    return results
+
+def record_assignments(session: Session, changes: dict, at: Optional[datetime] = None):
+    """Close the current assignment of each worker in changes ({worker_id: project_id or None})
+    and open one for the new project. Call in the transaction that updates assigned_project_id."""
+    at = at or datetime.now(ist).replace(tzinfo=None)
+    session.execute(WorkerAssignmentDB.__table__.update().where(WorkerAssignmentDB.worker_id.in_(list(changes)), WorkerAssignmentDB.valid_to == None).values(valid_to=at))
+    rows = [{"worker_id": w, "project_id": p, "valid_from": at} for w, p in changes.items() if p is not None]
+    if rows: session.execute(WorkerAssignmentDB.__table__.insert(), rows)
+
+def record_reassignment(session: Session, criteria: list, project_id: Optional[int], at: Optional[datetime] = None):
+    """record_assignments() for every worker matching criteria (on WorkerDB), all moving to project_id.
+    Call before the UPDATE, while the criteria still select the workers that change."""
+    at = at or datetime.now(ist).replace(tzinfo=None)
+    workers = select(WorkerDB.id).where(*criteria)
+    session.execute(WorkerAssignmentDB.__table__.update().where(WorkerAssignmentDB.worker_id.in_(workers), WorkerAssignmentDB.valid_to == None).values(valid_to=at))
+    if project_id is not None:
+        session.execute(WorkerAssignmentDB.__table__.insert().from_select(
+            ["worker_id", "project_id", "valid_from"], select(WorkerDB.id, literal(project_id), literal(at, DateTime)).where(*criteria)
+        ))
+
+@app.get("/projects/{project_id}/assignments", response_model=List[Assignment])
+def get_project_assignments(project_id: int, at: Optional[datetime] = None, db: Session = Depends(get_read_db)):
+    """Workers assigned to the project at a point in time (default: now).
+
+    Reads the current assignments and those closed after `at`, both straight off
+    ix_worker_assignments_project, so older history is never scanned."""
+    at = local_naive(at) or datetime.now(ist).replace(tzinfo=None)
+    a = WorkerAssignmentDB
+    current = select(a).where(a.project_id == project_id, a.valid_to == None, a.valid_from <= at)
+    closed = select(a).where(a.project_id == project_id, a.valid_to > at, a.valid_from <= at)
+    stmt = select(a).from_statement(union_all(current, closed).order_by("worker_id"))
+    return db.execute(stmt).scalars().all()
+
+@app.get("/workers/{worker_id}/assignments", response_model=List[Assignment])
+def get_worker_assignments(worker_id: int, start: Optional[datetime] = None, end: Optional[datetime] = None, db: Session = Depends(get_read_db)):
+    """The worker's assignments overlapping [start, end), oldest first; the whole history without bounds."""
+    start, end = local_naive(start), local_naive(end)
+    a = WorkerAssignmentDB
+    query = db.query(a).filter(a.worker_id == worker_id)
+    if start:
+        # the last interval starting at or before `start` is the only earlier one that can overlap it
+        first = select(func.max(a.valid_from)).where(a.worker_id == worker_id, a.valid_from <= start).scalar_subquery()
+        query = query.filter(a.valid_from >= func.coalesce(first, start), or_(a.valid_to == None, a.valid_to > start))
+    if end: query = query.filter(a.valid_from < end)
+    return query.order_by(a.valid_from).all()
+
+import importer
+
+def import_workers_from(stream, fmt: str, import_id: Optional[str] = None, batch_size: int = importer.BATCH_SIZE,
+                        max_errors: Optional[int] = importer.MAX_REPORTED_ERRORS) -> dict:
+    """Bulk-insert workers from a CSV/JSONL text stream, resumable by import_id (see importer.py)."""
+    with SessionLocal() as db: project_ids = set(db.execute(select(ProjectDB.id)).scalars())
+    def write_batch(rows, checkpoint):
+        def write(session: Session):
+            if rows:
+                workers = WorkerDB.__table__
+                if any(row["assigned_project_id"] is not None for row in rows):
+                    created = session.execute(workers.insert().returning(workers.c.id, workers.c.assigned_project_id), rows).all()
+                    record_assignments(session, {w: p for w, p in created if p is not None})
+                else:
+                    session.execute(workers.insert(), rows)
+            session.execute(checkpoint)
+        db = SessionLocal()
+        try: commit_write(db, write)
+        finally: db.close()
+    summary = importer.run(stream, fmt, write_engine, write_batch, project_ids, import_id, batch_size, max_errors)
+    if summary["inserted"]: events.publish("workers.imported", import_id=summary["import_id"], inserted=summary["inserted"])
+    return summary
+
+@app.post("/workers/import")
+async def import_workers(request: Request, format: Optional[str] = None, import_id: Optional[str] = None):
+    """Stream a CSV or JSON Lines body (format from ?format= or the Content-Type) into the workers table.
+
+    Parsing and inserting run in a worker thread while the upload is still arriving. Pass
+    the returned import_id (or choose one up front) to resume an interrupted upload."""
+    import asyncio
+    import io
+    fmt = format or ("jsonl" if "json" in request.headers.get("content-type", "") else "csv")
+    if fmt not in importer.FORMATS: raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(importer.FORMATS)}")
+    chunks = queue.Queue(maxsize=16)
+    stream = io.TextIOWrapper(io.BufferedReader(importer.QueueReader(chunks)), encoding="utf-8-sig", newline="")
+    job = asyncio.get_running_loop().run_in_executor(None, import_workers_from, stream, fmt, import_id)
+    async def put(chunk):
+        # wait for room without blocking the event loop; give up once the import has stopped reading
+        while not job.done():
+            try: chunks.put_nowait(chunk); return
+            except queue.Full: await asyncio.sleep(0.002)
+    received = False
+    try:
+        async for chunk in request.stream():
+            if job.done(): break
+            if chunk: await put(chunk)
+        received = True
+    finally:
+        if not received:
+            # the client went away: fail the reader instead of ending the stream, so the rows
+            # after the last checkpoint aren't committed; the same import_id resumes it
+            job.add_done_callback(lambda f: f.exception())
+            while True:
+                try: chunks.get_nowait()
+                except queue.Empty: break
+            chunks.put_nowait(importer.ABORT)
+    await put(None)
+    return await job
 
 # ---------- CLOCK ----------
-@app.post("/clockin/", response_model=ClockEntryResponse)
-def clock_in(request: ClockRequest, db: Session = Depends(get_db)):
+def active_entry(db: Session, worker_id: int):
+    """The worker's open clock entry (no clock-out yet), if any."""
+    return db.query(ClockEntryDB).filter(
+        ClockEntryDB.worker_id == worker_id,
+        ClockEntryDB.clock_out_time == None
+    ).order_by(ClockEntryDB.id.desc()).first()
+
+def to_response(entry: ClockEntryDB) -> ClockEntryResponse:
+    return ClockEntryResponse(
+        id=entry.id, worker_id=entry.worker_id, project_id=entry.project_id,
+        worker_name=entry.worker.name, project_name=entry.project.name,
+        clock_in_time=entry.clock_in_time, clock_out_time=entry.clock_out_time, total_hours=entry.total_hours,
+        auto_closed=bool(entry.auto_closed),
+    )
+
+def parse_timestamp(request: ClockRequest) -> datetime:
+    return datetime.fromisoformat(request.timestamp.replace("Z", "+00:00")) if request.timestamp else datetime.now(ist)
+
+def punch_in(db: Session, request: ClockRequest) -> ClockEntryResponse:
+    """Validate and flush a clock-in; the caller commits (possibly together with other punches)."""
     worker = db.query(WorkerDB).get(request.worker_id)
     project = db.query(ProjectDB).get(request.project_id)
     if not worker or not project:
         raise HTTPException(status_code=404, detail="Worker or Project not found")
     
     # FIX: Correctly check if worker is active on ANY project
-    active = db.query(ClockEntryDB).filter(
-        ClockEntryDB.worker_id == worker.id, 
-        ClockEntryDB.clock_out_time == None
-    ).first()
-    if active:
+    if active_entry(db, worker.id):
         raise HTTPException(status_code=400, detail=f"Worker already clocked in on another project.")
 
-    ts = datetime.fromisoformat(request.timestamp.replace("Z", "+00:00")) if request.timestamp else datetime.now(ist)
-    entry = ClockEntryDB(worker_id=worker.id, project_id=project.id, clock_in_time=ts)
-    db.add(entry); db.commit(); db.refresh(entry)
-    
-    return ClockEntryResponse(
-        id=entry.id, worker_id=entry.worker_id, project_id=entry.project_id,
-        worker_name=entry.worker.name, project_name=entry.project.name,
-        clock_in_time=entry.clock_in_time, clock_out_time=entry.clock_out_time, total_hours=entry.total_hours
-    )
+    entry = ClockEntryDB(worker_id=worker.id, project_id=project.id, clock_in_time=parse_timestamp(request))
+    db.add(entry); db.flush()
+    record_event(db, "punch_in", entry)
+    return to_response(entry)
 
-@app.post("/clockout/", response_model=ClockEntryResponse)
-def clock_out(request: ClockRequest, db: Session = Depends(get_db)):
+def punch_out(db: Session, request: ClockRequest) -> ClockEntryResponse:
+    """Validate and flush a clock-out; the caller commits (possibly together with other punches)."""
     # FIX: Correctly find the active entry for the specific worker (project doesn't matter for finding active session)
-    entry = db.query(ClockEntryDB).filter(
-        ClockEntryDB.worker_id == request.worker_id,
-        ClockEntryDB.clock_out_time == None
-    ).order_by(ClockEntryDB.id.desc()).first()
-    
+    entry = active_entry(db, request.worker_id)
+
     if not entry:
         raise HTTPException(status_code=400, detail="No active clock-in found for this worker")
 
-    ts = datetime.fromisoformat(request.timestamp.replace("Z", "+00:00")) if request.timestamp else datetime.now(ist)
+    ts = parse_timestamp(request)
     
     clock_in_time = entry.clock_in_time.astimezone(ist) if entry.clock_in_time.tzinfo is None else entry.clock_in_time
     clock_out_time = ts.astimezone(ist) if ts.tzinfo is None else ts
 
     entry.clock_out_time = clock_out_time
     entry.total_hours = round((clock_out_time - clock_in_time).total_seconds() / 3600, 2)
-    db.commit(); db.refresh(entry)
+    db.flush()
+    record_event(db, "punch_out", entry)
+    return to_response(entry)
 
-    return ClockEntryResponse(
-        id=entry.id, worker_id=entry.worker_id, project_id=entry.project_id,
-        worker_name=entry.worker.name, project_name=entry.project.name,
-        clock_in_time=entry.clock_in_time, clock_out_time=entry.clock_out_time, total_hours=entry.total_hours
-    )
+@app.post("/clockin/", response_model=ClockEntryResponse)
+def clock_in(request: ClockRequest, db: Session = Depends(get_write_db)):
+    entry = commit_write(db, lambda session: punch_in(session, request), punch=True)
+    events.publish("clock_entry.punched", entry_id=entry.id, worker_id=entry.worker_id, project_id=entry.project_id, worker_name=entry.worker_name)
+    return entry
+
+@app.post("/clockout/", response_model=ClockEntryResponse)
+def clock_out(request: ClockRequest, db: Session = Depends(get_write_db)):
+    entry = commit_write(db, lambda session: punch_out(session, request), punch=True)
+    events.publish("clock_entry.punched", entry_id=entry.id, worker_id=entry.worker_id, project_id=entry.project_id, worker_name=entry.worker_name)
+    return entry
+
+class CorrectionRequest(BaseModel):
+    clock_in_time: Optional[datetime] = None
+    clock_out_time: Optional[datetime] = None
+    note: Optional[str] = None
+
+@app.post("/clock_entries/{entry_id}/correct", response_model=ClockEntryResponse)
+def correct_clock_entry(entry_id: int, request: CorrectionRequest, db: Session = Depends(get_write_db)):
+    def write(session: Session):
+        entry = session.get(ClockEntryDB, entry_id)
+        rolled = partitions.locate(session.connection(), ClockEntryDB.__table__, entry_id) if not entry and engine.dialect.name == "sqlite" else None
+        if not entry and not rolled: raise HTTPException(status_code=404, detail="Clock entry not found (archived entries can't be corrected)")
+        current = {"clock_in_time": entry.clock_in_time, "clock_out_time": entry.clock_out_time} if entry else rolled[1]
+        clock_in_time = local_naive(request.clock_in_time) or local_naive(current["clock_in_time"])
+        clock_out_time = local_naive(request.clock_out_time) or local_naive(current["clock_out_time"])
+        if clock_out_time is not None and clock_out_time < clock_in_time:
+            raise HTTPException(status_code=400, detail="Clock-out can't be before clock-in")
+        if rolled:
+            # corrected in the live table; the next roll moves it to the month it now belongs to
+            partitions.restore(session.connection(), ClockEntryDB.__table__, rolled[0], entry_id)
+            entry = session.get(ClockEntryDB, entry_id)
+        entry.clock_in_time, entry.clock_out_time = clock_in_time, clock_out_time
+        entry.total_hours = round((clock_out_time - clock_in_time).total_seconds() / 3600, 2) if clock_out_time else None
+        session.flush()
+        record_event(session, "correction", entry, note=request.note)
+        return to_response(entry)
+    entry = commit_write(db, write, punch=True)
+    events.publish("clock_entry.corrected", entry_id=entry.id, worker_id=entry.worker_id, project_id=entry.project_id)
+    return entry
+
+class WorkerStatus(BaseModel):
+    worker_id: int
+    entry_id: int
+    project_id: int
+    since: datetime
+    class Config:
+        orm_mode = True
+
+class DailyTotal(BaseModel):
+    worker_id: int
+    day: date
+    project_id: int
+    hours: float
+    entries: int
+    class Config:
+        orm_mode = True
+
+@app.get("/workers/status", response_model=List[WorkerStatus])
+def get_worker_status(project_id: Optional[int] = None, db: Session = Depends(get_read_db)):
+    """Workers currently clocked in, from the worker_status projection."""
+    query = db.query(WorkerStatusDB).filter(WorkerStatusDB.entry_id != None)
+    if project_id: query = query.filter(WorkerStatusDB.project_id == project_id)
+    return query.all()
+
+@app.get("/daily_totals/", response_model=List[DailyTotal])
+def get_daily_totals(worker_id: Optional[int] = None, project_id: Optional[int] = None, start: Optional[date] = None, end: Optional[date] = None, db: Session = Depends(get_read_db)):
+    """Hours per worker, day and project, from the daily_totals projection; end is exclusive."""
+    query = db.query(DailyTotalDB)
+    if worker_id: query = query.filter(DailyTotalDB.worker_id == worker_id)
+    if project_id: query = query.filter(DailyTotalDB.project_id == project_id)
+    if start: query = query.filter(DailyTotalDB.day >= start)
+    if end: query = query.filter(DailyTotalDB.day < end)
+    return query.order_by(DailyTotalDB.day, DailyTotalDB.worker_id).all()
+
+
+# ---------- HEADCOUNT ----------
+class ProjectHeadcount(BaseModel):
+    project_id: int
+    project_name: str
+    workers: int
+
+class OnSiteWorker(BaseModel):
+    worker_id: int
+    worker_name: str
+    project_id: int
+    entry_id: int
+    clock_in_time: datetime
+
+class Headcount(BaseModel):
+    start: datetime
+    end: datetime
+    total: int
+    by_project: List[ProjectHeadcount]
+    workers: Optional[List[OnSiteWorker]] = None
+
+@app.get("/headcount", response_model=Headcount)
+def get_headcount(at: Optional[datetime] = None, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                  project_id: Optional[int] = None, details: bool = True, db: Session = Depends(get_read_db)):
+    """Workers on site at `at` (default now), or at any point in [start, end), with per-project counts.
+
+    Answered from the interval index (see intervals.py) rather than by scanning clock entries."""
+    if start or end:
+        if not (start and end) or at: raise HTTPException(status_code=400, detail="Pass either at, or both start and end")
+        start, end = local_naive(start), local_naive(end)
+        if end <= start: raise HTTPException(status_code=400, detail="end must be after start")
+    else:
+        start = local_naive(at) or datetime.now(ist).replace(tzinfo=None)
+        end = start + timedelta(seconds=1)
+    # a worker with several entries in the window is counted once, under their latest one
+    latest = {}
+    for entry_id, worker_id, entry_project_id, clock_in_time, _ in intervals.overlapping(db, ClockEntryDB, start, end, project_id):
+        if worker_id not in latest or clock_in_time > latest[worker_id][2]: latest[worker_id] = (entry_id, entry_project_id, clock_in_time)
+    counts = {}
+    for _, entry_project_id, _ in latest.values(): counts[entry_project_id] = counts.get(entry_project_id, 0) + 1
+    project_names = names_by_id(db, ProjectDB, counts)
+    result = Headcount(start=start, end=end, total=len(latest), by_project=[
+        ProjectHeadcount(project_id=p, project_name=project_names.get(p, ""), workers=n) for p, n in sorted(counts.items())
+    ])
+    if details:
+        worker_names = names_by_id(db, WorkerDB, latest)
+        result.workers = [
+            OnSiteWorker(worker_id=w, worker_name=worker_names.get(w, ""), project_id=p, entry_id=e, clock_in_time=t)
+            for w, (e, p, t) in sorted(latest.items())
+        ]
+    return result
+
+# ---------- OCCUPANCY ----------
+import occupancy
+
+class OccupancyPoint(BaseModel):
+    start: datetime
+    average: float
+    peak: int
+
+class OccupancySeries(BaseModel):
+    project_id: int
+    project_name: str
+    points: List[OccupancyPoint]
+
+class DailyOccupancy(BaseModel):
+    project_id: int
+    day: date
+    peak: int
+    average: float
+    class Config:
+        orm_mode = True
+
+def occupancy_series(db: Session, start: datetime, end: datetime, width: timedelta, project_id: Optional[int] = None):
+    """occupancy.sweep() over the entries overlapping [start, end); open entries count until now."""
+    now = datetime.now(ist).replace(tzinfo=None)
+    rows = intervals.overlapping(db, ClockEntryDB, start, end, project_id)
+    return occupancy.sweep([r[3] for r in rows], [now if r[4] is None else r[4] for r in rows], [r[2] for r in rows], start, end, width)
+
+@app.get("/occupancy/", response_model=List[OccupancySeries])
+def get_occupancy(start: datetime, end: datetime, bucket_minutes: int = 60, project_id: Optional[int] = None, db: Session = Depends(get_read_db)):
+    """Workers clocked in over [start, end) per project: average and peak for each bucket_minutes bucket."""
+    start, end = local_naive(start), local_naive(end)
+    if end <= start or bucket_minutes <= 0: raise HTTPException(status_code=400, detail="Need start < end and bucket_minutes > 0")
+    width = timedelta(minutes=bucket_minutes)
+    try: projects, average, peak = occupancy_series(db, start, end, width, project_id)
+    except ValueError as exc: raise HTTPException(status_code=400, detail=str(exc))
+    names = names_by_id(db, ProjectDB, projects.tolist())
+    return [
+        OccupancySeries(project_id=p, project_name=names.get(p, ""), points=[
+            OccupancyPoint(start=start + width * j, average=round(float(average[i, j]), 3), peak=int(peak[i, j])) for j in range(average.shape[1])
+        ])
+        for i, p in enumerate(projects.tolist())
+    ]
+
+@app.get("/occupancy/daily", response_model=List[DailyOccupancy])
+def get_daily_occupancy(project_id: Optional[int] = None, start: Optional[date] = None, end: Optional[date] = None, db: Session = Depends(get_read_db)):
+    query = db.query(DailyOccupancyDB)
+    if project_id: query = query.filter(DailyOccupancyDB.project_id == project_id)
+    if start: query = query.filter(DailyOccupancyDB.day >= start)
+    if end: query = query.filter(DailyOccupancyDB.day < end)
+    return query.order_by(DailyOccupancyDB.day, DailyOccupancyDB.project_id).all()
+
+def roll_up_occupancy(today: Optional[date] = None) -> int:
+    """Fill daily_occupancy for closed days since the last run, and redo the days spanned by
+    entries that got punches or corrections after it. Returns the number of days computed."""
+    today = today or datetime.now(ist).date()
+    with SessionLocal() as db:
+        position = event_watermark(db)
+        last_day, last_position = db.execute(select(func.max(OccupancyDayDB.day), func.max(OccupancyDayDB.position))).one()
+        if last_day is None:  # rolled up before daily_occupancy_days existed, or never
+            last_day, last_position = db.execute(select(func.max(DailyOccupancyDB.day), func.max(DailyOccupancyDB.position))).one()
+        if last_day is None:
+            entries = partitions.source(db, ClockEntryDB)
+            first = db.execute(select(func.min(entries.clock_in_time))).scalar()
+            last_day = local_naive(first).date() - timedelta(days=1) if first else today - timedelta(days=1)
+        days = {last_day + timedelta(days=n) for n in range(1, (today - last_day).days)}
+        if last_position is not None:
+            # every interval a touched entry has had: a correction's event only holds the new times,
+            # and the days the entry was moved off need redoing too
+            touched = select(ClockEventDB.entry_id).where(ClockEventDB.id > last_position, ClockEventDB.id <= position)
+            spans = db.execute(select(ClockEventDB.clock_in_time, ClockEventDB.clock_out_time).where(
+                ClockEventDB.entry_id.in_(touched), ClockEventDB.id <= position)).all()
+            for clock_in, clock_out in spans:
+                first, last = clock_in.date(), min(clock_out.date(), today) if clock_out else today
+                days.update(first + timedelta(days=n) for n in range((last - first).days + 1))
+    days = sorted(d for d in days if d < today)
+    # one sweep per run of consecutive days, a month at most
+    runs = []
+    for day in days:
+        if runs and day == runs[-1][-1] + timedelta(days=1) and len(runs[-1]) < 31: runs[-1].append(day)
+        else: runs.append([day])
+    for run in runs:
+        start = datetime(run[0].year, run[0].month, run[0].day)
+        with SessionLocal() as db: projects, average, peak = occupancy_series(db, start, start + timedelta(days=len(run)), timedelta(days=1))
+        rows = [
+            {"project_id": p, "day": day, "peak": int(peak[i, j]), "average": round(float(average[i, j]), 3), "position": position}
+            for i, p in enumerate(projects.tolist()) for j, day in enumerate(run) if peak[i, j]
+        ]
+        def write(session: Session):
+            session.execute(DailyOccupancyDB.__table__.delete().where(DailyOccupancyDB.day >= run[0], DailyOccupancyDB.day <= run[-1]))
+            if rows: session.execute(DailyOccupancyDB.__table__.insert(), rows)
+            session.execute(OccupancyDayDB.__table__.delete().where(OccupancyDayDB.day >= run[0], OccupancyDayDB.day <= run[-1]))
+            session.execute(OccupancyDayDB.__table__.insert(), [{"day": day, "position": position} for day in run])
+        db = SessionLocal()
+        try: commit_write(db, write)
+        finally: db.close()
+    return len(days)
+
+# ---------- CLOCK-IN HEATMAP ----------
+class HeatmapRow(BaseModel):
+    project_id: int
+    project_name: str
+    clock_ins: List[int]  # 168 hours of the week, Monday 00:00 first
+
+class ClockInHeatmap(BaseModel):
+    start: date
+    end: date
+    total: List[int]
+    projects: List[HeatmapRow]
+
+def forget_heatmap_days(db: Session, event: ClockEventDB):
+    """Drop cached heatmap days that a backdated punch-in or a correction changes."""
+    days = {event.clock_in_time.date()}
+    if event.kind == "correction":
+        before = previous_event(db, event)
+        if before is not None: days.add(before.clock_in_time.date())
+    days = [d for d in days if d < datetime.now(ist).date()]
+    if days: db.execute(HeatmapDayDB.__table__.delete().where(HeatmapDayDB.day.in_(days)))
+
+def clock_ins_by_hour(db: Session, start: date, end: date) -> dict:
+    """{(day, hour, project_id): clock-ins} for local days in [start, end), one GROUP BY over a clock_in_time range
+    plus the archived entries in it."""
+    lo, hi = datetime(start.year, start.month, start.day), datetime(end.year, end.month, end.day)
+    entries = partitions.source(db, ClockEntryDB, lo, hi)
+    day = func.date(entries.clock_in_time)
+    hour = cast(func.strftime("%H", entries.clock_in_time), Integer) if engine.dialect.name == "sqlite" else cast(extract("hour", entries.clock_in_time), Integer)
+    rows = db.execute(
+        select(day, hour, entries.project_id, func.count())
+        .where(entries.clock_in_time >= lo, entries.clock_in_time < hi).group_by(day, hour, entries.project_id)
+    ).all()
+    counts = {(date.fromisoformat(str(d)), h, p): n for d, h, p, n in rows}
+    for r in archive.read(lo, hi, engine=engine):
+        key = (r["clock_in_time"].date(), r["clock_in_time"].hour, r["project_id"])
+        counts[key] = counts.get(key, 0) + 1
+    return counts
+
+@app.get("/heatmap/clock_ins", response_model=ClockInHeatmap)
+def get_clock_in_heatmap(start: Optional[date] = None, end: Optional[date] = None, project_id: Optional[int] = None, db: Session = Depends(get_db)):
+    """Clock-ins in [start, end) by hour of the week (local time) and project; defaults to the last 4 weeks.
+
+    Closed days are computed once and cached in clock_in_heatmap; only today and days
+    not cached yet (or invalidated by a late punch or correction) are counted again."""
+    today = datetime.now(ist).date()
+    end = end or today + timedelta(days=1)
+    start = start or end - timedelta(days=28)
+    if end <= start: raise HTTPException(status_code=400, detail="end must be after start")
+    cached = set(db.execute(select(HeatmapDayDB.day).where(HeatmapDayDB.day >= start, HeatmapDayDB.day < end)).scalars())
+    missing = [start + timedelta(days=n) for n in range((end - start).days) if start + timedelta(days=n) not in cached]
+    counts = {}
+    if cached:
+        cells = db.execute(select(ClockInHeatmapDB.day, ClockInHeatmapDB.hour, ClockInHeatmapDB.project_id, ClockInHeatmapDB.clock_ins)
+                           .where(ClockInHeatmapDB.day >= start, ClockInHeatmapDB.day < end)).all()
+        counts.update({(d, h, p): n for d, h, p, n in cells if d in cached})
+    if missing:
+        position = event_watermark(db)
+        fresh = clock_ins_by_hour(db, missing[0], missing[-1] + timedelta(days=1))
+        fresh = {key: n for key, n in fresh.items() if key[0] not in cached}
+        counts.update(fresh)
+        closed = [d for d in missing if d < today]
+        if closed:
+            def write(session: Session):
+                # skip days a punch or correction touched while we were counting; any correction could move entries, so skip all then
+                since = session.execute(select(ClockEventDB.kind, ClockEventDB.clock_in_time).where(
+                    ClockEventDB.id > position, ClockEventDB.kind.in_(["punch_in", "correction"]))).all()
+                if any(kind == "correction" for kind, _ in since): return
+                days = set(closed) - {ts.date() for _, ts in since}
+                if not days: return
+                session.execute(ClockInHeatmapDB.__table__.delete().where(ClockInHeatmapDB.day.in_(days)))
+                session.execute(HeatmapDayDB.__table__.delete().where(HeatmapDayDB.day.in_(days)))
+                rows = [{"day": d, "hour": h, "project_id": p, "clock_ins": n} for (d, h, p), n in fresh.items() if d in days]
+                if rows: session.execute(ClockInHeatmapDB.__table__.insert(), rows)
+                session.execute(HeatmapDayDB.__table__.insert(), [{"day": d} for d in days])
+            writer_db = SessionLocal()
+            try: commit_write(writer_db, write)
+            finally: writer_db.close()
+    matrix = {}
+    for (d, h, p), n in counts.items():
+        if project_id is not None and p != project_id: continue
+        matrix.setdefault(p, [0] * 168)[d.weekday() * 24 + h] += n
+    names = names_by_id(db, ProjectDB, matrix)
+    total = [sum(column) for column in zip(*matrix.values())] if matrix else [0] * 168
+    return ClockInHeatmap(start=start, end=end, total=total, projects=[
+        HeatmapRow(project_id=p, project_name=names.get(p, ""), clock_ins=row) for p, row in sorted(matrix.items())
+    ])
+
+def close_stale_entries(now: Optional[datetime] = None, max_hours: float = None, batch_size: int = None) -> int:
+    """Close entries still open max_hours after clock-in, at clock-in + max_hours, flagged auto_closed.
+
+    Walks the partial index over open entries batch_size at a time, one short transaction
+    per batch, and publishes clock_entry.auto_closed for each entry once its batch commits.
+    Returns the number of entries closed."""
+    max_hours = MAX_SHIFT_HOURS if max_hours is None else max_hours
+    batch_size = batch_size or AUTO_CLOSE_BATCH
+    cutoff = local_naive(now or datetime.now(ist)) - timedelta(hours=max_hours)
+    def write(session: Session):
+        entries = session.query(ClockEntryDB).filter(
+            ClockEntryDB.clock_out_time == None, ClockEntryDB.clock_in_time < cutoff
+        ).order_by(ClockEntryDB.clock_in_time).limit(batch_size).with_for_update(skip_locked=True).all()
+        for entry in entries:
+            entry.clock_out_time = local_naive(entry.clock_in_time) + timedelta(hours=max_hours)
+            entry.total_hours, entry.auto_closed = round(max_hours, 2), True
+        session.flush()
+        for entry in entries: record_event(session, "auto_close", entry, note=f"open longer than {max_hours:g}h")
+        return [{"entry_id": e.id, "worker_id": e.worker_id, "project_id": e.project_id, "clock_in_time": e.clock_in_time} for e in entries]
+    closed = 0
+    while True:
+        db = SessionLocal()
+        try: batch = commit_write(db, write)
+        finally: db.close()
+        for entry in batch: events.publish("clock_entry.auto_closed", **entry)
+        closed += len(batch)
+        if len(batch) < batch_size: return closed
+
+def names_by_id(db: Session, model, ids) -> dict:
+    ids, names = list(ids), {}
+    for i in range(0, len(ids), 500):
+        names.update(db.execute(select(model.id, model.name).where(model.id.in_(ids[i:i + 500]))).all())
+    return names
+
+def archived_entries(db: Session, start: Optional[datetime] = None, end: Optional[datetime] = None, worker_id: Optional[int] = None):
+    """Entries moved to the Parquet archive (see archive.py), with worker/project names filled in."""
+    rows = archive.read(start, end, worker_id, engine=engine)
+    if rows:
+        worker_names = names_by_id(db, WorkerDB, {r["worker_id"] for r in rows})
+        project_names = names_by_id(db, ProjectDB, {r["project_id"] for r in rows})
+        for r in rows:
+            r["worker_name"], r["project_name"] = worker_names.get(r["worker_id"], ""), project_names.get(r["project_id"], "")
+    return rows
+
+def local_naive(ts: Optional[datetime]):
+    """Stored clock times are naive IST wall-clock times; bring filter values to the same form."""
+    return ts.astimezone(ist).replace(tzinfo=None) if ts is not None and ts.tzinfo else ts
 
 @app.get("/clock_entries/", response_model=List[ClockEntryResponse])
-def get_clock_entries(db: Session = Depends(get_db)):
-    entries = db.query(ClockEntryDB).options(
-        joinedload(ClockEntryDB.worker), 
-        joinedload(ClockEntryDB.project)
-    ).order_by(ClockEntryDB.clock_in_time.desc()).all()
+def get_clock_entries(start: Optional[datetime] = None, end: Optional[datetime] = None, fields: Optional[str] = None, db: Session = Depends(get_read_db)):
+    start, end = local_naive(start), local_naive(end)
+    # only the month partitions overlapping [start, end) are read
+    entries_src = partitions.source(db, ClockEntryDB, start, end)
+    in_range = []
+    if start: in_range.append(entries_src.clock_in_time >= start)
+    if end: in_range.append(entries_src.clock_in_time < end)
+    columns = parse_fields(fields, CLOCK_ENTRY_FIELDS)
+    # entries older than the payroll period may have been archived; merged back in here
+    archived = archived_entries(db, start, end)
+    if columns:
+        columns = {name: getattr(entries_src, name) if col.table is ClockEntryDB.__table__ else col for name, col in columns.items()}
+        stmt = projected(columns, entries_src).where(*in_range)
+        if "worker_name" in columns: stmt = stmt.outerjoin(WorkerDB, WorkerDB.id == entries_src.worker_id)
+        if "project_name" in columns: stmt = stmt.outerjoin(ProjectDB, ProjectDB.id == entries_src.project_id)
+        if not archived: return sparse_response(db, stmt.order_by(entries_src.clock_in_time.desc()))
+        rows = [dict(r) for r in db.execute(stmt.add_columns(entries_src.clock_in_time.label("_sort"))).mappings()]
+        rows += [{**{name: r.get(name) for name in columns}, "_sort": r["clock_in_time"]} for r in archived]
+        rows.sort(key=lambda r: r["_sort"], reverse=True)
+        return JSONResponse(jsonable_encoder([{k: v for k, v in r.items() if k != "_sort"} for r in rows]))
+    entries = db.query(entries_src).options(
+        joinedload(entries_src.worker),
+        joinedload(entries_src.project)
+    ).filter(*in_range).order_by(entries_src.clock_in_time.desc()).all()
     
+    responses = [to_response(e) for e in entries]
+    if archived:
+        responses += [ClockEntryResponse(**r) for r in archived]
+        responses.sort(key=lambda r: r.clock_in_time, reverse=True)
+    return responses
+
+# -------------------------------
+# PAYROLL
+# -------------------------------
+import payroll
+
+class PayrollLine(BaseModel):
+    worker_id: int
+    worker_name: str
+    role: str
+    entries: int
+    rate: float
+    regular_hours: float
+    overtime_hours: float
+    night_hours: float
+    gross_pay: float
+
+def payroll_lines(db: Session, start: datetime, end: datetime, worker_id: Optional[int] = None) -> list:
+    """Pay for closed entries with clock_in_time in [start, end), one dict per worker (see payroll.py)."""
+    entries_src = partitions.source(db, ClockEntryDB, start, end)
+    epoch = payroll.epoch_column(entries_src.clock_in_time, db.get_bind().dialect.name)
+    stmt = select(entries_src.worker_id, entries_src.clock_in_time if epoch is None else epoch, entries_src.total_hours).where(
+        entries_src.clock_in_time >= start, entries_src.clock_in_time < end, entries_src.total_hours != None
+    )
+    if worker_id: stmt = stmt.where(entries_src.worker_id == worker_id)
+    # plain Core rows: ORM row processing would double the cost of a million-entry period
+    rows = db.connection().execute(stmt).all()
+    if epoch is None: rows = [(w, c, h) for (w, _, h), c in zip(rows, payroll.epoch_seconds([r[1] for r in rows]))]
+    archived = [r for r in archive.read(start, end, worker_id, engine=engine) if r["total_hours"] is not None]
+    if archived:
+        rows += zip([r["worker_id"] for r in archived], payroll.epoch_seconds([r["clock_in_time"] for r in archived]), [r["total_hours"] for r in archived])
+    if not rows: return []
+    worker_ids, clock_in, hours = zip(*rows)
+    workers = {w.id: w for w in db.execute(select(WorkerDB.id, WorkerDB.name, WorkerDB.role).where(WorkerDB.id == worker_id) if worker_id else select(WorkerDB.id, WorkerDB.name, WorkerDB.role))}
+    columns = payroll.compute(worker_ids, clock_in, hours, {w.id: w.role for w in workers.values()})
+    lines = payroll.rows(columns)
+    for line in lines:
+        worker = workers.get(line["worker_id"])
+        line["worker_name"], line["role"] = (worker.name, worker.role) if worker else ("", "")
+    return lines
+
+@app.get("/payroll/", response_model=List[PayrollLine])
+def get_payroll(start: datetime, end: datetime, worker_id: Optional[int] = None, db: Session = Depends(get_read_db)):
+    """Regular/overtime/night hours and gross pay per worker for entries clocked in during [start, end)."""
+    start, end = local_naive(start), local_naive(end)
+    if end <= start: raise HTTPException(status_code=400, detail="end must be after start")
+    # plain dicts of floats/ints: skip per-row model validation, it dominates for 100k workers
+    return JSONResponse(payroll_lines(db, start, end, worker_id))
+
+# -------------------------------
+# REPORTS (async jobs, see reports.py)
+# -------------------------------
+from fastapi.responses import FileResponse
+import reports
+
+class ReportSpec(BaseModel):
+    kind: str  # one of REPORTS
+    start: datetime
+    end: datetime
+    worker_id: Optional[int] = None
+    project_id: Optional[int] = None
+
+class ReportJob(BaseModel):
+    id: str
+    status: str
+    cached: bool
+    spec: dict
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    rows: Optional[int] = None
+    error: Optional[str] = None
+    result_url: Optional[str] = None
+
+def hours_by_worker_and_project(db: Session, spec: dict) -> dict:
+    """{(worker_id, project_id): [entries, hours]} for entries clocked in during the spec's range, archive included."""
+    start, end = spec["start"], spec["end"]
+    entries_src = partitions.source(db, ClockEntryDB, start, end)
+    stmt = select(entries_src.worker_id, entries_src.project_id, func.count(), func.coalesce(func.sum(entries_src.total_hours), 0.0)).where(
+        entries_src.clock_in_time >= start, entries_src.clock_in_time < end
+    ).group_by(entries_src.worker_id, entries_src.project_id)
+    if spec.get("worker_id"): stmt = stmt.where(entries_src.worker_id == spec["worker_id"])
+    if spec.get("project_id"): stmt = stmt.where(entries_src.project_id == spec["project_id"])
+    totals = {(w, p): [n, h] for w, p, n, h in db.execute(stmt)}
+    for r in archive.read(start, end, spec.get("worker_id"), engine=engine):
+        if spec.get("project_id") and r["project_id"] != spec["project_id"]: continue
+        total = totals.setdefault((r["worker_id"], r["project_id"]), [0, 0.0])
+        total[0] += 1; total[1] += r["total_hours"] or 0.0
+    return totals
+
+def worker_hours_report(db: Session, spec: dict) -> list:
+    by_worker = {}
+    for (worker_id, _), (entries, hours) in hours_by_worker_and_project(db, spec).items():
+        total = by_worker.setdefault(worker_id, [0, 0.0, 0])
+        total[0] += entries; total[1] += hours; total[2] += 1
+    workers = {w.id: w for w in db.execute(select(WorkerDB.id, WorkerDB.name, WorkerDB.role))}
+    return [
+        {"worker_id": w, "worker_name": workers[w].name if w in workers else "", "role": workers[w].role if w in workers else "",
+         "entries": entries, "hours": round(hours, 2), "projects": projects}
+        for w, (entries, hours, projects) in sorted(by_worker.items())
+    ]
+
+def project_labor_report(db: Session, spec: dict) -> list:
+    roles = dict(db.execute(select(WorkerDB.id, WorkerDB.role)).all())
+    by_project_role = {}
+    for (worker_id, project_id), (entries, hours) in hours_by_worker_and_project(db, spec).items():
+        total = by_project_role.setdefault((project_id, roles.get(worker_id) or ""), [0, 0.0, set()])
+        total[0] += entries; total[1] += hours; total[2].add(worker_id)
+    projects = names_by_id(db, ProjectDB, {p for p, _ in by_project_role})
     return [
-        ClockEntryResponse(
-            id=e.id, worker_id=e.worker_id, project_id=e.project_id,
-            worker_name=e.worker.name, project_name=e.project.name,
-            clock_in_time=e.clock_in_time, clock_out_time=e.clock_out_time, total_hours=e.total_hours
-        ) for e in entries
+        {"project_id": p, "project_name": projects.get(p, ""), "role": role, "workers": len(workers), "entries": entries, "hours": round(hours, 2)}
+        for (p, role), (entries, hours, workers) in sorted(by_project_role.items(), key=lambda kv: (kv[0][0] or 0, kv[0][1]))
     ]
 
-# (Unchanged Chatbot route)
+REPORTS = {"worker_hours": worker_hours_report, "project_labor": project_labor_report}
+
+def event_watermark(db: Session) -> int:
+    return db.execute(select(func.max(ClockEventDB.id))).scalar() or 0
+
+def compute_report(spec: dict):
+    # on the primary, and the watermark read in the same transaction as the report, so it can't be ahead of the data
+    with SessionLocal() as db:
+        watermark = event_watermark(db)
+        return watermark, REPORTS[spec["kind"]](db, spec)
+
+def report_is_stale(watermark: int, spec: dict) -> bool:
+    """Whether a punch, auto-close or correction touched the spec's range since watermark.
+
+    A correction can move an entry out of the range, and events only hold the new
+    times, so any correction counts."""
+    with SessionLocal() as db:
+        return db.execute(select(ClockEventDB.id).where(ClockEventDB.id > watermark, or_(
+            ClockEventDB.kind == "correction",
+            (ClockEventDB.clock_in_time >= spec["start"]) & (ClockEventDB.clock_in_time < spec["end"]),
+        )).limit(1)).first() is not None
+
+report_runner = reports.ReportRunner(write_engine, compute_report, report_is_stale)
+
+def to_report_job(job: dict) -> ReportJob:
+    return ReportJob(
+        **{k: job[k] for k in ("id", "status", "cached", "created_at", "started_at", "finished_at", "rows", "error")},
+        spec=json.loads(job["spec"]), result_url=f"/reports/jobs/{job['id']}/result" if job["status"] == "done" else None,
+    )
+
+@app.post("/reports/jobs", response_model=ReportJob, status_code=202)
+def submit_report(spec: ReportSpec):
+    if spec.kind not in REPORTS: raise HTTPException(status_code=400, detail=f"Unknown report kind, expected one of: {', '.join(REPORTS)}")
+    start, end = local_naive(spec.start), local_naive(spec.end)
+    if end <= start: raise HTTPException(status_code=400, detail="end must be after start")
+    return to_report_job(report_runner.submit({**spec.dict(), "start": start, "end": end}))
+
+@app.get("/reports/jobs/{job_id}", response_model=ReportJob)
+def get_report_job(job_id: str):
+    job = report_runner.get(job_id)
+    if not job: raise HTTPException(status_code=404, detail="Report job not found")
+    return to_report_job(job)
+
+@app.get("/reports/jobs/{job_id}/result")
+def get_report_result(job_id: str, request: Request):
+    job = report_runner.get(job_id)
+    if not job: raise HTTPException(status_code=404, detail="Report job not found")
+    if job["status"] != "done": raise HTTPException(status_code=409, detail=f"Report is {job['status']}")
+    path = report_runner.result_path(job)
+    if not os.path.exists(path): raise HTTPException(status_code=410, detail="Report result expired, submit it again")
+    # stored gzipped; sent as-is to clients that accept gzip (the compression middleware leaves encoded bodies alone)
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        return FileResponse(path, media_type="application/json", headers={"Content-Encoding": "gzip", "Vary": "Accept-Encoding"})
+    with gzip.open(path, "rb") as fh: return Response(fh.read(), media_type="application/json")
+
+# ---------- CHATBOT ----------
+import fuzzy
+# In-memory, per process; each lookup first loads names created since the last one (see fuzzy.py).
+name_indexes = {"worker": (fuzzy.NameIndex(), WorkerDB), "project": (fuzzy.NameIndex(), ProjectDB)}
+
+def lookup_names(db: Session, q: str, kind: str, limit: int = 5) -> list:
+    """[(id, name, edit distance, similarity)] of `kind` names closest to q."""
+    index, model = name_indexes[kind]
+    index.sync(lambda after: db.execute(select(model.id, model.name).where(model.id > after).order_by(model.id)).all())
+    return index.search(q, limit)
+
+def find_by_name(db: Session, q: str):
+    """The closest worker or project to q (the worker on a tie), the other one None."""
+    workers, projects = lookup_names(db, q, "worker", 1), lookup_names(db, q, "project", 1)
+    if workers and projects:
+        if projects[0][2] < workers[0][2]: workers = []
+        else: projects = []
+    worker = db.get(WorkerDB, workers[0][0]) if workers else None
+    project = db.get(ProjectDB, projects[0][0]) if projects else None
+    return worker, project
+
+class NameMatch(BaseModel):
+    kind: str
+    id: int
+    name: str
+    distance: int
+    similarity: float
+
+@app.get("/chatbot/lookup", response_model=List[NameMatch])
+def chatbot_lookup(q: str, kind: Optional[str] = None, limit: int = 5, db: Session = Depends(get_read_db)):
+    """Workers and projects whose names match q allowing typos, closest first."""
+    if kind is not None and kind not in name_indexes: raise HTTPException(status_code=400, detail="kind must be worker or project")
+    limit = max(1, min(limit, 50))
+    matches = [
+        NameMatch(kind=k, id=i, name=n, distance=d, similarity=sim)
+        for k in ([kind] if kind else list(name_indexes)) for i, n, d, sim in lookup_names(db, q, k, limit)
+    ]
+    return sorted(matches, key=lambda m: (m.distance, -m.similarity))[:limit]
+
+# ---------- intents (see intents.py) ----------
+import intents
+chat_plans = intents.PlanCache()
+PERIOD = (DailyTotalDB.day >= bindparam("start"), DailyTotalDB.day < bindparam("end"))
+
+def top_workers_plan(per_project: bool):
+    hours = func.sum(DailyTotalDB.hours).label("hours")
+    stmt = select(DailyTotalDB.worker_id, WorkerDB.name, hours).join(WorkerDB, WorkerDB.id == DailyTotalDB.worker_id).where(*PERIOD)
+    if per_project: stmt = stmt.where(DailyTotalDB.project_id == bindparam("project_id"))
+    return stmt.group_by(DailyTotalDB.worker_id, WorkerDB.name).order_by(desc(hours)).limit(bindparam("n"))
+
+CHAT_PLANS = {
+    "hours_worked": lambda: select(func.coalesce(func.sum(DailyTotalDB.hours), 0.0), func.coalesce(func.sum(DailyTotalDB.entries), 0))
+        .where(DailyTotalDB.worker_id == bindparam("worker_id"), *PERIOD),
+    "project_hours": lambda: select(func.coalesce(func.sum(DailyTotalDB.hours), 0.0), func.count(func.distinct(DailyTotalDB.worker_id)))
+        .where(DailyTotalDB.project_id == bindparam("project_id"), *PERIOD),
+    "active_workers": lambda: select(WorkerDB.name, WorkerDB.role, WorkerStatusDB.since).join(WorkerDB, WorkerDB.id == WorkerStatusDB.worker_id)
+        .where(WorkerStatusDB.project_id == bindparam("project_id"), WorkerStatusDB.entry_id != None).order_by(WorkerStatusDB.since),
+    "top_workers": lambda: top_workers_plan(False),
+    "top_workers_project": lambda: top_workers_plan(True),
+}
+
+def run_plan(db: Session, name: str, **params):
+    return db.execute(chat_plans.get(name, CHAT_PLANS[name]), params)
+
+def best_match(db: Session, q: str, kind: str, touched: set):
+    touched.add(("names", kind))
+    found = lookup_names(db, q, kind, 1)
+    if found: touched.add((kind, found[0][0]))
+    return found[0] if found else None
+
+def answer_intent(db: Session, intent: intents.Intent, touched: set) -> str:
+    """The reply to a parsed question: one aggregate query over daily_totals or worker_status.
+    What it read is added to `touched` (see chat_answers)."""
+    period = {"start": intent.start, "end": intent.end}
+    span = f"{intent.start:%d %b} – {intent.end - timedelta(days=1):%d %b}"
+    if intent.name == "hours_worked":
+        worker = best_match(db, intent.subject, "worker", touched)
+        if not worker: return f"❓ No worker found matching '{intent.subject}'."
+        hours, entries = run_plan(db, "hours_worked", worker_id=worker[0], **period).one()
+        return f"⏱️ {worker[1]} worked {hours:.2f} hours {intent.window} ({span}, {entries} shifts)."
+    if intent.name == "project_hours":
+        project = best_match(db, intent.subject, "project", touched)
+        if not project: return f"❓ No project found matching '{intent.subject}'."
+        hours, workers = run_plan(db, "project_hours", project_id=project[0], **period).one()
+        return f"📁 {project[1]}: {hours:.2f} hours by {workers} workers {intent.window} ({span})."
+    if intent.name == "active_workers":
+        project = best_match(db, intent.subject, "project", touched)
+        if not project: return f"❓ No project found matching '{intent.subject}'."
+        rows = run_plan(db, "active_workers", project_id=project[0]).all()
+        if not rows: return f"📁 Nobody is clocked in on {project[1]} right now."
+        lines = "".join(f"- {name} ({role}), since {since:%H:%M}\n" for name, role, since in rows)
+        return f"📁 {len(rows)} clocked in on {project[1]} right now:\n{lines}"
+    if intent.name == "top_workers":
+        project = best_match(db, intent.subject, "project", touched) if intent.subject else None
+        if intent.subject and not project: return f"❓ No project found matching '{intent.subject}'."
+        if project: rows = run_plan(db, "top_workers_project", project_id=project[0], n=intent.n, **period).all()
+        else:
+            touched.add(("punches",))
+            rows = run_plan(db, "top_workers", n=intent.n, **period).all()
+        if not rows: return f"No hours recorded {intent.window}."
+        where = f" on {project[1]}" if project else ""
+        lines = "".join(f"{i}. {name}: {hours:.2f} h\n" for i, (_, name, hours) in enumerate(rows, 1))
+        return f"🏆 Top {len(rows)} worker{'s' if len(rows) > 1 else ''}{where} {intent.window} ({span}):\n{lines}"
+    raise ValueError(intent.name)
+
+RECENT_ENTRIES = 10
+
+# ---------- answer cache ----------
+# Answers by question and day, tagged with what they read: ("worker", id) and ("project", id)
+# for the entities an answer is about, ("names", kind) for name lookups (a new name may match
+# better), ("punches",) for totals over everyone. Writes publish events after they commit and
+# the handlers below drop the answers holding the tags they change. Other processes' writes
+# don't reach these handlers: an answer also keeps the clock event watermark it was read at
+# (see answer_is_stale) and lasts at most CHATBOT_CACHE_TTL seconds, for name and assignment
+# changes, which aren't in the event log.
+chat_answers = intents.AnswerCache(int(os.getenv("CHATBOT_CACHE_SIZE", "2048")), ttl=float(os.getenv("CHATBOT_CACHE_TTL", "60")))
+
+def answer_is_stale(db: Session, watermark: int, tags) -> bool:
+    """Whether a clock event after watermark touched a worker or project the answer read (any
+    event for ("punches",)). Corrections can move an entry between projects, so they all count."""
+    workers = [tag[1] for tag in tags if tag[0] == "worker"]
+    projects = [tag[1] for tag in tags if tag[0] == "project"]
+    if ("punches",) in tags: touching = true()
+    elif workers or projects:
+        touching = or_(ClockEventDB.worker_id.in_(workers), ClockEventDB.project_id.in_(projects), ClockEventDB.kind == "correction")
+    else: return False
+    return db.execute(select(ClockEventDB.id).where(ClockEventDB.id > watermark, touching).limit(1)).first() is not None
+
+def punched(topic, payload):
+    chat_answers.invalidate(("worker", payload["worker_id"]), ("project", payload["project_id"]), ("punches",))
+
+def workers_assigned(topic, payload):
+    projects = {payload["project_id"], *payload["previous"].values()} - {None}
+    chat_answers.invalidate(*[("worker", w) for w in payload["worker_ids"]], *[("project", p) for p in projects])
+
+def worker_created(topic, payload):
+    chat_answers.invalidate(("names", "worker"), *([("project", payload["project_id"])] if payload["project_id"] else []))
+
+for topic in ("clock_entry.punched", "clock_entry.corrected", "clock_entry.auto_closed"): events.subscribe(topic, punched)
+events.subscribe("workers.assigned", workers_assigned)
+events.subscribe("workers.created", worker_created)
+events.subscribe("projects.created", lambda topic, payload: chat_answers.invalidate(("names", "project")))
+events.subscribe("workers.imported", lambda topic, payload: chat_answers.invalidate("*"))  # new names and project rosters
+
+# ---------- suggestions ----------
+# The chat page opens with a few prompts about recently active workers and the busiest projects
+# (on site now, then hours over the last 7 days). Kept per process in chat_suggestions, read from
+# the worker_status and daily_totals projections when older than CHATBOT_SUGGESTIONS_TTL seconds;
+# punches move their worker to the front in between.
+chat_suggestions = intents.Suggestions(ttl=float(os.getenv("CHATBOT_SUGGESTIONS_TTL", "300")))
+events.subscribe("clock_entry.punched", lambda topic, payload: chat_suggestions.touch(payload["worker_id"], payload["worker_name"]))
+
+class ChatSuggestion(BaseModel):
+    prompt: str
+    kind: str  # worker | project
+    id: int
+
+def refresh_chat_suggestions(db: Session):
+    size = chat_suggestions.size
+    workers = db.execute(
+        select(WorkerDB.id, WorkerDB.name).join(WorkerStatusDB, WorkerStatusDB.worker_id == WorkerDB.id)
+        .where(WorkerStatusDB.since != None).order_by(WorkerStatusDB.since.desc()).limit(size)
+    ).all()
+    on_site = dict(db.execute(
+        select(WorkerStatusDB.project_id, func.count()).where(WorkerStatusDB.entry_id != None)
+        .group_by(WorkerStatusDB.project_id).order_by(func.count().desc()).limit(size)
+    ).all())
+    today = datetime.now(ist).date()
+    hours = dict(db.execute(
+        select(DailyTotalDB.project_id, func.sum(DailyTotalDB.hours)).where(DailyTotalDB.day > today - timedelta(days=7))
+        .group_by(DailyTotalDB.project_id).order_by(func.sum(DailyTotalDB.hours).desc()).limit(size)
+    ).all())
+    busiest = sorted(on_site.keys() | hours.keys(), key=lambda p: (-on_site.get(p, 0), -hours.get(p, 0.0), p))[:size]
+    names = names_by_id(db, ProjectDB, busiest)
+    chat_suggestions.refresh(workers, [(p, names[p]) for p in busiest if p in names])
+
+@app.get("/chatbot/suggestions", response_model=List[ChatSuggestion])
+def get_chatbot_suggestions(limit: int = 4, db: Session = Depends(get_read_db)):
+    limit = max(1, min(limit, chat_suggestions.size))
+    # one request refreshes; the others keep serving the previous lists (or wait for the first)
+    if chat_suggestions.stale() and chat_suggestions.refresh_lock.acquire(blocking=chat_suggestions.refreshed is None):
+        try:
+            if chat_suggestions.stale(): refresh_chat_suggestions(db)
+        finally: chat_suggestions.refresh_lock.release()
+    return chat_suggestions.top(limit)
+
+@app.get("/chatbot/plans")
+def get_chatbot_plans():
+    return chat_plans.stats
+
+@app.get("/chatbot/cache")
+def get_chatbot_cache():
+    stats = dict(chat_answers.stats)
+    lookups = stats["hits"] + stats["misses"]
+    return {**stats, "size": len(chat_answers), "hit_rate": round(stats["hits"] / lookups, 3) if lookups else None}
+
 @app.post("/chatbot")
 def chatbot(request: ChatRequest, db: Session = Depends(get_db)):
-    q = request.query.lower().strip()
+    """Answers come from chat_answers when nothing they read has changed since. Misses are read
+    on the primary, so an answer is never cached from a replica lagging behind an invalidation."""
+    q, today = intents.cache_key(request.query), datetime.now(ist).date()
+    cached = chat_answers.get((q, today), lambda watermark, tags: answer_is_stale(db, watermark, tags))
+    if cached: return cached
+    version, watermark, touched = chat_answers.version(), event_watermark(db), set()
+    answer = answer_question(db, q, today, touched)
+    chat_answers.put((q, today), answer, touched, version, watermark)
+    return answer
+
+def answer_question(db: Session, q: str, today: date, touched: set) -> dict:
+    intent = intents.parse(q, today)
+    if intent: return {"response": answer_intent(db, intent, touched), "intent": intent.name}
     response = ""
-    worker = db.query(WorkerDB).filter(WorkerDB.name.ilike(f"%{q}%")).first()
-    project = db.query(ProjectDB).filter(ProjectDB.name.ilike(f"%{q}%")).first()
+    touched.update({("names", "worker"), ("names", "project")})
+    worker, project = find_by_name(db, q)
     if worker:
+        touched.add(("worker", worker.id))
         response += f"👷 Worker: {worker.name} (Role: {worker.role})\n"
         if worker.project: response += f"Assigned Project: {worker.project.name}\n"
-        entries = db.query(ClockEntryDB).filter(ClockEntryDB.worker_id == worker.id).all()
+        entries_src = partitions.source(db, ClockEntryDB)
+        recent = db.query(entries_src).filter(entries_src.worker_id == worker.id).order_by(entries_src.clock_in_time.desc()).limit(RECENT_ENTRIES).all()
+        entries = [(e.project.name, e.clock_in_time, e.clock_out_time) for e in recent]
+        if len(entries) < RECENT_ENTRIES:  # archived entries are older than any in the database
+            archived = sorted(archived_entries(db, worker_id=worker.id), key=lambda a: a["clock_in_time"], reverse=True)
+            entries += [(a["project_name"], a["clock_in_time"], a["clock_out_time"]) for a in archived[:RECENT_ENTRIES - len(entries)]]
         if entries:
-            response += "Clock Entries:\n"
-            for e in entries:
-                response += f"- Project {e.project.name}: In {e.clock_in_time.strftime('%Y-%m-%d %H:%M')}, Out {e.clock_out_time.strftime('%Y-%m-%d %H:%M') if e.clock_out_time else 'In progress'}\n"
+            response += "Recent Clock Entries:\n"
+            for project_name, clock_in_time, clock_out_time in entries:
+                response += f"- Project {project_name}: In {clock_in_time.strftime('%Y-%m-%d %H:%M')}, Out {clock_out_time.strftime('%Y-%m-%d %H:%M') if clock_out_time else 'In progress'}\n"
         else: response += "No clock entries yet.\n"
     elif project:
+        touched.add(("project", project.id))
         response += f"📁 Project: {project.name}\n"
         workers = db.query(WorkerDB).filter(WorkerDB.assigned_project_id == project.id).all()
         if workers:
@@ -284,4 +1560,55 @@ def chatbot(request: ChatRequest, db: Session = Depends(get_db)):
             for w in workers: response += f"- {w.name} ({w.role})\n"
         else: response += "No workers assigned.\n"
     else: response = "❓ No worker or project found matching query."
-    return {"response": response}
\ No newline at end of file
+    return {"response": response}
+
+# -------------------------------
+# SCHEDULED JOBS
+# -------------------------------
+# Each job's cron schedule can be overridden with SCHEDULE_<NAME> (e.g. SCHEDULE_ANALYZE="0 4 * * *"),
+# or "off" to disable it. Only one process per database runs them (see scheduler.py).
+import logging
+from scheduler import Scheduler, SystemClock
+SCHEDULER_ENABLED = os.getenv("SCHEDULER", "1") == "1"
+scheduler_log = logging.getLogger("scheduler")
+scheduler = Scheduler(write_engine, clock=SystemClock(ist), lease_seconds=float(os.getenv("SCHEDULER_LEASE_SECONDS", "60")))
+
+def roll_partitions():
+    if engine.dialect.name == "sqlite": return partitions.roll(write_engine, ClockEntryDB.__table__, log=scheduler_log.info)
+    with write_engine.begin() as conn: return partitions.ensure_postgres_partition(conn, partitions.next_month(datetime.now()))
+
+def analyze():
+    """Refresh planner statistics, so new indexes and skewed months get good plans."""
+    with write_engine.begin() as conn: conn.execute(text("ANALYZE"))
+
+def archive_closed_entries():
+    return archive.archive(write_engine, log=scheduler_log.info)
+
+def catch_up_projections():
+    import ledger
+    ledger.catch_up_all(log=scheduler_log.info)
+
+def schedule(name: str, default: str, fn):
+    cron = os.getenv(f"SCHEDULE_{name.upper()}", default)
+    if cron != "off": scheduler.add(name, cron, fn, jitter=float(os.getenv("SCHEDULER_JITTER_SECONDS", "30")))
+
+schedule("close_stale", "*/5 * * * *", close_stale_entries)
+schedule("projections", "*/15 * * * *", catch_up_projections)
+schedule("roll_partitions", "10 0 * * *", roll_partitions)
+schedule("occupancy_rollup", "30 0 * * *", roll_up_occupancy)
+schedule("analyze", "0 3 * * *", analyze)
+schedule("archive", "off", archive_closed_entries)  # deletes from the live table, so opt-in
+schedule("reports_cleanup", "20 3 * * *", report_runner.cleanup)
+
+@app.get("/scheduler/jobs")
+def get_scheduler_jobs():
+    """This process's view: whether it holds the lease, and per-job metrics."""
+    return {
+        "holder": scheduler.holder, "leader": scheduler.is_leader,
+        "jobs": [{"name": name, **metrics} for name, metrics in scheduler.metrics.items()],
+    }
+
+@app.get("/scheduler/runs")
+def get_scheduler_runs(job: Optional[str] = None, limit: int = 50):
+    """Recent runs of all processes, newest first."""
+    return scheduler.history_rows(job, min(limit, 500))
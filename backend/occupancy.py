@@ -0,0 +1,89 @@
+"""Concurrent occupancy: how many workers were clocked in over time, per project.
+
+Every clock entry overlapping the window becomes two events, +1 at clock-in and -1 at
+clock-out (clipped to the window; open entries end now). Sorted by project and time,
+their running sum is the occupancy step function, so one cumsum gives it for all
+projects at once. Per time bucket:
+
+* peak: the highest occupancy reached in the bucket
+* average: the integral of occupancy over the bucket divided by its length, i.e. the
+  mean number of workers clocked in (worker-hours / hours)
+
+The daily rollup (main.DailyOccupancyDB) is the same sweep with one-day buckets, run
+by the occupancy_rollup job for days that closed or were corrected since its last run.
+
+    python -m occupancy roll-up
+
+Needs numpy (pip install numpy).
+"""
+from datetime import datetime, timedelta
+
+SECOND = timedelta(seconds=1)
+MAX_BUCKETS = 5_000
+
+
+def to_seconds(values, origin: datetime):
+    import numpy as np
+    return np.fromiter(((v - origin) // SECOND for v in values), dtype=np.int64, count=len(values))
+
+
+def sweep(clock_in, clock_out, project_ids, start: datetime, end: datetime, width: timedelta):
+    """Occupancy of [start, end) in buckets of `width` for entries given as parallel
+    sequences (clock_out None = still open, counted until `end`).
+
+    Returns (project ids, average, peak), the last two project x bucket arrays."""
+    import numpy as np
+    span, step = (end - start) // SECOND, width // SECOND
+    buckets = -(-span // step)
+    if buckets > MAX_BUCKETS: raise ValueError(f"{buckets} buckets, at most {MAX_BUCKETS}")
+    t_in = np.clip(to_seconds(clock_in, start), 0, span)
+    t_out = np.clip(to_seconds([end if t is None else t for t in clock_out], start), 0, span)
+    keep = t_out > t_in
+    projects, group = np.unique(np.asarray(project_ids, dtype=np.int64)[keep], return_inverse=True)
+    average, peak = np.zeros((len(projects), buckets)), np.zeros((len(projects), buckets), dtype=np.int64)
+    if not len(projects): return projects, average, peak
+
+    times = np.concatenate([t_in[keep], t_out[keep]])
+    delta = np.concatenate([np.ones(len(group), dtype=np.int64), -np.ones(len(group), dtype=np.int64)])
+    group = np.concatenate([group, group])
+    # by project, then time, with clock-outs before clock-ins at the same second (intervals are half-open)
+    order = np.lexsort((delta, times, group))
+    times, delta, group = times[order], delta[order], group[order]
+    occupancy = np.cumsum(delta)  # each project's events sum to zero, so the sum restarts at every project
+
+    # area under the step function up to each event; the segment after a project's last event is empty
+    segment = np.zeros(len(times), dtype=np.int64)
+    same = group[1:] == group[:-1]
+    segment[:-1] = np.where(same, np.diff(times), 0)
+    area = np.concatenate([[0], np.cumsum(occupancy[:-1] * segment[:-1])])
+    key = group * (span + 1) + times  # sorted, so searchsorted finds the last event at or before a time
+
+    boundaries = np.minimum(np.arange(buckets + 1) * step, span)
+    query = (np.arange(len(projects))[:, None] * (span + 1) + boundaries[None, :]).ravel()
+    last = np.searchsorted(key, query, side="right") - 1
+    valid = (last >= 0) & (group[np.maximum(last, 0)] == np.repeat(np.arange(len(projects)), buckets + 1))
+    last = np.maximum(last, 0)
+    first = np.searchsorted(key, np.arange(len(projects)) * (span + 1), side="left")
+    at_boundary = np.where(valid, occupancy[last], 0).reshape(len(projects), buckets + 1)
+    cumulative = np.where(
+        valid, area[last] - area[first[np.repeat(np.arange(len(projects)), buckets + 1)]] + occupancy[last] * (query - key[last]), 0,
+    ).reshape(len(projects), buckets + 1)
+    average = np.diff(cumulative, axis=1) / np.diff(boundaries)[None, :]
+
+    # the level a bucket opens at, and every level an event inside it reaches
+    peak = at_boundary[:, :-1].copy()
+    np.maximum.at(peak, (group, np.minimum(times // step, buckets - 1)), occupancy)
+    return projects, average, peak
+
+
+def main():
+    import argparse
+    import main as app
+    parser = argparse.ArgumentParser(description="Occupancy rollups")
+    parser.add_argument("command", choices=["roll-up"])
+    parser.parse_args()
+    print(f"rolled up {app.roll_up_occupancy():,} days")
+
+
+if __name__ == "__main__":
+    main()
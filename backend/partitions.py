@@ -0,0 +1,205 @@
+"""Monthly partitions for clock_entries.
+
+PostgreSQL: clock_entries is created as a native RANGE (clock_in_time) partitioned
+table. Inserts are routed by the server, range filters are pruned by the planner, and
+a DEFAULT partition catches months that haven't been created yet.
+
+SQLite has no partitioning, so clock_entries stays the live table that every punch is
+written to (open shifts and the current month live there). ``roll()`` moves closed
+entries of earlier months into per-month tables (clock_entries_YYYYMM), keeping their
+ids. Reads go through ``source()``, which returns the live table UNION ALL only the
+month tables that overlap the requested clock_in_time range; the list of month tables
+is cached until the schema changes. ``restore()`` moves an entry back into the live
+table to correct it; the next roll files it again, under its possibly new month.
+
+    python -m partitions roll       # move closed rows of past months out of the live table
+    python -m partitions list
+"""
+import re
+from datetime import datetime
+
+from sqlalchemy import Column, Index, MetaData, PrimaryKeyConstraint, Table, func, inspect, select, text, union_all
+from sqlalchemy.orm import aliased
+from sqlalchemy.schema import CreateTable
+
+PARENT = "clock_entries"
+NAME_RE = re.compile(rf"^{PARENT}_(\d{{4}})(\d{{2}})$")
+_listed = {}  # database url -> (PRAGMA schema_version, list_partitions())
+
+
+def month_start(ts: datetime) -> datetime:
+    return datetime(ts.year, ts.month, 1)
+
+
+def next_month(ts: datetime) -> datetime:
+    return datetime(ts.year + ts.month // 12, ts.month % 12 + 1, 1)
+
+
+def partition_name(ts: datetime) -> str:
+    return f"{PARENT}_{ts.year:04d}{ts.month:02d}"
+
+
+def partition_bounds(name: str):
+    match = NAME_RE.match(name)
+    if not match: return None
+    start = datetime(int(match.group(1)), int(match.group(2)), 1)
+    return start, next_month(start)
+
+
+def partition_table(parent: Table, name: str) -> Table:
+    """A month table with the parent's columns. No foreign keys: rows were checked when they hit the live table."""
+    return Table(
+        name, MetaData(),
+        *[Column(c.name, c.type, primary_key=c.primary_key) for c in parent.columns],
+        Index(f"ix_{name}_clock_in_time", "clock_in_time"),
+        Index(f"ix_{name}_worker_id", "worker_id"),
+    )
+
+
+def list_partitions(bind) -> list:
+    """Existing month tables as (name, start, end), oldest first."""
+    names = inspect(bind).get_table_names()
+    found = [(n, *partition_bounds(n)) for n in names if NAME_RE.match(n)]
+    return sorted(found, key=lambda p: p[1])
+
+
+def cached_partitions(conn) -> list:
+    """list_partitions() for SQLite, re-read only when the schema version moved on, i.e. after
+    a roll or archive run (in any process) created or dropped a month table."""
+    version = conn.exec_driver_sql("PRAGMA schema_version").scalar()
+    key = str(conn.engine.url)
+    listed = _listed.get(key)
+    if listed is None or listed[0] != version:
+        listed = _listed[key] = (version, list_partitions(conn))
+    return listed[1]
+
+
+# -------------------------------
+# POSTGRESQL (native partitioning)
+# -------------------------------
+def install_postgres(engine, parent: Table):
+    """Create clock_entries as a partitioned table (plus a DEFAULT partition) before create_all() sees it.
+
+    The primary key has to include the partition key, so the database-side key is
+    (id, clock_in_time); the ORM keeps treating id alone as the identity. Indexes are
+    left to create_all()/the index check in main.py, Postgres cascades them to partitions."""
+    with engine.begin() as conn:
+        if not inspect(conn).has_table(PARENT):
+            referenced = {fk.column.table for fk in parent.foreign_keys}
+            parent.metadata.create_all(bind=conn, tables=list(referenced))
+            metadata = MetaData()
+            for table in referenced: table.to_metadata(metadata)
+            partitioned = parent.to_metadata(metadata)
+            partitioned.c.clock_in_time.nullable = False
+            partitioned.c.id.autoincrement = True  # keep SERIAL with the composite key
+            partitioned.append_constraint(PrimaryKeyConstraint(partitioned.c.id, partitioned.c.clock_in_time))
+            partitioned.dialect_options["postgresql"]["partition_by"] = "RANGE (clock_in_time)"
+            conn.execute(CreateTable(partitioned))
+            conn.execute(text(f"CREATE TABLE IF NOT EXISTS {PARENT}_default PARTITION OF {PARENT} DEFAULT"))
+        now = datetime.now()
+        for month in (month_start(now), next_month(now)):
+            ensure_postgres_partition(conn, month)
+
+
+def ensure_postgres_partition(conn, ts: datetime):
+    """Create the month partition for `ts` ahead of time (rows otherwise land in DEFAULT,
+    and a month can't be split out of DEFAULT once it holds rows for it)."""
+    start = month_start(ts)
+    name = partition_name(start)
+    if inspect(conn).has_table(name): return name
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {PARENT} "
+        f"FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{next_month(start):%Y-%m-%d}')"
+    ))
+    return name
+
+
+# -------------------------------
+# SQLITE (live table + month tables)
+# -------------------------------
+def roll(engine, parent: Table, now: datetime = None, log=print) -> int:
+    """Move closed entries that started before the current month into their month tables."""
+    cutoff = month_start(now or datetime.now())
+    moved = 0
+    with engine.connect() as conn:
+        # reflected, so columns the model doesn't know about move along too
+        parent = Table(parent.name, MetaData(), autoload_with=conn)
+        months = conn.execute(
+            select(func.strftime("%Y-%m", parent.c.clock_in_time).label("month"))
+            .where(parent.c.clock_in_time < cutoff, parent.c.clock_out_time.isnot(None))
+            .group_by("month")
+        ).scalars().all()
+    for month in months:
+        start = datetime.strptime(month, "%Y-%m")
+        table = partition_table(parent, partition_name(start))
+        with engine.begin() as conn:
+            table.create(bind=conn, checkfirst=True)
+            # never move the row holding the highest id, or SQLite would hand that id out again
+            predicate = (
+                (parent.c.clock_in_time >= start) & (parent.c.clock_in_time < next_month(start))
+                & parent.c.clock_out_time.isnot(None)
+                & (parent.c.id < select(func.max(parent.c.id)).scalar_subquery())
+            )
+            columns = [c.name for c in parent.columns if c.name in table.c]
+            conn.execute(table.insert().from_select(columns, select(*[parent.c[c] for c in columns]).where(predicate)))
+            count = conn.execute(parent.delete().where(predicate)).rowcount
+        moved += count
+        log(f"{table.name}: moved {count:,} entries")
+    return moved
+
+
+def locate(conn, parent: Table, entry_id: int):
+    """(month table name, row) of entry `entry_id` if a month table holds it, else None."""
+    for name, _, _ in cached_partitions(conn):
+        table = partition_table(parent, name)
+        row = conn.execute(select(table).where(table.c.id == entry_id)).mappings().first()
+        if row is not None: return name, row
+    return None
+
+
+def restore(conn, parent: Table, name: str, entry_id: int):
+    """Move entry `entry_id` from month table `name` back into the live table, in the caller's transaction."""
+    table = Table(name, MetaData(), autoload_with=conn)
+    live = Table(parent.name, MetaData(), autoload_with=conn)
+    columns = [c.name for c in live.columns if c.name in table.c]
+    conn.execute(live.insert().from_select(columns, select(*[table.c[c] for c in columns]).where(table.c.id == entry_id)))
+    conn.execute(table.delete().where(table.c.id == entry_id))
+
+
+def source(db, entity, start: datetime = None, end: datetime = None):
+    """The entity to query clock entries through for clock_in_time in [start, end).
+
+    On SQLite with month tables this is `entity` aliased over the live table UNION ALL
+    the overlapping month tables; everywhere else it's `entity` itself."""
+    bind = db.get_bind()
+    if bind.dialect.name != "sqlite": return entity
+    parent = entity.__table__
+    overlapping = [name for name, lo, hi in cached_partitions(db.connection()) if (end is None or lo < end) and (start is None or hi > start)]
+    if not overlapping: return entity
+    columns = [c.name for c in parent.columns]
+    selects = [select(*[parent.c[c] for c in columns])]
+    for name in overlapping:
+        table = partition_table(parent, name)
+        selects.append(select(*[table.c[c] for c in columns]))
+    return aliased(entity, union_all(*selects).subquery(PARENT), adapt_on_names=True)
+
+
+def main():
+    import argparse
+    import main as app
+    parser = argparse.ArgumentParser(description="Manage clock_entries month partitions")
+    parser.add_argument("command", choices=["roll", "list"])
+    args = parser.parse_args()
+    if args.command == "roll":
+        if app.engine.dialect.name == "sqlite":
+            print(f"moved {roll(app.engine, app.ClockEntryDB.__table__):,} entries")
+        else:
+            with app.engine.begin() as conn:
+                print(ensure_postgres_partition(conn, next_month(datetime.now())), "ready")
+        return
+    for name, lo, hi in list_partitions(app.engine):
+        print(f"{name}  {lo:%Y-%m-%d} .. {hi:%Y-%m-%d}")
+
+
+if __name__ == "__main__":
+    main()
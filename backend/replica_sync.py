@@ -0,0 +1,39 @@
+"""Local read-replica setup with two SQLite files.
+
+Copies the primary database into the replica file with SQLite's online backup API,
+once or every --interval seconds. The interval also gives you replication lag to
+test read-your-writes against.
+
+    python replica_sync.py --primary project_management.db --replica replica.db --interval 2
+    REPLICA_DATABASE_URL=sqlite:///./replica.db uvicorn main:app
+"""
+import argparse
+import sqlite3
+import time
+
+
+def sync(primary: str, replica: str, pages_per_step: int = 1024):
+    source = sqlite3.connect(primary)
+    target = sqlite3.connect(replica, timeout=30)
+    try:
+        source.backup(target, pages=pages_per_step)
+    finally:
+        target.close(); source.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Copy a primary SQLite database to a replica file")
+    parser.add_argument("--primary", default="project_management.db")
+    parser.add_argument("--replica", default="replica.db")
+    parser.add_argument("--interval", type=float, default=0, help="keep syncing every N seconds (0 = once)")
+    args = parser.parse_args()
+    while True:
+        started = time.perf_counter()
+        sync(args.primary, args.replica)
+        print(f"synced {args.primary} -> {args.replica} in {(time.perf_counter() - started) * 1000:.0f} ms", flush=True)
+        if not args.interval: break
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""Asynchronous report jobs with a result cache.
+
+A report spec (a dict) is submitted as a job and computed on a thread pool; clients
+poll the job and download the result, a gzipped JSON file under REPORT_DIR. Results
+are cached by the hash of the normalized spec together with a watermark (the clock
+event offset the report was computed at, see main.ClockEventDB). A cached result is
+reused until a punch, correction or auto-close lands in the report's date range after
+that watermark, which is checked against the event log on every lookup, so a punch
+handled by another process invalidates it too.
+
+Identical specs submitted while one is still queued or running share that job. Each
+runner owns the jobs it queued and refreshes their heartbeat_at while it's alive; jobs
+whose heartbeat stopped (the process was shut down or crashed) aren't shared, and are
+marked failed when a runner starts and by cleanup().
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import Boolean, Column, DateTime, Integer, MetaData, String, Table, Text, delete, insert, inspect, or_, select, text, update
+
+log = logging.getLogger("reports")
+REPORT_DIR = os.getenv("REPORT_DIR", "./reports")
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", "2"))
+REPORT_RETENTION_DAYS = float(os.getenv("REPORT_RETENTION_DAYS", "7"))
+HEARTBEAT_SECONDS = float(os.getenv("REPORT_HEARTBEAT_SECONDS", "10"))
+
+metadata = MetaData()
+jobs = Table(
+    "report_jobs", metadata,
+    Column("id", String, primary_key=True),
+    Column("spec_hash", String, nullable=False, index=True),
+    Column("spec", Text, nullable=False),
+    Column("status", String, nullable=False),  # queued | running | done | failed
+    Column("cached", Boolean, nullable=False, default=False),
+    Column("created_at", DateTime, nullable=False),
+    Column("started_at", DateTime, nullable=True),
+    Column("finished_at", DateTime, nullable=True),
+    Column("rows", Integer, nullable=True),
+    Column("result_file", String, nullable=True),
+    Column("error", Text, nullable=True),
+    Column("owner", String, nullable=True),  # the ReportRunner that queued it
+    Column("heartbeat_at", DateTime, nullable=True),
+)
+cache = Table(
+    "report_cache", metadata,
+    Column("spec_hash", String, primary_key=True),
+    Column("watermark", Integer, nullable=False),
+    Column("result_file", String, nullable=False),
+    Column("rows", Integer, nullable=False),
+    Column("created_at", DateTime, nullable=False),
+)
+
+
+def spec_hash(spec: dict) -> str:
+    return hashlib.sha256(json.dumps(spec, sort_keys=True, default=str).encode()).hexdigest()[:32]
+
+
+class ReportRunner:
+    """compute(spec) -> (watermark, rows) runs a report; is_stale(watermark, spec) -> bool
+    says whether data the spec covers changed after watermark."""
+
+    def __init__(self, engine, compute, is_stale, directory: str = None, workers: int = None, heartbeat_seconds: float = None):
+        self.engine, self.compute, self.is_stale = engine, compute, is_stale
+        self.directory = directory or REPORT_DIR
+        self.pool = ThreadPoolExecutor(workers or REPORT_WORKERS, thread_name_prefix="report")
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.heartbeat_seconds = heartbeat_seconds or HEARTBEAT_SECONDS
+        metadata.create_all(bind=engine)
+        with engine.begin() as conn:
+            existing = {c["name"] for c in inspect(conn).get_columns(jobs.name)}
+            for column in ("owner", "heartbeat_at"):
+                if column not in existing:
+                    conn.execute(text(f"ALTER TABLE {jobs.name} ADD COLUMN {column} {jobs.c[column].type.compile(dialect=engine.dialect)}"))
+        self.fail_abandoned()
+        # runs until the process exits: jobs still running after shutdown() stay claimed while they finish
+        threading.Thread(target=self._heartbeat, name="report-heartbeat", daemon=True).start()
+
+    # ---------- liveness ----------
+    def abandoned_before(self) -> datetime:
+        return datetime.now() - timedelta(seconds=3 * self.heartbeat_seconds)
+
+    def _heartbeat(self):
+        while True:
+            time.sleep(self.heartbeat_seconds)
+            try:
+                with self.engine.begin() as conn:
+                    conn.execute(update(jobs).where(jobs.c.owner == self.owner, jobs.c.status.in_(["queued", "running"])).values(heartbeat_at=datetime.now()))
+            except Exception:
+                log.exception("could not refresh report job heartbeats")
+
+    def fail_abandoned(self) -> int:
+        """Mark queued/running jobs whose owner stopped refreshing them as failed."""
+        with self.engine.begin() as conn:
+            return conn.execute(
+                update(jobs).where(
+                    jobs.c.status.in_(["queued", "running"]),
+                    or_(jobs.c.heartbeat_at.is_(None), jobs.c.heartbeat_at < self.abandoned_before()),
+                ).values(status="failed", finished_at=datetime.now(), error="abandoned: the process running it stopped")
+            ).rowcount
+
+    def submit(self, spec: dict) -> dict:
+        """Create a job for spec (done at once on a cache hit) and return it."""
+        key, now = spec_hash(spec), datetime.now()
+        with self.engine.begin() as conn:
+            hit = conn.execute(select(cache).where(cache.c.spec_hash == key)).mappings().first()
+            if hit and not self.is_stale(hit["watermark"], spec):
+                job_id = uuid.uuid4().hex
+                conn.execute(insert(jobs).values(
+                    id=job_id, spec_hash=key, spec=json.dumps(spec, default=str), status="done", cached=True,
+                    created_at=now, started_at=now, finished_at=now, rows=hit["rows"], result_file=hit["result_file"],
+                ))
+                return self.get(job_id, conn)
+            pending = conn.execute(
+                select(jobs.c.id).where(
+                    jobs.c.spec_hash == key, jobs.c.status.in_(["queued", "running"]), jobs.c.heartbeat_at >= self.abandoned_before(),
+                ).order_by(jobs.c.created_at.desc())
+            ).scalar()
+            if pending: return self.get(pending, conn)
+            job_id = uuid.uuid4().hex
+            conn.execute(insert(jobs).values(
+                id=job_id, spec_hash=key, spec=json.dumps(spec, default=str), status="queued", cached=False, created_at=now,
+                owner=self.owner, heartbeat_at=now,
+            ))
+        self.pool.submit(self.run, job_id, key, spec)
+        return self.get(job_id)
+
+    def get(self, job_id: str, conn=None):
+        if conn is None:
+            with self.engine.connect() as conn: return self.get(job_id, conn)
+        row = conn.execute(select(jobs).where(jobs.c.id == job_id)).mappings().first()
+        return dict(row) if row else None
+
+    def result_path(self, job: dict) -> str:
+        return os.path.join(self.directory, job["result_file"])
+
+    def run(self, job_id: str, key: str, spec: dict):
+        with self.engine.begin() as conn:
+            conn.execute(update(jobs).where(jobs.c.id == job_id).values(status="running", started_at=datetime.now(), heartbeat_at=datetime.now()))
+        try:
+            watermark, rows = self.compute(spec)
+            name = f"{key}-{watermark}.json.gz"
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(self.directory, name)
+            with gzip.open(path + ".tmp", "wt", compresslevel=6) as fh: json.dump(rows, fh, default=str)
+            os.replace(path + ".tmp", path)
+            with self.engine.begin() as conn:
+                conn.execute(delete(cache).where(cache.c.spec_hash == key))
+                conn.execute(insert(cache).values(spec_hash=key, watermark=watermark, result_file=name, rows=len(rows), created_at=datetime.now()))
+                conn.execute(update(jobs).where(jobs.c.id == job_id).values(status="done", finished_at=datetime.now(), rows=len(rows), result_file=name))
+        except Exception:
+            log.exception("report job %s failed", job_id)
+            with self.engine.begin() as conn:
+                conn.execute(update(jobs).where(jobs.c.id == job_id).values(status="failed", finished_at=datetime.now(), error=traceback.format_exc()))
+
+    def cleanup(self, retention_days: float = None) -> int:
+        """Forget jobs older than the retention period and delete result files nothing refers to any more."""
+        cutoff = datetime.now() - timedelta(days=REPORT_RETENTION_DAYS if retention_days is None else retention_days)
+        self.fail_abandoned()
+        with self.engine.begin() as conn:
+            removed = conn.execute(delete(jobs).where(jobs.c.created_at < cutoff, jobs.c.status.in_(["done", "failed"]))).rowcount
+            conn.execute(delete(cache).where(cache.c.created_at < cutoff))
+            used = set(conn.execute(select(jobs.c.result_file).where(jobs.c.result_file.isnot(None))).scalars())
+            used |= set(conn.execute(select(cache.c.result_file)).scalars())
+        if os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                if name.endswith(".json.gz") and name not in used: os.remove(os.path.join(self.directory, name))
+        return removed
+
+    def shutdown(self):
+        """Cancel queued jobs (marked failed, so they aren't shared) and let running ones finish."""
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        with self.engine.begin() as conn:
+            conn.execute(update(jobs).where(jobs.c.owner == self.owner, jobs.c.status == "queued").values(
+                status="failed", finished_at=datetime.now(), error="cancelled: the server shut down before it started",
+            ))
@@ -0,0 +1,291 @@
+"""In-process job scheduler for periodic maintenance.
+
+Jobs have cron schedules ("*/5 * * * *", "@daily", ...) evaluated on the local wall
+clock, plus optional random jitter so several deployments don't all start at :00. One
+background thread per process runs them one at a time.
+
+With several uvicorn workers (or hosts) sharing a database, only the holder of the
+``scheduler_lease`` row runs jobs. The lease expires ``lease_seconds`` after its last
+renewal, so a crashed holder is replaced within that time. It is renewed on every tick
+and, while a job runs, by a heartbeat thread, so a job longer than the lease doesn't
+let another process start the same jobs. Every run is recorded in
+``scheduler_runs`` (the last ``history`` runs per job are kept), and per-job counters
+live in ``Scheduler.metrics``.
+
+Time comes from a clock object, so tests drive the scheduler with ``FakeClock`` and
+``tick()`` instead of sleeping:
+
+    clock = FakeClock(datetime(2026, 1, 1))
+    scheduler = Scheduler(engine, clock=clock)
+    scheduler.add("ping", "*/5 * * * *", ping)
+    clock.advance(minutes=5); scheduler.tick()
+"""
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, Text, delete, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+
+log = logging.getLogger("scheduler")
+
+metadata = MetaData()
+leases = Table(
+    "scheduler_lease", metadata,
+    Column("name", String, primary_key=True),
+    Column("holder", String, nullable=False),
+    Column("expires_at", DateTime, nullable=False),
+)
+runs = Table(
+    "scheduler_runs", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("job", String, nullable=False, index=True),
+    Column("holder", String, nullable=False),
+    Column("scheduled_for", DateTime, nullable=False),
+    Column("started_at", DateTime, nullable=False),
+    Column("finished_at", DateTime, nullable=False),
+    Column("status", String, nullable=False),  # ok | failed
+    Column("result", Text, nullable=True),
+    Column("error", Text, nullable=True),
+)
+
+
+# -------------------------------
+# CRON
+# -------------------------------
+ALIASES = {"@hourly": "0 * * * *", "@daily": "0 0 * * *", "@weekly": "0 0 * * 0", "@monthly": "0 0 1 * *", "@yearly": "0 0 1 1 *"}
+FIELDS = [("minute", 0, 59), ("hour", 0, 23), ("day", 1, 31), ("month", 1, 12), ("weekday", 0, 7)]
+
+
+def parse_field(text: str, lo: int, hi: int) -> set:
+    values = set()
+    for part in text.split(","):
+        body, _, step = part.partition("/")
+        if body == "*": start, end = lo, hi
+        elif "-" in body: start, end = (int(v) for v in body.split("-"))
+        else: start = end = int(body)
+        if step and body != "*" and "-" not in body: end = hi  # "5/15" means every 15 from 5
+        if start < lo or end > hi or start > end: raise ValueError(f"{part!r} is out of range {lo}-{hi}")
+        values.update(range(start, end + 1, int(step or 1)))
+    return values
+
+
+class Cron:
+    """A five-field cron expression: minute hour day-of-month month day-of-week (0 or 7 = Sunday)."""
+
+    def __init__(self, expr: str):
+        self.expr = expr
+        fields = ALIASES.get(expr, expr).split()
+        if len(fields) != 5: raise ValueError(f"cron expression needs 5 fields: {expr!r}")
+        self.minute, self.hour, self.day, self.month, self.weekday = (parse_field(f, lo, hi) for f, (_, lo, hi) in zip(fields, FIELDS))
+        if 7 in self.weekday: self.weekday = (self.weekday - {7}) | {0}
+        # as in cron, when both day fields are restricted a time matches either of them
+        self.any_day, self.any_weekday = fields[2] == "*", fields[4] == "*"
+
+    def day_matches(self, ts: datetime) -> bool:
+        day, weekday = ts.day in self.day, (ts.weekday() + 1) % 7 in self.weekday
+        if self.any_day or self.any_weekday: return day and weekday
+        return day or weekday
+
+    def next_after(self, ts: datetime) -> datetime:
+        """The first matching minute strictly after ts."""
+        ts = ts.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = ts + timedelta(days=366 * 5)
+        while ts < limit:
+            if ts.month not in self.month:
+                ts = datetime(ts.year + ts.month // 12, ts.month % 12 + 1, 1)
+            elif not self.day_matches(ts):
+                ts = datetime(ts.year, ts.month, ts.day) + timedelta(days=1)
+            elif ts.hour not in self.hour:
+                ts = ts.replace(minute=0) + timedelta(hours=1)
+            elif ts.minute not in self.minute:
+                ts += timedelta(minutes=1)
+            else:
+                return ts
+        raise ValueError(f"{self.expr!r} never matches")
+
+
+# -------------------------------
+# CLOCKS
+# -------------------------------
+class SystemClock:
+    def __init__(self, tz=None):
+        self.tz = tz
+
+    def now(self) -> datetime:
+        return datetime.now(self.tz).replace(tzinfo=None) if self.tz else datetime.now()
+
+
+class FakeClock:
+    """A clock that only moves when told to."""
+
+    def __init__(self, start: datetime):
+        self.current = start
+
+    def now(self) -> datetime:
+        return self.current
+
+    def advance(self, **delta):
+        self.current += timedelta(**delta)
+        return self.current
+
+
+# -------------------------------
+# SCHEDULER
+# -------------------------------
+class Job:
+    def __init__(self, name: str, schedule: str, fn, jitter: float = 0.0):
+        self.name, self.cron, self.fn, self.jitter = name, Cron(schedule), fn, jitter
+        self.next_run = None
+
+    def plan(self, after: datetime, rng: random.Random):
+        self.next_run = self.cron.next_after(after) + timedelta(seconds=rng.uniform(0, self.jitter))
+
+
+class Scheduler:
+    def __init__(self, engine, clock=None, lease_name: str = "maintenance", lease_seconds: float = 60.0,
+                 poll_seconds: float = 15.0, history: int = 200, seed=None):
+        self.engine = engine
+        self.clock = clock or SystemClock()
+        self.lease_name, self.lease_seconds, self.poll_seconds, self.history = lease_name, lease_seconds, poll_seconds, history
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.jobs = {}
+        self.metrics = {}
+        self.is_leader = False
+        self.rng = random.Random(seed)
+        self._stop = threading.Event()
+        self._thread = None
+        metadata.create_all(bind=engine)
+
+    def add(self, name: str, schedule: str, fn, jitter: float = 0.0) -> Job:
+        """Register fn() to run on a cron schedule; its return value is stored with the run."""
+        job = Job(name, schedule, fn, jitter)
+        job.plan(self.clock.now(), self.rng)
+        self.jobs[name] = job
+        self.metrics[name] = {"schedule": schedule, "runs": 0, "failures": 0, "last_status": None, "last_started": None,
+                              "last_duration_ms": None, "total_duration_ms": 0.0, "last_error": None, "next_run": job.next_run}
+        return job
+
+    # ---------- lease ----------
+    def acquire_lease(self) -> bool:
+        """Take or renew the lease; True while this process holds it."""
+        now = self.clock.now()
+        expires = now + timedelta(seconds=self.lease_seconds)
+        with self.engine.begin() as conn:
+            taken = conn.execute(
+                update(leases).where(leases.c.name == self.lease_name, or_(leases.c.holder == self.holder, leases.c.expires_at < now))
+                .values(holder=self.holder, expires_at=expires)
+            ).rowcount
+        if not taken:
+            try:
+                with self.engine.begin() as conn:
+                    conn.execute(insert(leases).values(name=self.lease_name, holder=self.holder, expires_at=expires))
+                taken = 1
+            except IntegrityError:
+                taken = 0  # someone else holds it
+        if bool(taken) != self.is_leader: log.info("%s %s the scheduler lease", self.holder, "took" if taken else "lost")
+        self.is_leader = bool(taken)
+        return self.is_leader
+
+    def release_lease(self):
+        with self.engine.begin() as conn:
+            conn.execute(delete(leases).where(leases.c.name == self.lease_name, leases.c.holder == self.holder))
+        self.is_leader = False
+
+    # ---------- running ----------
+    def tick(self) -> list:
+        """Run every job that is due, if this process holds the lease; returns the names that ran."""
+        if not self.acquire_lease():
+            # the holder is running these; keep our plan current so a takeover doesn't replay them all at once
+            for job in self.jobs.values():
+                if job.next_run <= self.clock.now(): job.plan(self.clock.now(), self.rng); self.metrics[job.name]["next_run"] = job.next_run
+            return []
+        ran = []
+        for job in sorted(self.jobs.values(), key=lambda j: j.next_run):
+            if not self.is_leader: break  # lost during the previous job, the new holder runs the rest
+            if job.next_run > self.clock.now(): continue
+            self.run(job)
+            ran.append(job.name)
+        return ran
+
+    def heartbeat(self, done: threading.Event):
+        """Renew the lease every third of its length until `done` is set."""
+        while not done.wait(self.lease_seconds / 3):
+            try:
+                if not self.acquire_lease(): log.warning("%s lost the scheduler lease while a job was running", self.holder)
+            except Exception:
+                log.exception("could not renew the scheduler lease")
+
+    def run(self, job: Job):
+        scheduled_for, started = job.next_run, self.clock.now()
+        began = time.perf_counter()
+        result = error = None
+        done = threading.Event()
+        renewer = threading.Thread(target=self.heartbeat, args=(done,), name=f"scheduler-heartbeat-{job.name}", daemon=True)
+        renewer.start()
+        try:
+            result = job.fn()
+            status = "ok"
+        except Exception:
+            status, error = "failed", traceback.format_exc()
+            log.exception("job %s failed", job.name)
+        finally:
+            done.set()
+            renewer.join()
+        duration_ms = (time.perf_counter() - began) * 1000
+        # plan from the later of the scheduled time and now, so a slow job doesn't run back-to-back
+        job.plan(max(scheduled_for, self.clock.now()), self.rng)
+        m = self.metrics[job.name]
+        m["runs"] += 1
+        m["failures"] += status == "failed"
+        m["last_status"], m["last_started"], m["last_duration_ms"], m["last_error"] = status, started, duration_ms, error
+        m["total_duration_ms"] += duration_ms
+        m["next_run"] = job.next_run
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(insert(runs).values(
+                    job=job.name, holder=self.holder, scheduled_for=scheduled_for, started_at=started,
+                    finished_at=self.clock.now(), status=status, result=None if result is None else str(result), error=error,
+                ))
+                keep_after = select(runs.c.id).where(runs.c.job == job.name).order_by(runs.c.id.desc()).offset(self.history).limit(1).scalar_subquery()
+                conn.execute(delete(runs).where(runs.c.job == job.name, runs.c.id <= keep_after))
+        except Exception:
+            log.exception("could not record the run of %s", job.name)
+
+    def history_rows(self, job: str = None, limit: int = 50) -> list:
+        stmt = select(runs).order_by(runs.c.id.desc()).limit(limit)
+        if job: stmt = stmt.where(runs.c.job == job)
+        with self.engine.connect() as conn:
+            return [dict(r) for r in conn.execute(stmt).mappings()]
+
+    def seconds_until_due(self) -> float:
+        if not self.jobs: return self.poll_seconds
+        due = min(job.next_run for job in self.jobs.values())
+        return max(0.0, (due - self.clock.now()).total_seconds())
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try: self.tick()
+            except Exception: log.exception("scheduler tick failed")
+            # wake for the next job, but often enough to renew the lease before it lapses
+            self._stop.wait(min(self.seconds_until_due(), self.poll_seconds, self.lease_seconds / 3))
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 30.0):
+        """Stop after the running job (if any) finishes, and hand the lease over."""
+        self._stop.set()
+        if self._thread is not None: self._thread.join(timeout)
+        if self.is_leader:
+            try: self.release_lease()
+            except Exception: log.exception("could not release the scheduler lease")
@@ -0,0 +1,14 @@
+import os
+import sys
+import tempfile
+
+# the backend modules import each other as top-level modules (import main, import partitions, ...)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# main configures itself from the environment at import: give the test session a scratch database
+_scratch = tempfile.mkdtemp(prefix="backend-tests-")
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{_scratch}/main.db", SCHEDULER="0",
+    ARCHIVE_DIR=f"{_scratch}/archive", REPORT_DIR=f"{_scratch}/reports",
+)
+for name in ("REPLICA_DATABASE_URL", "SQLITE_SINGLE_WRITER", "PUNCH_BATCHING"): os.environ.pop(name, None)
@@ -0,0 +1,112 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+
+pytest.importorskip("pyarrow")
+import archive
+import intervals
+import main
+import partitions
+
+entries = main.ClockEntryDB.__table__
+CUTOFF = datetime(2026, 4, 1)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'archive.db'}")
+    main.Base.metadata.create_all(bind=engine)
+    rng = random.Random(7)
+    rows = []
+    for _ in range(300):
+        clock_in = datetime(2026, 1, 1) + timedelta(days=rng.randint(0, 110), hours=rng.randint(0, 23))
+        hours = None if rng.random() < 0.05 else round(rng.uniform(1, 12), 2)
+        rows.append({
+            "worker_id": rng.randint(1, 20), "project_id": rng.randint(1, 3), "clock_in_time": clock_in,
+            "clock_out_time": clock_in + timedelta(hours=hours) if hours else None, "total_hours": hours,
+            "auto_closed": rng.random() < 0.2,
+        })
+    with engine.begin() as conn: conn.execute(insert(entries), rows)
+    # some of them already rolled into month tables
+    partitions.roll(engine, entries, now=datetime(2026, 3, 1), log=lambda *a: None)
+    return engine
+
+
+def stored(engine) -> set:
+    """Every entry in the live table and the month tables."""
+    found = set()
+    with engine.connect() as conn:
+        for name in [partitions.PARENT] + [name for name, _, _ in partitions.list_partitions(conn)]:
+            table = entries if name == partitions.PARENT else partitions.partition_table(entries, name)
+            found |= {tuple(row) for row in conn.execute(select(*[table.c[c] for c in archive.COLUMNS]))}
+    return found
+
+
+def everything(engine, archive_dir) -> list:
+    rows = [tuple(r[c] for c in archive.COLUMNS) for r in archive.read(archive_dir=str(archive_dir), engine=engine)]
+    return sorted(rows + list(stored(engine)))
+
+
+def test_archive_round_trip(engine, tmp_path):
+    before = sorted(stored(engine))
+    moved = archive.archive(engine, CUTOFF, chunk_size=64, archive_dir=str(tmp_path / "cold"), log=lambda *a: None)
+    assert moved > 0
+    assert everything(engine, tmp_path / "cold") == before  # auto_closed included
+    assert all(r[0] is not None for r in before)
+    left = stored(engine)
+    assert all(r[3] >= CUTOFF or r[4] is None for r in left if r[0] != max(r[0] for r in before))
+    assert archive.read(datetime(2026, 2, 1), datetime(2026, 3, 1), archive_dir=str(tmp_path / "cold")) == [
+        r for r in archive.read(archive_dir=str(tmp_path / "cold")) if datetime(2026, 2, 1) <= r["clock_in_time"] < datetime(2026, 3, 1)
+    ]
+
+
+@pytest.mark.parametrize("crash", ["before the delete", "after the delete"])
+def test_interrupted_run_is_reconciled(engine, tmp_path, monkeypatch, crash):
+    before = sorted(stored(engine))
+    cold = str(tmp_path / "cold")
+    delete_ids, calls = archive.delete_ids, []
+
+    def failing_delete(engine, table, ids):
+        calls.append(len(ids))
+        if len(calls) == 3:
+            if crash == "after the delete": delete_ids(engine, table, ids)
+            raise RuntimeError("killed")
+        delete_ids(engine, table, ids)
+
+    monkeypatch.setattr(archive, "delete_ids", failing_delete)
+    with pytest.raises(RuntimeError):
+        archive.archive(engine, CUTOFF, chunk_size=64, archive_dir=cold, log=lambda *a: None)
+    monkeypatch.setattr(archive, "delete_ids", delete_ids)
+    assert any(f.get("pending") for f in archive.load_manifest(cold)["files"])
+    # meanwhile readers take a pending file's rows only where the database lost them: nothing is read twice or lost
+    assert everything(engine, cold) == before
+
+    archive.archive(engine, CUTOFF, chunk_size=64, archive_dir=cold, log=lambda *a: None)
+    assert not any(f.get("pending") for f in archive.load_manifest(cold)["files"])
+    assert everything(engine, cold) == before
+
+
+
+def test_archived_entries_leave_the_headcount(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'headcount.db'}")
+    main.Base.metadata.create_all(bind=engine)
+    intervals.install(engine, log=lambda *a: None)
+    shifts = [(datetime(2026, month, 10, 8), datetime(2026, month, 10, 16)) for month in (1, 2, 3, 4)]
+    with engine.begin() as conn:
+        conn.execute(insert(entries), [
+            {"worker_id": 1, "project_id": 1, "clock_in_time": a, "clock_out_time": b, "total_hours": 8.0} for a, b in shifts
+        ])
+
+    def on_site():
+        with Session(engine) as db:
+            return [bool(intervals.overlapping(db, main.ClockEntryDB, a + timedelta(hours=1), a + timedelta(hours=2))) for a, _ in shifts]
+
+    partitions.roll(engine, entries, now=datetime(2026, 4, 1), log=lambda *a: None)
+    assert on_site() == [True] * 4  # moved to month tables, still counted
+    archive.archive(engine, datetime(2026, 3, 1), archive_dir=str(tmp_path / "cold"), log=lambda *a: None)
+    assert on_site() == [False, False, True, True]  # like the GiST index on Postgres, which loses them with the rows
+    intervals.rebuild(engine)
+    assert on_site() == [False, False, True, True]
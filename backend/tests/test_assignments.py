@@ -0,0 +1,64 @@
+import main
+
+
+def setup(role: str, *assigned):
+    """A project per name in `assigned`, plus one worker with `role` per entry (None: unassigned)."""
+    with main.SessionLocal() as db:
+        projects = {}
+        for name in assigned:
+            if name and name not in projects:
+                projects[name] = main.create_project(main.ProjectBase(name=name, status="Active"), db=db).id
+        workers = [
+            main.create_worker(main.WorkerBase(name=f"{role} {i}", role=role, assigned_project_id=projects.get(name)), db=db).id
+            for i, name in enumerate(assigned)
+        ]
+        return projects, workers
+
+
+def assign(**request):
+    with main.SessionLocal() as db:
+        return [(r.worker_id, r.previous_project_id, r.status) for r in main.assign_workers(main.BulkAssignRequest(**request), db=db)]
+
+
+def state(workers):
+    """{worker id: (assigned project, open assignment's project)}"""
+    with main.SessionLocal() as db:
+        assigned = dict(db.query(main.WorkerDB.id, main.WorkerDB.assigned_project_id).filter(main.WorkerDB.id.in_(workers)))
+        a = main.WorkerAssignmentDB
+        current = dict(db.query(a.worker_id, a.project_id).filter(a.worker_id.in_(workers), a.valid_to == None))
+    return {w: (assigned[w], current.get(w)) for w in workers}
+
+
+def test_role_and_unassigned_only():
+    projects, (idle, busy, other) = setup("Bulk Rigger", None, "Bulk Yard A", None)
+    _, (different_role,) = setup("Bulk Painter", None)
+    target = main.create_project(main.ProjectBase(name="Bulk Yard B", status="Active"), db=main.SessionLocal()).id
+    assert assign(project_id=target, role="Bulk Rigger", unassigned_only=True) == [
+        (idle, None, "assigned"), (other, None, "assigned"),
+    ]
+    assert state([idle, busy, other, different_role]) == {
+        idle: (target, target), busy: (projects["Bulk Yard A"],) * 2, other: (target, target), different_role: (None, None),
+    }
+
+    # the whole role, again: the two already there are unchanged
+    assert assign(project_id=target, role="Bulk Rigger") == [
+        (idle, target, "unchanged"), (busy, projects["Bulk Yard A"], "assigned"), (other, target, "unchanged"),
+    ]
+    assert assign(project_id=None, role="Bulk Rigger", current_project_id=target) == [
+        (w, target, "unassigned") for w in (idle, busy, other)
+    ]
+    assert state([idle, busy, other]) == {w: (None, None) for w in (idle, busy, other)}
+    with main.SessionLocal() as db:
+        a = main.WorkerAssignmentDB
+        assert db.query(a).filter(a.worker_id == busy).count() == 2  # Bulk Yard A, then B, both closed
+
+
+def test_ids_outside_the_filters_are_skipped_and_unknown_ids_not_found():
+    projects, (mason,) = setup("Bulk Mason", "Bulk Yard C")
+    _, (welder,) = setup("Bulk Welder", None)
+    missing = welder + 10_000
+    target = projects["Bulk Yard C"]
+    assert assign(project_id=target, worker_ids=[welder, missing, mason, welder], role="Bulk Mason") == [
+        (mason, target, "unchanged"), (welder, None, "skipped"), (missing, None, "not_found"),
+    ]
+    assert state([mason, welder]) == {mason: (target, target), welder: (None, None)}
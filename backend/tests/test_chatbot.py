@@ -0,0 +1,53 @@
+import os
+import time
+
+import pytest
+
+pytest.importorskip("numpy")
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import intents
+import main
+
+
+def ask(question):
+    with main.SessionLocal() as db:
+        return main.chatbot(main.ChatRequest(query=question), db)["response"]
+
+
+def test_answers_refresh_after_a_punch_in_another_process():
+    with main.SessionLocal() as db:
+        project = main.ProjectDB(name="Skyline", status="Active"); db.add(project); db.flush()
+        worker = main.WorkerDB(name="Ravi Kumar", role="Mason"); db.add(worker)
+        db.commit()
+        worker_id, project_id = worker.id, project.id
+    assert "Nobody is clocked in" in ask("who is on skyline right now")
+    hits, expired = main.chat_answers.stats["hits"], main.chat_answers.stats["expired"]
+    assert ask("who is on skyline right now") == ask("Who is on Skyline right now?")  # served from the cache
+    assert main.chat_answers.stats["hits"] == hits + 2
+
+    # another worker process: same database, its own engine, and its events never reach this process's bus
+    other = sessionmaker(bind=create_engine(os.environ["DATABASE_URL"]))()
+    main.punch_in(other, main.ClockRequest(worker_id=worker_id, project_id=project_id))
+    other.commit(); other.close()
+
+    assert "Ravi Kumar (Mason)" in ask("who is on skyline right now")
+    assert main.chat_answers.stats["expired"] == expired + 1
+
+
+def test_answers_expire_after_ttl():
+    cache = intents.AnswerCache(ttl=0.05)
+    cache.put("q", {"response": "a"}, {("punches",)}, cache.version())
+    assert cache.get("q") == {"response": "a"}
+    time.sleep(0.06)
+    assert cache.get("q") is None and cache.stats["expired"] == 1
+
+
+def test_is_stale_gets_the_watermark_and_tags():
+    cache = intents.AnswerCache()
+    cache.put("q", "answer", {("worker", 7)}, cache.version(), watermark=41)
+    seen = []
+    assert cache.get("q", lambda watermark, tags: seen.append((watermark, tags)) or False) == "answer"
+    assert seen == [(41, frozenset({("worker", 7)}))]
+    assert cache.get("q", lambda watermark, tags: True) is None and len(cache) == 0
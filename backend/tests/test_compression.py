@@ -0,0 +1,82 @@
+import gzip
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import Response, StreamingResponse
+from fastapi.testclient import TestClient
+
+import compression
+from compression import CompressionMiddleware
+
+BODY = b"clock entry,worker,project\n" * 200
+
+
+def make_client():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=500)
+
+    @app.get("/big")
+    def big():
+        return Response(BODY, media_type="text/csv", headers={"Vary": "Cookie"})
+
+    @app.get("/small")
+    def small():
+        return Response(b"ok", media_type="text/plain")
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse((BODY[i:i + 100] for i in range(0, len(BODY), 100)), media_type="text/csv")
+
+    @app.get("/encoded")
+    def encoded():
+        return Response(gzip.compress(BODY), media_type="text/csv", headers={"Content-Encoding": "gzip"})
+
+    return TestClient(app)
+
+
+def test_small_response_is_sent_as_is():
+    response = make_client().get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert response.content == b"ok" and response.headers["content-length"] == "2"
+
+
+def test_gzip():
+    response = make_client().get("/big", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.content == BODY
+    assert int(response.headers["content-length"]) < len(BODY)  # the compressed length, not the original
+    assert response.headers["vary"] == "Cookie, Accept-Encoding"
+
+
+@pytest.mark.skipif(compression.brotli is None, reason="brotli is not installed")
+def test_brotli_preferred_when_accepted():
+    client = make_client()
+    response = client.get("/big", headers={"Accept-Encoding": "gzip, br"})
+    assert response.headers["content-encoding"] == "br"
+    assert response.content == BODY
+    assert client.get("/big", headers={"Accept-Encoding": "gzip, br;q=0.5"}).headers["content-encoding"] == "gzip"
+
+
+@pytest.mark.parametrize("accept", ["identity", "", "gzip;q=0, br;q=0", "*;q=0"])
+def test_identity_when_nothing_acceptable(accept):
+    response = make_client().get("/big", headers={"Accept-Encoding": accept})
+    assert "content-encoding" not in response.headers
+    assert response.content == BODY and response.headers["content-length"] == str(len(BODY))
+
+
+def test_streamed_body_is_compressed_without_a_length():
+    with make_client().stream("GET", "/stream", headers={"Accept-Encoding": "gzip"}) as response:
+        raw = b"".join(response.iter_raw())
+        assert response.headers["content-encoding"] == "gzip"
+        assert "content-length" not in response.headers
+        assert response.headers["vary"] == "Accept-Encoding"
+    assert gzip.decompress(raw) == BODY
+
+
+def test_already_encoded_response_passes_through():
+    with make_client().stream("GET", "/encoded", headers={"Accept-Encoding": "gzip, br"}) as response:
+        raw = b"".join(response.iter_raw())
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["content-length"] == str(len(raw))
+        assert "vary" not in response.headers
+    assert gzip.decompress(raw) == BODY
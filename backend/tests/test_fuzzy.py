@@ -0,0 +1,49 @@
+import pytest
+
+pytest.importorskip("numpy")
+from fuzzy import NameIndex, normalize, substring_distance
+
+
+@pytest.fixture
+def index():
+    names = NameIndex()
+    for entity_id, name in enumerate(["Ravindra Kumar", "Ravi Shankar", "Kumar Sanu", "José Álvarez", "Anna Kowalski", "Ravi Shankar"], 1):
+        names.add(entity_id, name)
+    return names
+
+
+@pytest.mark.parametrize("query, text, distance", [
+    ("ravi", "ravindra", 0),
+    ("kumr", "kumar", 1),
+    ("kowalsky", "anna kowalski", 1),
+    ("xyz", "ravi", 3),
+])
+def test_substring_distance(query, text, distance):
+    assert substring_distance(query, text) == distance
+
+
+def test_normalize_drops_accents_case_and_spacing():
+    assert normalize("  José   ÁLVAREZ ") == "jose alvarez"
+
+
+def test_typos_find_the_name(index):
+    assert [(i, d) for i, _, d, _ in index.search("ravindra kumr")] == [(1, 1)]
+    assert index.search("jose alvares")[0][:3] == (4, "José Álvarez", 1)
+
+
+def test_every_word_must_match(index):
+    assert {i for i, *_ in index.search("kumar")} == {1, 3}
+    assert index.search("kumar kowalski") == []
+
+
+def test_duplicate_names_return_every_id_and_rank_by_distance_then_length(index):
+    assert [i for i, *_ in index.search("ravi")] == [2, 6, 1]
+
+
+def test_sync_adds_only_new_rows(index):
+    seen = []
+    def fetch_after(last_id):
+        seen.append(last_id)
+        return [(7, "Zofia Nowak")]
+    index.sync(fetch_after)
+    assert seen == [6] and index.search("zofia")[0][0] == 7
@@ -0,0 +1,43 @@
+import io
+import queue
+
+import pytest
+from sqlalchemy import create_engine, select
+
+import importer
+
+
+@pytest.fixture
+def engine(tmp_path):
+    return create_engine(f"sqlite:///{tmp_path / 'import.db'}")
+
+
+def upload(*chunks):
+    feed = queue.Queue()
+    for chunk in chunks: feed.put(chunk)
+    return io.TextIOWrapper(io.BufferedReader(importer.QueueReader(feed)), encoding="utf-8-sig", newline="")
+
+
+def run(engine, stream, written):
+    def write_batch(rows, checkpoint):
+        with engine.begin() as conn: conn.execute(checkpoint)
+        written.extend(rows)
+    return importer.run(stream, "csv", engine, write_batch, set(), "upload", batch_size=2)
+
+
+def test_complete_upload_is_imported(engine):
+    written = []
+    summary = run(engine, upload(b"name,role\nAda,welder\nBo,", b"rigger\nCy,cook", None), written)
+    assert [row["name"] for row in written] == ["Ada", "Bo", "Cy"]
+    assert summary["status"] == "done"
+
+
+def test_aborted_upload_keeps_only_checkpointed_batches(engine):
+    written = []
+    with pytest.raises(ConnectionAbortedError):
+        run(engine, upload(b"name,role\nAda,welder\nBo,rigger\nCy,cook\nDi,", importer.ABORT), written)
+    # the first batch was committed; Cy and the cut-off "Di," row were not
+    assert [row["name"] for row in written] == ["Ada", "Bo"]
+    with engine.connect() as conn:
+        row = conn.execute(select(importer.imports)).mappings().one()
+    assert (row["status"], row["line"]) == ("failed", 3)
@@ -0,0 +1,36 @@
+from datetime import date
+
+import pytest
+
+from intents import cache_key, parse
+
+TODAY = date(2026, 3, 12)  # a Thursday
+
+
+@pytest.mark.parametrize("question, intent, subject, start, end", [
+    ("How many hours did Ravi work last week?", "hours_worked", "ravi", date(2026, 3, 2), date(2026, 3, 9)),
+    ("hours worked by Anna Kowalski this month", "hours_worked", "anna kowalski", date(2026, 3, 1), date(2026, 3, 13)),
+    ("How long did Bo work yesterday", "hours_worked", "bo", date(2026, 3, 11), date(2026, 3, 12)),
+    ("total hours on Skyline in the last 30 days", "project_hours", "skyline", date(2026, 2, 11), date(2026, 3, 13)),
+    ("hours for project Harbor", "project_hours", "harbor", date(2026, 3, 6), date(2026, 3, 13)),
+    ("Who is on Skyline right now?", "active_workers", "skyline", None, None),
+    ("top workers last month", "top_workers", None, date(2026, 2, 1), date(2026, 3, 1)),
+])
+def test_parse(question, intent, subject, start, end):
+    parsed = parse(question, TODAY)
+    assert (parsed.name, parsed.subject) == (intent, subject)
+    if start: assert (parsed.start, parsed.end) == (start, end)
+
+
+def test_top_n_is_capped():
+    assert parse("top 3 workers on Skyline this week", TODAY).n == 3
+    assert parse("top 500 workers", TODAY).n == 50
+
+
+@pytest.mark.parametrize("question", ["", "hello", "what's the weather like"])
+def test_unknown_questions(question):
+    assert parse(question, TODAY) is None
+
+
+def test_cache_key_ignores_case_spacing_and_trailing_punctuation():
+    assert cache_key("  Who is on  Skyline NOW?! ") == cache_key("who is on skyline now")
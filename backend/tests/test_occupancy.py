@@ -0,0 +1,83 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+np = pytest.importorskip("numpy")
+import occupancy
+
+
+def brute_force(entries, start, end, width):
+    """Occupancy second by second: (project ids, average, peak) as sweep() returns them."""
+    span, step = int((end - start).total_seconds()), int(width.total_seconds())
+    projects = sorted({p for *_, p in entries})
+    level = {p: [0] * span for p in projects}
+    for t_in, t_out, p in entries:
+        a = max(0, int((t_in - start).total_seconds()))
+        b = min(span, int(((t_out or end) - start).total_seconds()))
+        for s in range(a, b): level[p][s] += 1
+    projects = [p for p in projects if any(level[p])]
+    average = [[sum(level[p][i:i + step]) / len(level[p][i:i + step]) for i in range(0, span, step)] for p in projects]
+    peak = [[max(level[p][i:i + step]) for i in range(0, span, step)] for p in projects]
+    return projects, average, peak
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_sweep_matches_brute_force(seed):
+    rng = random.Random(seed)
+    start = datetime(2026, 3, 1, 8)
+    end = start + timedelta(seconds=rng.randint(600, 3600))
+    width = timedelta(seconds=rng.choice([60, 300, 333, 900]))
+    entries = []
+    for _ in range(rng.randint(0, 40)):
+        # some start before the window, end after it, share a second, or are still open
+        t_in = start + timedelta(seconds=rng.randint(-600, 3600))
+        t_out = None if rng.random() < 0.1 else t_in + timedelta(seconds=rng.choice([0, 1, rng.randint(1, 1800)]))
+        entries.append((t_in, t_out, rng.randint(1, 4)))
+    clock_in, clock_out, project_ids = ([entry[i] for entry in entries] for i in range(3))
+    projects, average, peak = occupancy.sweep(clock_in, clock_out, project_ids, start, end, width)
+    expected_projects, expected_average, expected_peak = brute_force(entries, start, end, width)
+    assert projects.tolist() == expected_projects
+    assert np.allclose(average, np.array(expected_average).reshape(average.shape))
+    assert peak.tolist() == expected_peak
+
+
+def test_too_many_buckets():
+    with pytest.raises(ValueError):
+        occupancy.sweep([], [], [], datetime(2026, 1, 1), datetime(2026, 2, 1), timedelta(seconds=60))
+
+
+@pytest.fixture
+def app():
+    import intervals
+    import main
+    intervals.install(main.engine, log=lambda *a: None)  # done by the app's lifespan otherwise
+    return main
+
+
+def daily(app, project_id):
+    with app.SessionLocal() as db:
+        rows = db.query(app.DailyOccupancyDB).filter(app.DailyOccupancyDB.project_id == project_id).order_by(app.DailyOccupancyDB.day)
+        return {row.day: row.peak for row in rows}
+
+
+def test_rollup_redoes_the_days_a_correction_moved_a_shift_off(app):
+    from datetime import date
+    with app.SessionLocal() as db:
+        project = app.ProjectDB(name="Rollup Yard", status="Active"); db.add(project); db.flush()
+        worker = app.WorkerDB(name="Rollup Worker", role="Rigger"); db.add(worker)
+        db.commit()
+        project_id, request = project.id, app.ClockRequest(worker_id=worker.id, project_id=project.id, timestamp="2025-02-03T09:00:00")
+        entry = app.clock_in(request, db=db)
+        app.clock_out(request.copy(update={"timestamp": "2025-02-03T17:00:00"}), db=db)
+    today = date(2025, 2, 10)
+    app.roll_up_occupancy(today)
+    assert daily(app, project_id) == {date(2025, 2, 3): 1}
+    assert app.roll_up_occupancy(today) == 0  # the quiet days after it aren't redone
+
+    # moved to the 5th and stretched past two midnights
+    with app.SessionLocal() as db:
+        app.correct_clock_entry(entry.id, app.CorrectionRequest(clock_in_time=datetime(2025, 2, 5, 9), clock_out_time=datetime(2025, 2, 7, 2)), db=db)
+    assert app.roll_up_occupancy(today) >= 5  # the 3rd, and the 5th to the 7th
+    assert daily(app, project_id) == {date(2025, 2, 5): 1, date(2025, 2, 6): 1, date(2025, 2, 7): 1}
+    assert app.roll_up_occupancy(today) == 0
@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+
+import main
+import partitions
+
+entries = main.ClockEntryDB.__table__
+NOW = datetime(2026, 4, 15, 12)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'partitions.db'}")
+    main.Base.metadata.create_all(bind=engine)
+    return engine
+
+
+def add(engine, clock_in: datetime, hours=8.0, worker_id=1, project_id=1) -> int:
+    with engine.begin() as conn:
+        return conn.execute(insert(entries).values(
+            worker_id=worker_id, project_id=project_id, clock_in_time=clock_in,
+            clock_out_time=clock_in + timedelta(hours=hours) if hours is not None else None, total_hours=hours,
+        )).inserted_primary_key[0]
+
+
+def read_all(engine, start=None, end=None) -> set:
+    with Session(engine) as db:
+        source = partitions.source(db, main.ClockEntryDB, start, end)
+        query = db.query(source.id, source.clock_in_time, source.clock_out_time)
+        if start: query = query.filter(source.clock_in_time >= start)
+        if end: query = query.filter(source.clock_in_time < end)
+        return set(query.all())
+
+
+def live_ids(engine) -> set:
+    with engine.connect() as conn:
+        return set(conn.execute(select(entries.c.id)).scalars())
+
+
+def test_roll_keeps_what_source_returns(engine):
+    for month in (1, 2, 3):
+        for day in (1, 15, 28): add(engine, datetime(2026, month, day, 8))
+    open_entry = add(engine, datetime(2026, 3, 31, 22), hours=None)
+    current = add(engine, datetime(2026, 4, 2, 8))
+    before = read_all(engine)
+    march = read_all(engine, datetime(2026, 3, 1), datetime(2026, 4, 1))
+
+    assert partitions.roll(engine, entries, now=NOW, log=lambda *a: None) == 9
+    assert [name for name, _, _ in partitions.list_partitions(engine)] == ["clock_entries_202601", "clock_entries_202602", "clock_entries_202603"]
+    assert live_ids(engine) == {open_entry, current}  # open shifts and the current month stay
+    assert read_all(engine) == before
+    assert read_all(engine, datetime(2026, 3, 1), datetime(2026, 4, 1)) == march
+    assert partitions.roll(engine, entries, now=NOW, log=lambda *a: None) == 0
+
+
+def test_roll_never_moves_the_highest_id(engine):
+    add(engine, datetime(2026, 1, 5, 8))
+    newest = add(engine, datetime(2026, 1, 6, 8))  # closed and last month, but the highest id
+    partitions.roll(engine, entries, now=NOW, log=lambda *a: None)
+    assert live_ids(engine) == {newest}
+    # so SQLite can't hand that id out again
+    assert add(engine, datetime(2026, 4, 10, 8)) == newest + 1
+
+
+def test_cached_partitions_follow_schema_changes_from_other_connections(engine, tmp_path):
+    with engine.connect() as conn:
+        assert partitions.cached_partitions(conn) == []
+    # another process rolls a month out
+    other = create_engine(f"sqlite:///{tmp_path / 'partitions.db'}")
+    add(other, datetime(2026, 2, 3, 8)); add(other, datetime(2026, 4, 3, 8))
+    partitions.roll(other, entries, now=NOW, log=lambda *a: None)
+    with engine.connect() as conn:
+        assert [name for name, _, _ in partitions.cached_partitions(conn)] == ["clock_entries_202602"]
+
+
+def test_correct_an_entry_held_in_a_month_table():
+    with main.SessionLocal() as db:
+        project = main.ProjectDB(name="Partition Yard", status="Active"); db.add(project); db.flush()
+        worker = main.WorkerDB(name="Partition Worker", role="Mason"); db.add(worker)
+        db.commit()
+        worker_id, project_id = worker.id, project.id
+    rolled = add(main.engine, datetime(2024, 1, 10, 8), worker_id=worker_id, project_id=project_id)
+    add(main.engine, datetime(2024, 1, 11, 8), hours=None, worker_id=worker_id, project_id=project_id)  # holds the highest id
+    partitions.roll(main.engine, entries, now=datetime(2024, 2, 1), log=lambda *a: None)
+    with main.engine.connect() as conn:
+        assert partitions.locate(conn, entries, rolled)[0] == "clock_entries_202401"
+
+    with main.SessionLocal() as db:
+        corrected = main.correct_clock_entry(rolled, main.CorrectionRequest(clock_out_time=datetime(2024, 1, 10, 12)), db=db)
+    assert corrected.total_hours == 4.0
+    with main.engine.connect() as conn:
+        assert partitions.locate(conn, entries, rolled) is None
+        assert conn.execute(select(entries.c.clock_out_time).where(entries.c.id == rolled)).scalar() == datetime(2024, 1, 10, 12)
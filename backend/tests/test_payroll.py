@@ -0,0 +1,96 @@
+import random
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import pytest
+
+np = pytest.importorskip("numpy")
+import payroll
+
+RULES = payroll.Rules(daily_ot_hours=9, weekly_ot_hours=48, ot_multiplier=2.0, night_start=22, night_end=6,
+                      night_premium=0.25, default_rate=100.0, rates={"Mason": 140.0, "Welder": 160.0})
+
+
+def night_hours(clock_in: datetime, clock_out: datetime, rules) -> float:
+    """Hours of [clock_in, clock_out) inside the night windows, day by day."""
+    total, day = 0.0, datetime(clock_in.year, clock_in.month, clock_in.day)
+    while day < clock_out:
+        if rules.night_start > rules.night_end:
+            windows = [(day, day + timedelta(hours=rules.night_end)), (day + timedelta(hours=rules.night_start), day + timedelta(days=1))]
+        else:
+            windows = [(day + timedelta(hours=rules.night_start), day + timedelta(hours=rules.night_end))]
+        for a, b in windows:
+            total += max(timedelta(0), min(b, clock_out) - max(a, clock_in)).total_seconds() / 3600
+        day += timedelta(days=1)
+    return total
+
+
+def reference(entries, roles, rules) -> dict:
+    """payroll.compute() one entry at a time: {worker id: row}."""
+    by_worker = defaultdict(list)
+    for worker_id, clock_in, hours in entries: by_worker[worker_id].append((clock_in, hours))
+    result = {}
+    for worker_id, shifts in by_worker.items():
+        daily = defaultdict(float)
+        night = 0.0
+        for clock_in, hours in shifts:
+            daily[clock_in.date()] += hours
+            night += night_hours(clock_in, clock_in + timedelta(seconds=int(hours * 3600)), rules)
+        weekly, daily_ot = defaultdict(float), 0.0
+        for day, total in daily.items():
+            ot = max(total - rules.daily_ot_hours, 0)
+            daily_ot += ot
+            weekly[day.isocalendar()[:2]] += total - ot  # Monday-Sunday weeks
+        overtime = daily_ot + sum(max(total - rules.weekly_ot_hours, 0) for total in weekly.values())
+        regular = sum(hours for _, hours in shifts) - overtime
+        rate = rules.rates.get(roles.get(worker_id), rules.default_rate)
+        result[worker_id] = {
+            "entries": len(shifts), "rate": rate, "regular_hours": regular, "overtime_hours": overtime, "night_hours": night,
+            "gross_pay": rate * (regular + overtime * rules.ot_multiplier + night * rules.night_premium),
+        }
+    return result
+
+
+def compute(entries, roles, rules=RULES) -> dict:
+    worker_ids, clock_in, hours = ([e[i] for e in entries] for i in range(3))
+    return {row["worker_id"]: row for row in payroll.rows(payroll.compute(worker_ids, payroll.epoch_seconds(clock_in), hours, roles, rules))}
+
+
+@pytest.mark.parametrize("seed", range(10))
+@pytest.mark.parametrize("rules", [RULES, payroll.Rules(daily_ot_hours=8, weekly_ot_hours=40, night_start=1, night_end=5, rates={})],
+                         ids=["night wraps midnight", "night within a day"])
+def test_compute_matches_per_entry_calculation(seed, rules):
+    rng = random.Random(seed)
+    start = datetime(2026, 2, 23) + timedelta(days=rng.randint(0, 6))  # not always a Monday
+    entries = [
+        (rng.randint(1, 4), start + timedelta(days=rng.randint(0, 27), hours=rng.randint(0, 23), minutes=rng.randint(0, 59)), round(rng.uniform(0.5, 14), 2))
+        for _ in range(rng.randint(1, 200))
+    ]
+    roles = {w: rng.choice(["Mason", "Welder", "Astronaut", None]) for w in range(1, 5)}  # unknown roles fall back
+    got, expected = compute(entries, roles, rules), reference(entries, roles, rules)
+    assert got.keys() == expected.keys()
+    for worker_id, row in expected.items():
+        assert got[worker_id]["entries"] == row["entries"] and got[worker_id]["rate"] == row["rate"]
+        for column in ("regular_hours", "overtime_hours", "night_hours", "gross_pay"):
+            assert got[worker_id][column] == pytest.approx(row[column], abs=0.011), column
+
+
+def test_shift_across_midnight_is_night_time_and_daily_overtime():
+    row = compute([(1, datetime(2026, 3, 3, 20), 10.0)], {1: "Mason"})[1]
+    assert (row["regular_hours"], row["overtime_hours"], row["night_hours"]) == (9.0, 1.0, 8.0)
+    assert row["gross_pay"] == 140.0 * (9 + 1 * 2.0 + 8 * 0.25)
+
+
+def test_six_ten_hour_days_in_a_week():
+    monday = datetime(2026, 3, 2, 8)
+    row = compute([(1, monday + timedelta(days=d), 10.0) for d in range(6)], {1: "Plumber?"})[1]
+    # 6 h of daily overtime, then 54 regular hours is 6 over the weekly 48
+    assert (row["regular_hours"], row["overtime_hours"], row["night_hours"]) == (48.0, 12.0, 0.0)
+    assert (row["rate"], row["gross_pay"]) == (100.0, 100.0 * (48 + 12 * 2.0))
+
+
+def test_weeks_start_on_monday():
+    # Tuesday to Sunday, then Monday: the Monday starts a new week
+    tuesday = datetime(2026, 3, 3, 8)
+    row = compute([(1, tuesday + timedelta(days=d), 9.0) for d in range(7)], {})[1]
+    assert (row["regular_hours"], row["overtime_hours"]) == (48.0 + 9.0, 6.0)
@@ -0,0 +1,72 @@
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, select, update
+
+import reports
+
+
+@pytest.fixture
+def engine(tmp_path):
+    return create_engine(f"sqlite:///{tmp_path / 'reports.db'}", connect_args={"check_same_thread": False})
+
+
+class Blocking:
+    """A compute() that holds every job until released."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.started = threading.Semaphore(0)
+
+    def __call__(self, spec):
+        self.started.release()
+        self.release.wait(10)
+        return 1, [spec]
+
+
+def runner(engine, tmp_path, compute):
+    return reports.ReportRunner(engine, compute, lambda watermark, spec: False, directory=str(tmp_path / "out"), workers=1)
+
+
+def status(engine, job_id):
+    with engine.connect() as conn:
+        return conn.execute(select(reports.jobs.c.status).where(reports.jobs.c.id == job_id)).scalar()
+
+
+def test_identical_specs_share_a_live_job(engine, tmp_path):
+    compute = Blocking()
+    first = runner(engine, tmp_path, compute)
+    job = first.submit({"report": "a"})
+    assert first.submit({"report": "a"})["id"] == job["id"]
+    compute.release.set()
+
+
+def test_shutdown_fails_queued_jobs_so_the_next_runner_reruns_them(engine, tmp_path):
+    compute = Blocking()
+    first = runner(engine, tmp_path, compute)
+    running = first.submit({"report": "a"})
+    assert compute.started.acquire(timeout=5)
+    queued = first.submit({"report": "b"})
+    first.shutdown()
+    assert status(engine, queued["id"]) == "failed"
+
+    second = runner(engine, tmp_path, Blocking())
+    assert second.submit({"report": "a"})["id"] == running["id"]  # still running, and still heartbeating
+    assert second.submit({"report": "b"})["id"] != queued["id"]
+    compute.release.set()
+
+
+def test_jobs_of_a_crashed_process_are_not_shared_and_are_failed_on_startup(engine, tmp_path):
+    compute = Blocking()
+    crashed = runner(engine, tmp_path, compute)
+    job = crashed.submit({"report": "a"})
+    assert compute.started.acquire(timeout=5)
+    # the process died: its heartbeat stopped long ago
+    with engine.begin() as conn:
+        conn.execute(update(reports.jobs).where(reports.jobs.c.id == job["id"]).values(heartbeat_at=datetime.now() - timedelta(hours=1)))
+
+    other = runner(engine, tmp_path, lambda spec: (1, [spec]))
+    assert status(engine, job["id"]) == "failed"
+    assert other.submit({"report": "a"})["id"] != job["id"]
+    compute.release.set()
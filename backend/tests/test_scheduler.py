@@ -0,0 +1,97 @@
+import time
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+
+from scheduler import Cron, FakeClock, Scheduler
+
+
+@pytest.fixture
+def engine(tmp_path):
+    return create_engine(f"sqlite:///{tmp_path / 'scheduler.db'}", connect_args={"check_same_thread": False})
+
+
+@pytest.mark.parametrize("expr, after, expected", [
+    ("*/5 * * * *", datetime(2026, 1, 1, 10, 2, 30), datetime(2026, 1, 1, 10, 5)),
+    ("*/5 * * * *", datetime(2026, 1, 1, 10, 5), datetime(2026, 1, 1, 10, 10)),  # strictly after
+    ("@daily", datetime(2026, 1, 31, 23, 59), datetime(2026, 2, 1, 0, 0)),
+    ("30 0 * * *", datetime(2026, 12, 31, 1, 0), datetime(2027, 1, 1, 0, 30)),
+    ("0 9 * * 1-5", datetime(2026, 1, 2, 9, 0), datetime(2026, 1, 5, 9, 0)),  # Friday 9:00 -> Monday
+    ("0 0 13 * 5", datetime(2026, 2, 1), datetime(2026, 2, 6)),  # the 13th or a Friday, whichever comes first
+    ("0 0 29 2 *", datetime(2026, 3, 1), datetime(2028, 2, 29)),
+])
+def test_cron_next_after(expr, after, expected):
+    assert Cron(expr).next_after(after) == expected
+
+
+@pytest.mark.parametrize("expr", ["* * * *", "60 * * * *", "0 0 30 2 *"])
+def test_cron_rejects_bad_expressions(expr):
+    with pytest.raises(ValueError):
+        Cron(expr).next_after(datetime(2026, 1, 1))
+
+
+def test_due_jobs_run_once_per_slot(engine):
+    clock = FakeClock(datetime(2026, 1, 1, 10, 0))
+    scheduler = Scheduler(engine, clock=clock, seed=0)
+    calls = []
+    scheduler.add("ping", "*/5 * * * *", lambda: calls.append(clock.now()))
+    assert scheduler.tick() == []
+    clock.advance(minutes=5)
+    assert scheduler.tick() == ["ping"]
+    assert scheduler.tick() == []
+    clock.advance(minutes=12)  # two missed slots run once
+    assert scheduler.tick() == ["ping"]
+    assert scheduler.jobs["ping"].next_run == datetime(2026, 1, 1, 10, 20)
+    assert len(calls) == 2 and scheduler.metrics["ping"]["runs"] == 2
+
+
+def test_only_the_lease_holder_runs_jobs_until_it_expires(engine):
+    clock = FakeClock(datetime(2026, 1, 1, 10, 0))
+    first, second = (Scheduler(engine, clock=clock, lease_seconds=60, seed=0) for _ in range(2))
+    ran = []
+    for scheduler in (first, second): scheduler.add("ping", "* * * * *", lambda s=scheduler: ran.append(s))
+    clock.advance(minutes=1)
+    assert first.tick() == ["ping"] and second.tick() == []
+    assert first.is_leader and not second.is_leader
+
+    # the holder keeps renewing, so the lease never lapses
+    clock.advance(seconds=50); first.tick()
+    clock.advance(seconds=50)
+    assert second.tick() == [] and first.tick() == ["ping"]
+
+    # the holder stops renewing (crashed): the other takes over once the lease expired
+    clock.advance(seconds=59)  # 10:03:39, the lease runs until 10:03:40
+    assert second.tick() == []
+    clock.advance(seconds=25)
+    assert second.tick() == ["ping"] and second.is_leader
+    assert first.tick() == [] and not first.is_leader
+    assert ran == [first, first, second]
+
+
+def test_stop_hands_the_lease_over(engine):
+    clock = FakeClock(datetime(2026, 1, 1, 10, 0))
+    first, second = Scheduler(engine, clock=clock), Scheduler(engine, clock=clock)
+    assert first.acquire_lease() and not second.acquire_lease()
+    first.stop()
+    assert second.acquire_lease()
+
+
+def test_lease_is_renewed_while_a_long_job_runs(engine):
+    clock = FakeClock(datetime(2026, 1, 1, 10, 0))
+    leader = Scheduler(engine, clock=clock, lease_seconds=0.3, seed=0)
+    other = Scheduler(engine, clock=clock, lease_seconds=0.3, seed=0)
+    taken_during_job = []
+
+    def long_job():
+        # runs for six lease lengths of fake time while the heartbeat renews in real time
+        for _ in range(6):
+            clock.advance(seconds=0.3)
+            time.sleep(0.15)
+            taken_during_job.append(other.acquire_lease())
+
+    leader.add("archive", "* * * * *", long_job)
+    clock.advance(minutes=1)
+    assert leader.tick() == ["archive"]
+    assert not any(taken_during_job)
+    assert leader.acquire_lease()
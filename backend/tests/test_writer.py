@@ -0,0 +1,75 @@
+import threading
+
+import pytest
+
+from writer import GroupCommitWriter
+
+
+class FakeSession:
+    """Records what each transaction did; commit() fails while `failing` holds a function it ran."""
+
+    def __init__(self, log, failing):
+        self.log, self.failing, self.ran = log, failing, []
+
+    def commit(self):
+        if self.failing & set(self.ran): raise RuntimeError("commit failed")
+        self.log.append(list(self.ran))
+
+    def rollback(self): pass
+
+    def close(self): pass
+
+
+@pytest.fixture
+def committed():
+    return []
+
+
+def writer(committed, failing=(), **kwargs):
+    return GroupCommitWriter(lambda: FakeSession(committed, set(failing)), **kwargs)
+
+
+def step(name):
+    def fn(session):
+        session.ran.append(name)
+        return name
+    return fn
+
+
+def test_queued_functions_share_one_commit(committed):
+    w = writer(committed, max_batch=10, max_delay=0.05)
+    gate = threading.Event()
+    first = w.submit(lambda session: gate.wait(5))  # hold the writer while the rest queue up
+    futures = [w.submit(step(i)) for i in range(25)]
+    gate.set()
+    assert first.result(5) is True
+    assert [f.result(5) for f in futures] == list(range(25))
+    w.stop()
+    assert [n for batch in committed for n in batch] == list(range(25))
+    assert max(len(batch) for batch in committed) == 10
+    assert w.stats["items"] == 26 and w.stats["batches"] < 26
+
+
+def test_an_exception_goes_to_its_own_future_only(committed):
+    w = writer(committed, max_delay=0.05)
+    def conflict(session): raise ValueError("already clocked in")
+    futures = [w.submit(step("a")), w.submit(conflict), w.submit(step("b"))]
+    assert futures[0].result(5) == "a" and futures[2].result(5) == "b"
+    with pytest.raises(ValueError):
+        futures[1].result(5)
+    w.stop()
+    assert [n for batch in committed for n in batch] == ["a", "b"]
+
+
+def test_a_failed_batch_commit_is_retried_one_by_one(committed):
+    w = writer(committed, failing={"bad"}, max_delay=0.05)
+    gate = threading.Event()
+    w.submit(lambda session: gate.wait(5))
+    futures = {name: w.submit(step(name)) for name in ["a", "bad", "b"]}
+    gate.set()
+    assert futures["a"].result(5) == "a" and futures["b"].result(5) == "b"
+    with pytest.raises(RuntimeError):
+        futures["bad"].result(5)
+    w.stop()
+    assert ["a"] in committed and ["b"] in committed
+    assert w.stats["retried_batches"] == 1
@@ -0,0 +1,108 @@
+"""Group commit for write transactions.
+
+Callers hand a function ``fn(session)`` to ``GroupCommitWriter.submit()`` and get a
+Future back. One writer thread drains the queue and runs up to ``max_batch`` functions
+(or whatever arrived within ``max_delay`` seconds of the first) in a single
+transaction, so a burst of punches costs one commit/fsync instead of one each.
+
+Every function gets its own result: exceptions it raises (e.g. HTTPException for a
+conflicting punch) go to its own Future only. Functions must validate before they
+change anything and ``flush()`` their changes, so later functions in the same batch see
+them. If the batch commit itself fails, each function is retried in a transaction of its
+own so one bad row can't fail its neighbours.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class GroupCommitWriter:
+    def __init__(self, session_factory, max_batch: int = 200, max_delay: float = 0.005, max_queue: int = 10_000):
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.stats = {"batches": 0, "items": 0, "retried_batches": 0}
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stopping = False
+
+    def submit(self, fn, timeout: float = None) -> Future:
+        """Queue fn; raises queue.Full if the queue stays full for `timeout` seconds."""
+        future = Future()
+        self.start()
+        self.queue.put((fn, future), timeout=timeout)
+        return future
+
+    def run(self, fn, timeout: float = None):
+        """submit() and wait for the result (re-raising the function's exception)."""
+        return self.submit(fn, timeout).result()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping = False
+                self._thread = threading.Thread(target=self._loop, name="group-commit-writer", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Finish everything already queued, then stop the writer thread."""
+        with self._lock:
+            thread, self._stopping = self._thread, True
+        if thread is not None:
+            self.queue.put(None)
+            thread.join(timeout)
+
+    def _loop(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                if self._stopping and self.queue.empty(): return
+                continue
+            batch = [item]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0: break
+                try: item = self.queue.get(timeout=remaining)
+                except queue.Empty: break
+                if item is None:
+                    self.queue.put(None)  # handle the stop after this batch
+                    break
+                batch.append(item)
+            self._commit(batch)
+
+    def _commit(self, batch):
+        outcomes = []
+        db = self.session_factory()
+        try:
+            for fn, future in batch:
+                try: outcomes.append((future, fn(db), None))
+                except Exception as exc: outcomes.append((future, None, exc))
+            db.commit()
+        except Exception:
+            db.rollback()
+            self.stats["retried_batches"] += 1
+            for fn, future in batch: self._commit_one(fn, future)
+            return
+        finally:
+            db.close()
+        self.stats["batches"] += 1
+        self.stats["items"] += len(batch)
+        for future, result, exc in outcomes:
+            if exc is not None: future.set_exception(exc)
+            else: future.set_result(result)
+
+    def _commit_one(self, fn, future):
+        db = self.session_factory()
+        try:
+            result = fn(db)
+            db.commit()
+        except Exception as exc:
+            db.rollback()
+            future.set_exception(exc)
+        else:
+            future.set_result(result)
+        finally:
+            db.close()
@@ -2,6 +2,9 @@ import axios from "axios";
 
 const API_BASE = "http://127.0.0.1:8000"; // FastAPI dev server
 
+// Send cookies so reads right after a punch are served by the primary, not a lagging replica
+axios.defaults.withCredentials = true;
+
 // ----------------- AUTH -----------------
 export const login = async (username: string, password: string) => {
   const res = await axios.post(`${API_BASE}/login`, { username, password });
@@ -9,8 +12,12 @@ export const login = async (username: string, password: string) => {
 };
 
 // ----------------- PROJECTS -----------------
-export const getProjects = async () => {
-  const res = await axios.get(`${API_BASE}/projects/`);
+// Pass `fields` to get only those columns back (sparse fieldset), e.g. ["id", "name"].
+const fieldsParam = (fields?: string[]) =>
+  fields && fields.length ? { params: { fields: fields.join(",") } } : undefined;
+
+export const getProjects = async (fields?: string[]) => {
+  const res = await axios.get(`${API_BASE}/projects/`, fieldsParam(fields));
   return res.data;
 };
 
@@ -30,9 +37,31 @@ export const assignWorker = async (projectId: number, workerId: number) => {
   return res.data;
 };
 
+// Assign many workers in one request; projectId null unassigns. Select workers by id
+// and/or filters (role, current project, unassigned only).
+export type AssignResult = {
+  worker_id: number;
+  previous_project_id: number | null;
+  status: "assigned" | "unassigned" | "unchanged" | "skipped" | "not_found";
+};
+
+export const assignWorkers = async (
+  projectId: number | null,
+  selection: { workerIds?: number[]; role?: string; currentProjectId?: number; unassignedOnly?: boolean }
+) => {
+  const res = await axios.post(`${API_BASE}/workers/assignments`, {
+    project_id: projectId,
+    worker_ids: selection.workerIds,
+    role: selection.role,
+    current_project_id: selection.currentProjectId,
+    unassigned_only: selection.unassignedOnly ?? false,
+  });
+  return res.data as AssignResult[];
+};
+
 // ----------------- WORKERS -----------------
-export const getWorkers = async () => {
-  const res = await axios.get(`${API_BASE}/workers/`);
+export const getWorkers = async (fields?: string[]) => {
+  const res = await axios.get(`${API_BASE}/workers/`, fieldsParam(fields));
   return res.data;
 };
 
@@ -46,11 +75,27 @@ export const createWorker = async (worker: {
 };
 
 // ----------------- CLOCK ENTRIES -----------------
-export const getClockEntries = async () => {
-  const res = await axios.get(`${API_BASE}/clock_entries/`);
+export const getClockEntries = async (fields?: string[]) => {
+  const res = await axios.get(`${API_BASE}/clock_entries/`, fieldsParam(fields));
   return res.data;
 };
 
+// Clock-ins by hour of the week (168 values, Monday 00:00 first) and project, for local
+// days in [start, end) as YYYY-MM-DD; the server defaults to the last 4 weeks.
+export type ClockInHeatmap = {
+  start: string;
+  end: string;
+  total: number[];
+  projects: { project_id: number; project_name: string; clock_ins: number[] }[];
+};
+
+export const getClockInHeatmap = async (range?: { start?: string; end?: string; projectId?: number }) => {
+  const res = await axios.get(`${API_BASE}/heatmap/clock_ins`, {
+    params: { start: range?.start, end: range?.end, project_id: range?.projectId },
+  });
+  return res.data as ClockInHeatmap;
+};
+
 export const clockIn = async (workerId: number, projectId: number) => {
   const res = await axios.post(`${API_BASE}/clockin/`, {
     worker_id: workerId,
@@ -70,7 +115,14 @@ export const clockOut = async (workerId: number, projectId: number) => {
 // ----------------- CHATBOT -----------------
 export const askChatbot = async (query: string) => {
   const res = await axios.post(`${API_BASE}/chatbot`, { query });
-  return res.data as { response: string };
+  return res.data as { response: string; intent?: string };
+};
+
+export type ChatSuggestion = { prompt: string; kind: "worker" | "project"; id: number };
+
+export const getChatbotSuggestions = async (limit = 4) => {
+  const res = await axios.get(`${API_BASE}/chatbot/suggestions`, { params: { limit } });
+  return res.data as ChatSuggestion[];
 };
 
 // ----------------- HELPERS -----------------
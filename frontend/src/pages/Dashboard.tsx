@@ -13,7 +13,9 @@ import {
   getProjects,
   getWorkers,
   getClockEntries,
+  getClockInHeatmap,
 } from "../api";
+import type { ClockInHeatmap } from "../api";
 import {
   AreaChart,
   Area,
@@ -81,6 +83,7 @@ export default function Dashboard() {
   const [projects, setProjects] = useState<Project[]>([]);
   const [workers, setWorkers] = useState<Worker[]>([]);
   const [entries, setEntries] = useState<ClockEntry[]>([]);
+  const [heatmap, setHeatmap] = useState<ClockInHeatmap | null>(null);
   const [loading, setLoading] = useState(true);
   const [showMenu, setShowMenu] = useState(false);
 
@@ -89,15 +92,31 @@ export default function Dashboard() {
   useEffect(() => {
     async function fetchData() {
       try {
-        const [projectsData, workersData, entriesData] =
+        // local dates, as the server buckets clock-ins by local day
+        const day = (d: Date) =>
+          `${d.getFullYear()}-${String(d.getMonth() + 1).padStart(2, "0")}-${String(d.getDate()).padStart(2, "0")}`;
+        const tomorrow = new Date();
+        tomorrow.setDate(tomorrow.getDate() + 1);
+        const weekAgo = new Date();
+        weekAgo.setDate(weekAgo.getDate() - 6);
+        const [projectsData, workersData, entriesData, heatmapData] =
           await Promise.all([
             getProjects(),
             getWorkers(),
-            getClockEntries(),
+            // names are joined client-side, so skip the server-side joins
+            getClockEntries([
+              "id",
+              "worker_id",
+              "project_id",
+              "clock_in_time",
+              "clock_out_time",
+            ]),
+            getClockInHeatmap({ start: day(weekAgo), end: day(tomorrow) }),
           ]);
         setProjects(projectsData || []);
         setWorkers(workersData || []);
         setEntries(entriesData || []);
+        setHeatmap(heatmapData);
       } catch (err) {
         console.error("Failed to load dashboard data:", err);
       } finally {
@@ -179,26 +198,18 @@ export default function Dashboard() {
           Math.floor(Math.random() * 70) + 20,
       }));
 
-    const activityByDay = entries.reduce(
-      (acc, entry) => {
-        const date = new Date(
-          entry.clock_in_time
-        ).toLocaleDateString("en-US", {
-          weekday: "short",
-        });
-        acc[date] = (acc[date] || 0) + 1;
-        return acc;
-      },
-      {} as { [key: string]: number }
-    );
-    const activityChartData = Object.entries(
-      activityByDay
-    )
-      .map(([name, clockIns]) => ({
-        name,
-        clockIns,
-      }))
-      .slice(-7);
+    // the heatmap covers the last 7 days, so each weekday's 24 hours are one day; oldest first
+    const activityChartData = Array.from({ length: 7 }, (_, i) => {
+      const date = new Date();
+      date.setDate(date.getDate() - 6 + i);
+      const weekday = (date.getDay() + 6) % 7; // Monday = 0, as on the server
+      return {
+        name: date.toLocaleDateString("en-US", { weekday: "short" }),
+        clockIns: (heatmap?.total ?? [])
+          .slice(weekday * 24, weekday * 24 + 24)
+          .reduce((sum, n) => sum + n, 0),
+      };
+    });
 
     return {
       totalProjects,
@@ -210,7 +221,7 @@ export default function Dashboard() {
       projectsForTable,
       activityChartData,
     };
-  }, [projects, workers, entries]);
+  }, [projects, workers, entries, heatmap]);
 
   if (loading)
     return (
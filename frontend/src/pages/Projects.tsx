@@ -1,5 +1,5 @@
 import { useEffect, useState, useMemo, Fragment } from "react";
-import { getProjects, createProject, getWorkers, assignWorker } from "../api";
+import { getProjects, createProject, getWorkers, assignWorkers } from "../api";
 import { Dialog, Transition, Listbox } from '@headlessui/react';
 import { motion } from 'framer-motion';
 import { Calendar, Briefcase, FolderPlus, PlayCircle, CheckCircle, PauseCircle, PieChart, BarChart2, ChevronDown, Check } from 'lucide-react';
@@ -35,7 +35,7 @@ export default function Projects() {
   const [newName, setNewName] = useState("");
   const [newDesc, setNewDesc] = useState("");
   const [newStatus, setNewStatus] = useState("Active");
-  const [selectedWorkers, setSelectedWorkers] = useState<{ [key: number]: number | null }>({});
+  const [selectedWorkers, setSelectedWorkers] = useState<{ [key: number]: number[] }>({});
   const [assigningWorker, setAssigningWorker] = useState<number | null>(null);
   const [notification, setNotification] = useState<{ message: string; type: 'success' | 'error' } | null>(null);
 
@@ -46,7 +46,8 @@ export default function Projects() {
   const resetForm = () => { setNewName(""); setNewDesc(""); setNewStatus("Active"); };
 
   const handleCreateProject = async (e: React.FormEvent) => { e.preventDefault(); setIsCreating(true); try { const newProject = await createProject({ name: newName, description: newDesc, status: newStatus }); setProjects(p => [...p, newProject]); showNotification(`Project "${newName}" created!`); resetForm(); setIsModalOpen(false); } catch { setError("Failed to create project."); } finally { setIsCreating(false); } };
-  const handleAssignWorker = async (projectId: number) => { const workerId = selectedWorkers[projectId]; if (!workerId) { showNotification("Please select a worker.", "error"); return; } setAssigningWorker(projectId); try { await assignWorker(projectId, Number(workerId)); const updatedWorkers = await getWorkers(); setWorkers(updatedWorkers); setSelectedWorkers(p => ({...p, [projectId]: null})); showNotification(`Worker assigned.`); } catch { setError("Failed to assign worker."); } finally { setAssigningWorker(null); } };
+  // One request for the whole selection; the response says which workers moved, so no need to reload all workers
+  const handleAssignWorker = async (projectId: number) => { const workerIds = selectedWorkers[projectId] || []; if (!workerIds.length) { showNotification("Please select at least one worker.", "error"); return; } setAssigningWorker(projectId); try { const results = await assignWorkers(projectId, { workerIds }); const moved = new Set(results.filter(r => r.status === "assigned").map(r => r.worker_id)); setWorkers(ws => ws.map(w => moved.has(w.id) ? { ...w, assigned_project_id: projectId } : w)); setSelectedWorkers(p => ({...p, [projectId]: []})); showNotification(`${moved.size} worker${moved.size === 1 ? "" : "s"} assigned.`); } catch { setError("Failed to assign workers."); } finally { setAssigningWorker(null); } };
   
   const availableWorkers = workers; 
 
@@ -78,7 +79,7 @@ export default function Projects() {
         <div className="grid grid-cols-1 lg:grid-cols-2 xl:grid-cols-3 gap-8">
           {runningProjects.map(project => {
               const isAssigning = assigningWorker === project.id;
-              const selectedWorkerForProject = workers.find(w => w.id === selectedWorkers[project.id]);
+              const selectedForProject = selectedWorkers[project.id] || [];
               return (
                 <motion.div key={project.id} variants={itemVariants} className="bg-white rounded-xl shadow-lg border flex flex-col">
                     <div className="p-6">
@@ -96,10 +97,10 @@ export default function Projects() {
                     </div>
                     <div className="p-6 mt-auto border-t">
                         <div className="flex gap-2">
-                            <Listbox value={selectedWorkers[project.id]} onChange={(workerId) => setSelectedWorkers(prev => ({...prev, [project.id]: workerId}))}>
+                            <Listbox value={selectedForProject} onChange={(workerIds: number[]) => setSelectedWorkers(prev => ({...prev, [project.id]: workerIds}))} multiple>
                                 <div className="relative w-full">
                                     <Listbox.Button className="relative w-full cursor-default rounded-md bg-white py-2 pl-3 pr-10 text-left border border-slate-300 shadow-sm focus:outline-none focus-visible:border-blue-500 focus-visible:ring-2 focus-visible:ring-white/75 focus-visible:ring-offset-2 focus-visible:ring-offset-blue-300 sm:text-sm h-10">
-                                        <span className="block truncate">{selectedWorkerForProject ? selectedWorkerForProject.name : "Assign a worker..."}</span>
+                                        <span className="block truncate">{selectedForProject.length === 0 ? "Assign workers..." : selectedForProject.length === 1 ? workers.find(w => w.id === selectedForProject[0])?.name : `${selectedForProject.length} workers selected`}</span>
                                         <span className="pointer-events-none absolute inset-y-0 right-0 flex items-center pr-2"><ChevronDown className="h-5 w-5 text-gray-400" aria-hidden="true" /></span>
                                     </Listbox.Button>
                                     <Transition as={Fragment} leave="transition ease-in duration-100" leaveFrom="opacity-100" leaveTo="opacity-0">
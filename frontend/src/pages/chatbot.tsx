@@ -1,26 +1,8 @@
 import { useEffect, useState, useRef, Fragment } from "react";
-import { getWorkers, getProjects, getClockEntries } from "../api";
+import { askChatbot, getChatbotSuggestions } from "../api";
 import { motion } from "framer-motion";
 
 // --- INTERFACES ---
-interface Worker {
-  id: number;
-  name: string;
-  role: string;
-}
-interface Project {
-  id: number;
-  name: string;
-}
-interface ClockEntry {
-  id: number;
-  worker_id: number;
-  project_id: number;
-  worker_name: string;
-  project_name: string;
-  clock_in_time: string;
-  clock_out_time?: string | null;
-}
 interface ChatMessage {
   id: number;
   sender: "user" | "bot" | "suggestion" | "typing";
@@ -30,42 +12,38 @@ interface ChatMessage {
 // --- UI HELPER COMPONENTS & ICONS ---
 const BotIcon = () => ( <div className="w-8 h-8 rounded-full bg-blue-500 flex items-center justify-center text-white flex-shrink-0"><svg xmlns="http://www.w3.org/2000/svg" className="h-5 w-5" viewBox="0 0 20 20" fill="currentColor"><path fillRule="evenodd" d="M10 9a3 3 0 100-6 3 3 0 000 6zm-7 9a7 7 0 1114 0H3z" clipRule="evenodd" /></svg></div> );
 const TypingIndicator = () => ( <div className="flex items-center space-x-1"><motion.div className="w-2 h-2 bg-slate-400 rounded-full" animate={{ y: [0, -4, 0] }} transition={{ duration: 1, repeat: Infinity, ease: "easeInOut" }} /><motion.div className="w-2 h-2 bg-slate-400 rounded-full" animate={{ y: [0, -4, 0] }} transition={{ duration: 1, delay: 0.2, repeat: Infinity, ease: "easeInOut" }} /><motion.div className="w-2 h-2 bg-slate-400 rounded-full" animate={{ y: [0, -4, 0] }} transition={{ duration: 1, delay: 0.4, repeat: Infinity, ease: "easeInOut" }} /></div> );
-const BotResponseCard = ({ title, icon, children }: { title: string; icon: string; children: React.ReactNode; }) => ( <div className="mt-2 border-t border-gray-300/50 pt-2"><h3 className="font-bold text-sm mb-1 flex items-center gap-2"><span className="text-lg">{icon}</span>{title}</h3><div className="text-sm font-light">{children}</div></div> );
 
 // --- MAIN CHATBOT COMPONENT ---
+// Opening the page only fetches a few suggested prompts; questions are answered by the server.
 export default function Chatbot() {
-  const [workers, setWorkers] = useState<Worker[]>([]);
-  const [projects, setProjects] = useState<Project[]>([]);
-  const [entries, setEntries] = useState<ClockEntry[]>([]);
   const [query, setQuery] = useState("");
   const [messages, setMessages] = useState<ChatMessage[]>([]);
   const chatEndRef = useRef<HTMLDivElement>(null);
 
   useEffect(() => {
-    Promise.all([getWorkers(), getProjects(), getClockEntries()]).then(
-      ([w, p, e]) => {
-        setWorkers(w || []);
-        setProjects(p || []);
-        setEntries(e || []);
-        setMessages([
-          { id: Date.now(), sender: "bot", content: (
-             <div className="flex items-start gap-2">
-                <span className="text-2xl mt-1">👋</span>
-                <div>
-                    <p className="font-semibold">Hi! I'm your Project Assistant.</p>
-                    <p className="text-sm mt-1">You can ask me about workers or projects.</p>
-                </div>
-             </div>
-            )},
-          { id: Date.now() + 1, sender: "suggestion", content: (
-              <div className="flex flex-wrap gap-2 mt-2">
-                {(w || []).slice(0, 2).map(worker => <button key={worker.id} onClick={() => handleSuggestion(worker.name)} className="px-3 py-1 text-xs bg-blue-100 text-blue-800 rounded-full hover:bg-blue-200">About {worker.name}</button>)}
-                {(p || []).slice(0, 1).map(project => <button key={project.id} onClick={() => handleSuggestion(project.name)} className="px-3 py-1 text-xs bg-green-100 text-green-800 rounded-full hover:bg-green-200">Who is on {project.name}?</button>)}
-              </div>
-            )}
-        ]);
-      }
-    );
+    const greeting: ChatMessage = { id: Date.now(), sender: "bot", content: (
+       <div className="flex items-start gap-2">
+          <span className="text-2xl mt-1">👋</span>
+          <div>
+              <p className="font-semibold">Hi! I'm your Project Assistant.</p>
+              <p className="text-sm mt-1">You can ask me about workers or projects, e.g. hours worked last week or who is on a project right now.</p>
+          </div>
+       </div>
+      )};
+    setMessages([greeting]);
+    getChatbotSuggestions().then((suggestions) => {
+      if (!suggestions?.length) return;
+      setMessages((prev) => [...prev, { id: Date.now() + 1, sender: "suggestion", content: (
+          <div className="flex flex-wrap gap-2 mt-2">
+            {suggestions.map(s => (
+              <button key={`${s.kind}-${s.id}`} onClick={() => handleSuggestion(s.prompt)}
+                className={`px-3 py-1 text-xs rounded-full ${s.kind === "worker" ? "bg-blue-100 text-blue-800 hover:bg-blue-200" : "bg-green-100 text-green-800 hover:bg-green-200"}`}>
+                {s.prompt}
+              </button>
+            ))}
+          </div>
+        )}]);
+    }).catch(() => {});
   }, []);
 
   useEffect(() => { chatEndRef.current?.scrollIntoView({ behavior: "smooth" }); }, [messages]);
@@ -75,57 +53,18 @@ export default function Chatbot() {
   const handleQuery = (currentQuery: string = query) => {
     const trimmedQuery = currentQuery.trim();
     if (!trimmedQuery) return;
-    const q = trimmedQuery.toLowerCase();
     const userMessage: ChatMessage = { id: Date.now(), sender: "user", content: trimmedQuery };
     const typingMessage: ChatMessage = { id: Date.now() + 1, sender: 'typing', content: ""};
     setMessages((prev) => [...prev.filter(m => m.sender !== 'suggestion'), userMessage, typingMessage]);
     setQuery("");
 
-    setTimeout(() => {
-        let botResponse: React.ReactNode;
-        const worker = workers.find((w) => w.name.toLowerCase() === q);
-        const project = projects.find((p) => p.name.toLowerCase() === q);
-
-        if (worker) {
-            const workerEntries = entries.filter((e) => e.worker_id === worker.id);
-            botResponse = (
-                <BotResponseCard title={`${worker.name} - ${worker.role}`} icon="👷">
-                    {workerEntries.length > 0 ? (
-                        <ul className="space-y-2 pl-1 mt-2">
-                            {workerEntries.map((e) => (
-                                <li key={e.id} className="text-xs border-l-2 pl-2 border-blue-300">
-                                    <strong>Project:</strong> {e.project_name}<br />
-                                    <strong>Clock In:</strong> {new Date(e.clock_in_time).toLocaleString()}<br />
-                                    <strong>Clock Out:</strong> {e.clock_out_time ? new Date(e.clock_out_time).toLocaleString() : <span className="text-green-600 font-semibold">Active</span>}
-                                </li>
-                            ))}
-                        </ul>
-                    ) : ( "No time entries found." )}
-                </BotResponseCard>
-            );
-        } else if (project) {
-            const projectEntries = entries.filter((e) => e.project_id === project.id);
-            const uniqueWorkers = [...new Map(projectEntries.map(item => [item.worker_name, item])).values()];
-            botResponse = (
-                <BotResponseCard title={`Project: ${project.name}`} icon="📁">
-                    {uniqueWorkers.length > 0 ? (
-                        <ul className="space-y-1 pl-1 mt-2">
-                            {uniqueWorkers.map((e) => (
-                                <li key={e.id} className="text-xs border-l-2 pl-2 border-green-300">
-                                    <strong>Worker:</strong> {e.worker_name}
-                                </li>
-                            ))}
-                        </ul>
-                    ) : ( "No workers have clocked into this project yet." )}
-                </BotResponseCard>
-            );
-        } else {
-            botResponse = "❓ I couldn't find a matching worker or project. Please try a different name.";
-        }
-
+    askChatbot(trimmedQuery)
+      .then((res) => <p className="text-sm whitespace-pre-line">{res.response.trim()}</p>)
+      .catch(() => "⚠️ Sorry, I couldn't reach the server. Please try again.")
+      .then((botResponse: React.ReactNode) => {
         const botMessage: ChatMessage = { id: Date.now() + 2, sender: "bot", content: botResponse };
         setMessages((prev) => [...prev.filter(m => m.sender !== 'typing'), botMessage]);
-    }, 1000);
+      });
   };
 
   return (